@@ -1,38 +1,224 @@
 # asr.py
-# import whisper
-from faster_whisper import WhisperModel
-import wave
-import torch
+# 各 ASR 后端依赖的 whisper / faster_whisper / torch / transformers 较重，只在构造对应后端时才导入
+import time
+import numpy as np
 from logger_config import system_logger
 from config_manager import config_manager
+from asr_gate import TranscriptGate
+from asr_policy import DecodePolicy
 
 # 从配置文件导入参数
 # 使用统一配置管理器
 
+# Whisper 系列模型固定使用 16kHz 采样率
+SAMPLE_RATE = 16000
+# memoryview 格式对应的采样类型，字节视图按 int16 PCM 解析
+MEMORYVIEW_DTYPES = {'f': np.float32, 'h': np.int16, 'B': np.int16, 'b': np.int16}
+
+
+def as_audio_input(audio):
+    """将音频输入统一为文件路径或 float32 numpy 数组
+
+    支持文件路径、float32/int16 numpy 数组以及 memoryview，float32 输入不会产生拷贝。
+    memoryview 按格式解析：'f' 为 float32 采样，'h' 为 int16 采样，'B'/'b'（如 memoryview(frame.tobytes())）
+    为 int16 PCM 原始字节，其他格式抛出 ValueError。
+    """
+    if isinstance(audio, str):
+        return audio
+    if isinstance(audio, memoryview):
+        if audio.format not in MEMORYVIEW_DTYPES:
+            raise ValueError("不支持的 memoryview 格式：{}（支持 'f'、'h'、'B'、'b'）".format(audio.format))
+        if audio.format in ('B', 'b') and audio.nbytes % 2:
+            raise ValueError("int16 PCM 字节数必须为偶数，实际为 {}".format(audio.nbytes))
+        audio = np.frombuffer(audio, dtype=MEMORYVIEW_DTYPES[audio.format])
+    if audio.dtype == np.int16:
+        return audio.astype(np.float32) / 32768.0
+    if audio.dtype != np.float32:
+        return audio.astype(np.float32)
+    return audio
+
+
+def to_clip_timestamps(speech_timestamps):
+    """将样本坐标的语音区间转换为 whisper 的 clip_timestamps（秒）"""
+    clips = []
+    for ts in speech_timestamps:
+        clips.append(ts['start'] / SAMPLE_RATE)
+        clips.append(ts['end'] / SAMPLE_RATE)
+    return clips
+
+
 class WhisperASR:
     def __init__(self, model_name="turbo"):
+        import whisper
         self.model = whisper.load_model(model_name)
 
-    def transcribe(self, audio_file, language="zh", prompt=config_manager.get('asr_prompt')):
-        result = self.model.transcribe(audio_file, language=language, prompt=prompt)
+    def transcribe(self, audio, language="zh", prompt=config_manager.get('asr_prompt'), speech_timestamps=None):
+        """
+        Args:
+            audio: 音频文件路径，或 16kHz 的 float32 numpy 数组 / memoryview
+            speech_timestamps: 已知的语音区间（样本坐标），只识别这些区间
+        """
+        kwargs = {}
+        if speech_timestamps:
+            kwargs['clip_timestamps'] = to_clip_timestamps(speech_timestamps)
+        result = self.model.transcribe(as_audio_input(audio), language=language, prompt=prompt, **kwargs)
         return result["text"]
 
 
+# 自动选择计算类型时的优先顺序
+GPU_COMPUTE_TYPES = ("int8_float16", "float16", "float32")
+CPU_COMPUTE_TYPES = ("int8", "int8_float32", "float32")
+
+
+def select_device_and_compute_type(device=None, compute_type=None):
+    """选择 faster-whisper（ctranslate2）的推理设备和计算类型
+
+    device 为 None / "auto" 时有可用 GPU 则用 cuda，否则用 cpu；指定 cuda 但没有 GPU 时回退到 cpu。
+    compute_type 为 None / "auto" 时 GPU 优先 int8_float16、CPU 优先 int8，按设备实际支持的类型选择。
+    """
+    import ctranslate2
+
+    cuda_available = ctranslate2.get_cuda_device_count() > 0
+    if device in (None, "auto"):
+        device = "cuda" if cuda_available else "cpu"
+    elif device == "cuda" and not cuda_available:
+        system_logger.warning("未检测到可用的 GPU，ASR 回退到 CPU")
+        device = "cpu"
+
+    supported = ctranslate2.get_supported_compute_types(device)
+    if compute_type in (None, "auto"):
+        preferred = GPU_COMPUTE_TYPES if device == "cuda" else CPU_COMPUTE_TYPES
+        compute_type = next((t for t in preferred if t in supported), "default")
+    elif compute_type not in supported and compute_type != "default":
+        system_logger.warning("设备 {} 不支持计算类型 {}，改为自动选择".format(device, compute_type))
+        return select_device_and_compute_type(device, None)
+    return device, compute_type
+
+
 class FasterWhisperASR:
-    def __init__(self, model_name="large-v3-turbo"):
-        self.model = WhisperModel(model_name, device="cuda", compute_type="int8_float16") # "float16"
+    def __init__(self, model_name=None, device=None, compute_type=None, cpu_threads=None, num_workers=None):
+        """
+        Args:
+            model_name: 模型名称（如 large-v3-turbo）或本地 CTranslate2 模型目录，默认读取 asr.whisper_model
+            device: "cuda" / "cpu" / None（自动），默认读取 asr.device
+            compute_type: 计算类型，None 表示自动（GPU int8_float16，CPU int8），默认读取 asr.compute_type
+            cpu_threads: CPU 推理线程数，0 表示 ctranslate2 默认值，默认读取 asr.cpu_threads
+            num_workers: 可并发执行 transcribe 的数量，默认与 ASR 工作线程数 asr.workers 一致
+        """
+        if model_name is None:
+            model_name = config_manager.get('asr.whisper_model', "large-v3-turbo")
+        if device is None:
+            device = config_manager.get('asr.device')
+        if compute_type is None:
+            compute_type = config_manager.get('asr.compute_type')
+        if cpu_threads is None:
+            cpu_threads = config_manager.get('asr.cpu_threads', 0)
+        if num_workers is None:
+            num_workers = config_manager.get('asr.num_workers') or config_manager.get('asr.workers', 1)
 
-    def transcribe(self, audio_file, language="zh", prompt=config_manager.get('asr_prompt')):
-        segments, info =  self.model.transcribe(audio_file, language=language, initial_prompt=prompt, beam_size=5)
+        from faster_whisper import WhisperModel, BatchedInferencePipeline
+
+        device, compute_type = select_device_and_compute_type(device, compute_type)
+        start_time = time.time()
+        try:
+            self.model = WhisperModel(model_name, device=device, compute_type=compute_type,
+                                      cpu_threads=cpu_threads, num_workers=num_workers)
+        except Exception as e:
+            if device != "cuda":
+                raise
+            # CUDA / cuDNN 运行库缺失等情况下回退到 CPU
+            system_logger.warning("GPU 加载 ASR 模型失败（{}），回退到 CPU".format(e))
+            device, compute_type = select_device_and_compute_type("cpu", None)
+            self.model = WhisperModel(model_name, device=device, compute_type=compute_type,
+                                      cpu_threads=cpu_threads, num_workers=num_workers)
+        self.load_time = time.time() - start_time
+        self.setup = {
+            'model': model_name,
+            'device': device,
+            'compute_type': compute_type,
+            'cpu_threads': cpu_threads,
+            'num_workers': num_workers,
+        }
+        system_logger.info("ASR 模型加载完成：{}, 设备: {}, 计算类型: {}, CPU 线程: {}, 并发数: {}, 加载耗时: {:.2f}秒".format(
+            model_name, device, compute_type, cpu_threads or "默认", num_workers, self.load_time))
+        # 批量识别与逐段识别共用同一个模型；在构造时创建，多个 ASR 工作线程并发调用 transcribe_batch 时不会重复创建
+        self._batched = BatchedInferencePipeline(model=self.model)
+        # 按分段置信度和幻觉黑名单过滤识别结果
+        self.gate = TranscriptGate.from_config()
+        # 按语音时长、队列积压和延迟预算选择 beam_size 与提示词，由 AsrWorkerPool 在识别前调用
+        self.policy = DecodePolicy.from_config()
+
+    def transcribe(self, audio, language="zh", prompt=config_manager.get('asr_prompt'), speech_timestamps=None,
+                   beam_size=5, gate_tally=None):
+        """
+        Args:
+            audio: 音频文件路径，或 16kHz 的 float32 numpy 数组 / memoryview
+            speech_timestamps: 已知的语音区间（样本坐标），传入后不再重复执行 VAD
+            beam_size: 束搜索宽度，1 为贪心解码
+            gate_tally: self.gate.new_tally() 的返回值，传入时过滤计数暂存其中，由调用方确认后再计入统计
+        """
         result = ""
-        for segment in segments:
-            system_logger.info("[%.2fs -> %.2fs] %s" % (segment.start, segment.end, segment.text))
-            result += segment.text
+        for start, end, text in self.transcribe_segments(audio, language, prompt, speech_timestamps, utterance=True,
+                                                         beam_size=beam_size, gate_tally=gate_tally):
+            system_logger.info("[%.2fs -> %.2fs] %s" % (start, end, text))
+            result += text
         return result
 
-from transformers import pipeline
+    def transcribe_segments(self, audio, language="zh", prompt=config_manager.get('asr_prompt'), speech_timestamps=None,
+                            utterance=False, beam_size=5, partial=False, gate_tally=None):
+        """识别音频并返回带时间戳的分段列表 [(start, end, text), ...]，时间单位为秒
+
+        疑似幻觉或无语音的分段由 self.gate 过滤；utterance 为 True 表示音频是一段完整的语音，计入整段过滤统计；
+        partial 为 True 表示流式识别的增量解码，单独计入增量解码的过滤统计；
+        传入 gate_tally 时过滤计数只暂存其中（见 TranscriptGate.filter）。
+        """
+        kwargs = {}
+        if speech_timestamps:
+            kwargs['clip_timestamps'] = to_clip_timestamps(speech_timestamps)
+        segments, info =  self.model.transcribe(as_audio_input(audio), language=language, initial_prompt=prompt,
+                                                beam_size=beam_size, vad_filter=False, **kwargs)
+        return [(segment.start, segment.end, segment.text)
+                for segment in self.gate.filter(segments, utterance, partial, gate_tally)]
+
+    def transcribe_batch(self, audios, language="zh", prompt=config_manager.get('asr_prompt'), batch_size=8,
+                         beam_size=5):
+        """批量识别多段音频（每段不超过一个 30 秒窗口），返回每段各自的分段列表 [[(start, end, text), ...], ...]
+
+        BatchedInferencePipeline 会把首尾相接、总长不超过窗口的 clip 合并进同一个窗口解码，
+        一个分段可能跨越两段音频。因此每段音频各占一个窗口长度的槽位（其后补零），clip 覆盖整个槽位，
+        任意两个 clip 都无法合并，每个窗口只含一段音频；一次前向最多解码 batch_size 个窗口。
+        识别出的分段按所在槽位归属到对应的音频段，时间换算为相对该段起点的秒数。
+        """
+        if not audios:
+            return []
+
+        audios = [as_audio_input(audio) for audio in audios]
+        slot_seconds = self.model.feature_extractor.chunk_length
+        slot = int(slot_seconds * SAMPLE_RATE)
+        if any(len(audio) > slot for audio in audios):
+            raise ValueError("批量识别的单段音频不能超过 {} 秒".format(slot_seconds))
+        joined = np.zeros(slot * len(audios), dtype=np.float32)
+        clips = []
+        for i, audio in enumerate(audios):
+            joined[i * slot:i * slot + len(audio)] = audio
+            clips.append({'start': i * slot_seconds, 'end': (i + 1) * slot_seconds})
 
+        segments, info = self._batched.transcribe(joined, language=language, initial_prompt=prompt,
+                                                  batch_size=batch_size, beam_size=beam_size, clip_timestamps=clips,
+                                                  without_timestamps=False, vad_filter=False)
+        grouped = [[] for _ in audios]
+        for segment in segments:
+            i = int((segment.start + segment.end) / 2 // slot_seconds)
+            grouped[min(max(i, 0), len(audios) - 1)].append(segment)
 
+        results = []
+        for i, (audio, group) in enumerate(zip(audios, grouped)):
+            offset = i * slot_seconds
+            duration = len(audio) / SAMPLE_RATE
+            results.append([(min(max(0.0, segment.start - offset), duration),
+                             min(max(0.0, segment.end - offset), duration), segment.text)
+                            for segment in self.gate.filter(group, utterance=True)])
+        return results
 
 class TransformersASR:
     def __init__(self, model_path=None, device=None):
@@ -43,6 +229,9 @@ class TransformersASR:
             model_path: 模型路径，如果为None则使用配置文件中的路径
             device: 设备设置，None表示自动选择，"cuda"表示GPU，"cpu"表示CPU
         """
+        import torch
+        from transformers import pipeline
+
         # 如果没有指定模型路径，则使用配置文件中的路径
         if model_path is None:
             model_path = config_manager.get('asr.model_path')
@@ -77,17 +266,24 @@ class TransformersASR:
         model_device = next(self.transcriber.model.parameters()).device
         print("Model device:", model_device)
 
-    def transcribe(self, audio_file, language="zh", prompt=""):
+    def transcribe(self, audio, language="zh", prompt="", speech_timestamps=None):
         """
-        转录音频文件
+        转录音频
         
         Args:
-            audio_file: 音频文件路径
+            audio: 音频文件路径，或 16kHz 的 float32 numpy 数组 / memoryview
             language: 语言代码
             prompt: 提示文本（注意：某些模型可能不支持）
+            speech_timestamps: 已知的语音区间（样本坐标），只识别首尾区间之间的音频
         """
         try:
-            result = self.transcriber(audio_file)
+            audio = as_audio_input(audio)
+            if not isinstance(audio, str):
+                if speech_timestamps:
+                    # 切片为视图，不拷贝
+                    audio = audio[speech_timestamps[0]['start']:speech_timestamps[-1]['end']]
+                audio = {"raw": audio, "sampling_rate": SAMPLE_RATE}
+            result = self.transcriber(audio)
             
             return result["text"]
         except Exception as e:
@@ -97,4 +293,53 @@ class TransformersASR:
 # 添加到config.yaml中的配置项
 # asr:
 #   model_path: "resources/Belle-whisper-large-v3-turbo-zh"
-#   device: null  # null表示自动选择设备
\ No newline at end of file
+#   device: null  # null表示自动选择设备
+
+
+# ASR 后端注册表：名称 -> 后端类，由配置项 asr.backend 选择，后端类在构造时才导入自己的依赖
+ASR_BACKENDS = {
+    'faster_whisper': FasterWhisperASR,
+    'whisper': WhisperASR,
+    'transformers': TransformersASR,
+}
+
+# 各后端构造时导入的重量级模块，用于测量导入耗时
+ASR_BACKEND_MODULES = {
+    'faster_whisper': ('faster_whisper',),
+    'whisper': ('whisper',),
+    'transformers': ('torch', 'transformers'),
+}
+
+
+def register_asr_backend(name, cls, modules=()):
+    """注册新的 ASR 后端，cls 应在 __init__ 中再导入自己的依赖"""
+    ASR_BACKENDS[name] = cls
+    ASR_BACKEND_MODULES[name] = tuple(modules)
+
+
+def create_asr(backend=None, **kwargs):
+    """按配置项 asr.backend 创建 ASR 后端，只导入所选后端的依赖"""
+    if backend is None:
+        backend = config_manager.get('asr.backend', 'faster_whisper')
+    if backend not in ASR_BACKENDS:
+        system_logger.warning("未知的 ASR 后端 {}，使用 faster_whisper".format(backend))
+        backend = 'faster_whisper'
+
+    start_time = time.time()
+    asr = ASR_BACKENDS[backend](**kwargs)
+    system_logger.info("ASR 后端 {} 创建完成（含依赖导入），耗时 {:.2f}秒".format(backend, time.time() - start_time))
+    return asr
+
+
+if __name__ == "__main__":
+    # 测量 asr 模块本身和各后端依赖的导入耗时，每项在独立的解释器中测量：python asr.py
+    import subprocess
+    import sys
+    code = "import time; t = time.perf_counter(); import {}; print(time.perf_counter() - t)"
+    targets = [('asr', ('asr',))] + list(ASR_BACKEND_MODULES.items())
+    for name, modules in targets:
+        result = subprocess.run([sys.executable, '-c', code.format(', '.join(modules))], capture_output=True, text=True)
+        if result.returncode:
+            print("{:>15}: 导入失败（{}）".format(name, result.stderr.strip().splitlines()[-1]))
+        else:
+            print("{:>15}: {:.3f}秒  ({})".format(name, float(result.stdout.split()[-1]), ', '.join(modules)))
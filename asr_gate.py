@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# asr_gate.py
+
+"""
+ASR 结果过滤模块（幻觉 / 无语音拦截）
+"""
+import re
+import threading
+from logger_config import system_logger
+from config_manager import config_manager
+
+# Whisper 在咳嗽、风扇声、静音上常见的固定幻觉文本（子串匹配）
+DEFAULT_BLOCKLIST = [
+    "请不吝点赞订阅转发打赏支持明镜与点点栏目",
+    "字幕由Amara.org社区提供",
+    "由Amara.org社群提供的字幕",
+    "小编字幕由Amara.org社区提供",
+    "优优独播剧场",
+    "YoYo Television Series Exclusive",
+    "中文字幕志愿者",
+    "字幕志愿者",
+    "本字幕由",
+    "Subtitles by the Amara.org community",
+]
+
+# 只有整段内容与之完全一致时才拦截的短语（正常说话中也可能出现，不做子串匹配）
+DEFAULT_EXACT_BLOCKLIST = [
+    "谢谢观看",
+    "感谢观看",
+    "谢谢大家观看",
+    "请订阅",
+    "Thank you for watching",
+    "Thanks for watching",
+    "you",
+]
+
+
+def normalize_text(text: str) -> str:
+    """去掉空白和标点并转为小写，用于黑名单匹配"""
+    return re.sub(r'[\W_]+', '', text).lower()
+
+
+class TranscriptGate:
+    """基于分段置信度和黑名单的识别结果过滤
+
+    每个分段按 faster-whisper 给出的统计量判断：
+    - no_speech_prob 高且 avg_logprob 低（与 whisper 判定静音的规则一致）视为无语音；
+    - avg_logprob 过低视为低置信度；
+    - compression_ratio 过高视为重复循环；
+    - 文本命中幻觉黑名单。
+    action 为 drop 时丢弃这些分段，整段语音只剩空文本时不再送入 result_queue，
+    即节省一次 LLM 调用（及随后的 TTS）；为 flag 时只记录日志和统计，结果照常输出，用于调参。
+    """
+
+    def __init__(self, enabled: bool = True, action: str = "drop", no_speech_prob: float = 0.6,
+                 no_speech_logprob: float = -1.0, min_avg_logprob: float = -1.5,
+                 max_compression_ratio: float = 2.4, blocklist=None, exact_blocklist=None):
+        self.enabled = enabled
+        self.action = action if action in ("drop", "flag") else "drop"
+        self.no_speech_prob = no_speech_prob
+        self.no_speech_logprob = no_speech_logprob
+        self.min_avg_logprob = min_avg_logprob
+        self.max_compression_ratio = max_compression_ratio
+        blocklist = DEFAULT_BLOCKLIST if blocklist is None else blocklist
+        exact_blocklist = DEFAULT_EXACT_BLOCKLIST if exact_blocklist is None else exact_blocklist
+        self.blocklist = [t for t in map(normalize_text, blocklist) if t]
+        self.exact_blocklist = {t for t in map(normalize_text, exact_blocklist) if t}
+        self._lock = threading.Lock()
+        self.segments_checked = 0
+        self.segments_rejected = {'no_speech': 0, 'low_logprob': 0, 'repetition': 0, 'blocklist': 0}
+        # 流式识别的增量（中间结果）解码单独计数，同一段音频每隔几百毫秒就会重复识别一次
+        self.partial_segments_checked = 0
+        self.partial_segments_rejected = dict.fromkeys(self.segments_rejected, 0)
+        self.utterances_checked = 0
+        self.utterances_rejected = 0
+        self.llm_calls_saved = 0
+
+    @classmethod
+    def from_config(cls):
+        return cls(enabled=config_manager.get('asr.gate.enabled', True),
+                   action=config_manager.get('asr.gate.action', "drop"),
+                   no_speech_prob=config_manager.get('asr.gate.no_speech_prob', 0.6),
+                   no_speech_logprob=config_manager.get('asr.gate.no_speech_logprob', -1.0),
+                   min_avg_logprob=config_manager.get('asr.gate.min_avg_logprob', -1.5),
+                   max_compression_ratio=config_manager.get('asr.gate.max_compression_ratio', 2.4),
+                   blocklist=config_manager.get('asr.gate.blocklist'),
+                   exact_blocklist=config_manager.get('asr.gate.exact_blocklist'))
+
+    def reject_reason(self, segment):
+        """返回分段被拦截的原因，正常分段返回 None"""
+        no_speech_prob = getattr(segment, 'no_speech_prob', None)
+        avg_logprob = getattr(segment, 'avg_logprob', None)
+        compression_ratio = getattr(segment, 'compression_ratio', None)
+        if no_speech_prob is not None and avg_logprob is not None \
+                and no_speech_prob > self.no_speech_prob and avg_logprob < self.no_speech_logprob:
+            return 'no_speech'
+        if avg_logprob is not None and avg_logprob < self.min_avg_logprob:
+            return 'low_logprob'
+        if compression_ratio is not None and compression_ratio > self.max_compression_ratio:
+            return 'repetition'
+        text = normalize_text(segment.text)
+        if text and (text in self.exact_blocklist or any(t in text for t in self.blocklist)):
+            return 'blocklist'
+        return None
+
+    def new_tally(self) -> dict:
+        """空的过滤计数，传给 filter(tally=...) 暂存一次识别的计数，确认采用后再用 merge 计入统计"""
+        return {'segments_checked': 0, 'segments_rejected': dict.fromkeys(self.segments_rejected, 0),
+                'utterances_checked': 0, 'utterances_rejected': 0, 'llm_calls_saved': 0}
+
+    def filter(self, segments, utterance: bool = False, partial: bool = False, tally: dict = None) -> list:
+        """过滤 faster-whisper 的分段，返回保留的分段
+
+        utterance 为 True 表示这些分段构成一段完整语音的全部结果，会计入整段统计：
+        原本有文字、过滤后为空的语音段不会触发 LLM，计为节省一次调用。
+        partial 为 True 表示流式识别的增量解码，只计入 partial_segments_* 统计，拦截记录为 debug 日志。
+        传入 tally（new_tally 的返回值）时计数只累加到 tally 中，不计入统计，用于推测识别等结果可能作废的场景。
+        """
+        segments = list(segments)
+        if not self.enabled:
+            return segments
+
+        kept, rejected = [], []
+        for segment in segments:
+            reason = self.reject_reason(segment)
+            if reason is None:
+                kept.append(segment)
+            else:
+                rejected.append((reason, segment))
+
+        counts = self.new_tally()
+        counts['segments_checked'] = len(segments)
+        for reason, _ in rejected:
+            counts['segments_rejected'][reason] += 1
+        if utterance and not partial:
+            counts['utterances_checked'] = 1
+            if rejected and not any(segment.text.strip() for segment in kept):
+                counts['utterances_rejected'] = 1
+                counts['llm_calls_saved'] = 1 if self.action == "drop" else 0
+
+        log = system_logger.debug if partial else system_logger.info
+        for reason, segment in rejected:
+            log("[ASR 过滤] {}分段 ({}): {} (no_speech_prob={:.2f}, avg_logprob={:.2f}, "
+                "compression_ratio={:.2f})".format(
+                    "丢弃" if self.action == "drop" else "标记", reason, segment.text.strip(),
+                    getattr(segment, 'no_speech_prob', 0.0), getattr(segment, 'avg_logprob', 0.0),
+                    getattr(segment, 'compression_ratio', 0.0)))
+
+        if tally is not None:
+            for key, value in counts.items():
+                if key == 'segments_rejected':
+                    for reason, count in value.items():
+                        tally[key][reason] += count
+                else:
+                    tally[key] += value
+        else:
+            self.merge(counts, partial)
+        return kept if self.action == "drop" else segments
+
+    def merge(self, tally: dict, partial: bool = False):
+        """把暂存的计数计入统计；partial 为 True 时只计入增量解码的分段统计（如作废的推测识别）"""
+        with self._lock:
+            if partial:
+                self.partial_segments_checked += tally['segments_checked']
+                for reason, count in tally['segments_rejected'].items():
+                    self.partial_segments_rejected[reason] += count
+                return
+            self.segments_checked += tally['segments_checked']
+            for reason, count in tally['segments_rejected'].items():
+                self.segments_rejected[reason] += count
+            self.utterances_checked += tally['utterances_checked']
+            self.utterances_rejected += tally['utterances_rejected']
+            self.llm_calls_saved += tally['llm_calls_saved']
+            llm_calls_saved = self.llm_calls_saved
+        if tally['llm_calls_saved']:
+            system_logger.info("[ASR 过滤] 整段识别结果被拦截，累计节省 {} 次 LLM 调用".format(llm_calls_saved))
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'action': self.action,
+                'segments_checked': self.segments_checked,
+                'segments_rejected': dict(self.segments_rejected),
+                'utterances_checked': self.utterances_checked,
+                'utterances_rejected': self.utterances_rejected,
+                'llm_calls_saved': self.llm_calls_saved,
+                'partial_segments_checked': self.partial_segments_checked,
+                'partial_segments_rejected': dict(self.partial_segments_rejected),
+            }
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# asr_policy.py
+
+"""
+ASR 自适应解码策略模块
+"""
+import threading
+from logger_config import system_logger
+from config_manager import config_manager
+
+# 三档解码策略，按耗时从高到低：
+# beam: 束搜索 + 完整提示词；greedy: 贪心解码 + 完整提示词；fast: 贪心解码 + 截短的提示词
+POLICIES = ("beam", "greedy", "fast")
+
+
+class DecodePolicy:
+    """按语音时长、ASR 队列积压和每轮延迟预算选择解码参数
+
+    - 语音不超过 short_utterance_seconds（如“停”“继续”这类短指令）直接使用 fast；
+    - 否则估算各档的识别耗时（各档实测 RTF 的滑动平均 × 语音时长，不足 1 秒按 1 秒计），
+      排在后面的 queue_depth 个任务也要等这一段识别完，因此按 (1 + queue_depth) 倍计；
+    - 在延迟预算扣除已排队时间后剩余的时间内，选择放得下的最慢（最准确）的一档，都放不下时使用 fast。
+    每次识别完成后调用 record 更新对应档位的 RTF 估计和使用次数。
+    """
+
+    def __init__(self, enabled: bool = True, latency_budget: float = 1.0, short_utterance_seconds: float = 1.5,
+                 beam_size: int = 5, short_prompt_chars: int = 24, beam_rtf: float = 0.15, greedy_rtf: float = 0.08,
+                 smoothing: float = 0.2):
+        self.enabled = enabled
+        self.latency_budget = latency_budget
+        self.short_utterance_seconds = short_utterance_seconds
+        self.beam_size = beam_size
+        self.short_prompt_chars = short_prompt_chars
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        # fast 与 greedy 的解码方式相同，初始 RTF 取同一个值，之后分别按实测更新
+        self.rtf = {'beam': beam_rtf, 'greedy': greedy_rtf, 'fast': greedy_rtf}
+        self.counts = {name: 0 for name in POLICIES}
+        self.over_budget = 0
+
+    @classmethod
+    def from_config(cls):
+        return cls(enabled=config_manager.get('asr.policy.enabled', True),
+                   latency_budget=config_manager.get('asr.policy.latency_budget_ms', 1000) / 1000.0,
+                   short_utterance_seconds=config_manager.get('asr.policy.short_utterance_seconds', 1.5),
+                   beam_size=config_manager.get('asr.policy.beam_size', 5),
+                   short_prompt_chars=config_manager.get('asr.policy.short_prompt_chars', 24),
+                   beam_rtf=config_manager.get('asr.policy.beam_rtf', 0.15),
+                   greedy_rtf=config_manager.get('asr.policy.greedy_rtf', 0.08))
+
+    def estimate(self, policy: str, audio_seconds: float) -> float:
+        """估算一段语音按 policy 识别的耗时（秒）"""
+        return self.rtf[policy] * max(audio_seconds, 1.0)
+
+    def apply(self, policy: str, transcribe_kwargs: dict) -> dict:
+        """返回按 policy 调整后的识别参数：设置 beam_size，fast 档只保留提示词的前 short_prompt_chars 个字符"""
+        kwargs = dict(transcribe_kwargs)
+        kwargs['beam_size'] = self.beam_size if policy == "beam" else 1
+        if policy == "fast" and kwargs.get('prompt'):
+            kwargs['prompt'] = kwargs['prompt'][:self.short_prompt_chars] if self.short_prompt_chars > 0 else None
+        return kwargs
+
+    def choose(self, audio_seconds: float, queue_depth: int = 0, waited: float = 0.0) -> str:
+        """选择解码策略
+
+        Args:
+            audio_seconds: 语音时长（秒）
+            queue_depth: 排在这段语音之后、等待识别的任务数
+            waited: 这段语音已经排队等待的时间（秒），从延迟预算中扣除
+        """
+        if not self.enabled:
+            return "beam"
+        if audio_seconds <= self.short_utterance_seconds:
+            return "fast"
+        remaining = self.latency_budget - waited
+        with self._lock:
+            for policy in ("beam", "greedy"):
+                if self.estimate(policy, audio_seconds) * (1 + queue_depth) <= remaining:
+                    return policy
+        return "fast"
+
+    def record(self, policy: str, audio_seconds: float, elapsed: float, total_latency: float = None):
+        """记录一次识别的实际耗时，更新该档位的 RTF 估计
+
+        total_latency 为排队加识别的总耗时，超过延迟预算时计入 over_budget。
+        """
+        with self._lock:
+            self.counts[policy] += 1
+            if audio_seconds > 0:
+                rtf = elapsed / max(audio_seconds, 1.0)
+                self.rtf[policy] += self.smoothing * (rtf - self.rtf[policy])
+            if total_latency is not None and total_latency > self.latency_budget:
+                self.over_budget += 1
+                system_logger.info("[ASR 策略] {} 识别总耗时 {:.3f}秒，超过延迟预算 {:.3f}秒".format(
+                    policy, total_latency, self.latency_budget))
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'latency_budget': self.latency_budget,
+                'counts': dict(self.counts),
+                'rtf': dict(self.rtf),
+                'over_budget': self.over_budget,
+            }
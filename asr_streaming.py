@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# asr_streaming.py
+
+"""
+流式（增量）语音识别模块
+"""
+import threading
+import queue
+import time
+from logger_config import system_logger
+
+# Whisper 系列模型固定使用 16kHz 采样率
+SAMPLE_RATE = 16000
+
+
+class StreamingSession:
+    """单段语音的增量识别会话
+
+    说话过程中每隔 interval 秒重新识别一次尚未确认的音频，连续两次识别结果中相同、
+    且距离音频末尾超过 commit_margin 秒的分段被确认为稳定前缀，之后不再重复识别。
+    说话结束时只需识别剩余的不稳定尾部，最终结果 = 已确认前缀 + 尾部识别结果。
+    """
+
+    def __init__(self, asr, partial_queue: queue.Queue, interval: float, commit_margin: float,
+                 language: str = "zh", prompt: str = ""):
+        self.asr = asr
+        self.partial_queue = partial_queue
+        self.interval = interval
+        self.commit_margin = commit_margin
+        self.language = language
+        self.prompt = prompt or ""
+        self.committed_text = ""
+        self.partial_text = ""
+        self.decode_count = 0
+        self._commit_sample = 0     # 已确认前缀对应的音频位置
+        self._prev_segments = []    # 上一次识别的未确认分段（相对 _commit_sample）
+        self._source = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self, source):
+        """开始增量识别，source 为返回当前语音段音频（float32 数组）的函数"""
+        self._source = source
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def freeze(self, audio):
+        """说话结束：固定音频内容并停止增量识别（不阻塞采集线程）"""
+        self._source = lambda: audio
+        self._stop_event.set()
+
+    def cancel(self):
+        """放弃当前会话"""
+        self._stop_event.set()
+
+    def finish(self) -> str:
+        """识别不稳定尾部并返回最终结果（在 ASR 工作线程中调用）"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+
+        audio = self._source()
+        start_time = time.time()
+        with self._lock:
+            tail = audio[self._commit_sample:]
+            # 尚无已确认前缀时尾部就是整段语音，计入 ASR 过滤的整段统计
+            segments = self._decode(tail, utterance=not self.committed_text) if len(tail) else []
+            final_text = self.committed_text + "".join(seg[2] for seg in segments)
+        system_logger.info("[流式识别] 已确认 {:.2f}秒, 尾部 {:.2f}秒, 尾部识别耗时 {:.3f}秒, 增量识别 {} 次".format(
+            self._commit_sample / SAMPLE_RATE, len(tail) / SAMPLE_RATE, time.time() - start_time, self.decode_count))
+        self._publish(final_text, final=True)
+        return final_text
+
+    def _loop(self):
+        while not self._stop_event.wait(self.interval):
+            audio = self._source()
+            with self._lock:
+                if self._stop_event.is_set():
+                    break
+                tail = audio[self._commit_sample:]
+                if len(tail) < SAMPLE_RATE * self.interval:
+                    continue
+                try:
+                    segments = self._decode(tail, partial=True)
+                except Exception as e:
+                    system_logger.error("增量识别失败：{}".format(e))
+                    continue
+                self._update(segments, len(tail) / SAMPLE_RATE)
+                partial_text = self.committed_text + "".join(seg[2] for seg in self._prev_segments)
+            if partial_text != self.partial_text:
+                self.partial_text = partial_text
+                self._publish(partial_text, final=False)
+
+    def _decode(self, audio, utterance=False, partial=False):
+        """识别一段尾部音频；partial 为 True 时是定时的增量解码，不计入 ASR 过滤的最终结果统计"""
+        self.decode_count += 1
+        return self.asr.transcribe_segments(audio, language=self.language,
+                                            prompt=self.prompt + self.committed_text, utterance=utterance,
+                                            partial=partial)
+
+    def _update(self, segments, tail_seconds: float):
+        """与上一次结果比较，确认稳定的前缀分段"""
+        horizon = tail_seconds - self.commit_margin
+        agreed = 0
+        for i, (start, end, text) in enumerate(segments):
+            if i >= len(self._prev_segments) or self._prev_segments[i][2] != text or end > horizon:
+                break
+            agreed = i + 1
+
+        if agreed:
+            self.committed_text += "".join(seg[2] for seg in segments[:agreed])
+            shift = segments[agreed - 1][1]
+            self._commit_sample += int(shift * SAMPLE_RATE)
+            segments = [(start - shift, end - shift, text) for start, end, text in segments[agreed:]]
+        self._prev_segments = segments
+
+    def _publish(self, text: str, final: bool):
+        item = {'committed': self.committed_text, 'text': text, 'final': final}
+        try:
+            self.partial_queue.put_nowait(item)
+        except queue.Full:
+            # 没有消费者时丢弃最旧的结果，避免阻塞识别
+            try:
+                self.partial_queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self.partial_queue.put_nowait(item)
+            except queue.Full:
+                pass
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# asr_worker.py
+
+"""
+ASR 工作线程池模块
+"""
+import threading
+import queue
+import time
+from collections import deque
+from logger_config import system_logger
+
+# Whisper 系列模型固定使用 16kHz 采样率
+SAMPLE_RATE = 16000
+# 批量识别中单段音频的最大时长，超过 whisper 的 30 秒窗口会被截断，这样的语音段单独识别
+MAX_BATCH_AUDIO_SECONDS = 29.0
+
+
+class AsrJob:
+    def __init__(self, seq: int, fn, audio_seconds: float, audio=None, transcribe_kwargs=None):
+        self.seq = seq
+        self.fn = fn
+        self.audio_seconds = audio_seconds
+        # 通过 submit 提交的普通语音段保留音频和参数，可以与其他语音段合并批量识别
+        self.audio = audio
+        self.transcribe_kwargs = transcribe_kwargs or {}
+        self.batch_size = 1
+        self.policy = None           # 本次识别使用的解码策略（beam / greedy / fast），未经策略选择时为 None
+        self.submit_time = time.time()
+        self.start_time = None
+        self.end_time = None
+        self.text = None
+
+    def timing(self) -> dict:
+        """单个任务的耗时统计"""
+        transcribe_time = self.end_time - self.start_time
+        return {
+            'seq': self.seq,
+            'audio_seconds': self.audio_seconds,
+            'queue_wait': self.start_time - self.submit_time,
+            'transcribe_time': transcribe_time,
+            'rtf': transcribe_time / self.audio_seconds if self.audio_seconds > 0 else 0.0,
+            'batch_size': self.batch_size,
+            'policy': self.policy,
+        }
+
+    def batch_key(self):
+        """可以合并到同一批次的任务具有相同的 key，不能批量识别时返回 None"""
+        if self.audio is None or isinstance(self.audio, str) or self.audio_seconds > MAX_BATCH_AUDIO_SECONDS:
+            return None
+        kwargs = self.transcribe_kwargs
+        return (kwargs.get('language', "zh"), 'prompt' in kwargs, kwargs.get('prompt'))
+
+    def batch_audio(self):
+        """批量识别的输入：按已知的语音区间裁掉首尾静音（视图，不拷贝）"""
+        speech_timestamps = self.transcribe_kwargs.get('speech_timestamps')
+        if speech_timestamps:
+            return self.audio[speech_timestamps[0]['start']:speech_timestamps[-1]['end']]
+        return self.audio
+
+    def speech_seconds(self) -> float:
+        """首个语音区间起点到最后一个语音区间终点的时长，即实际需要识别的音频时长"""
+        return len(self.batch_audio()) / SAMPLE_RATE
+
+
+class AsrWorkerPool:
+    """ASR 工作线程池
+
+    采集/VAD 线程只负责把完整的语音段提交到有界队列，识别在独立的工作线程中进行，
+    识别期间监听和打断检测不受影响。多个工作线程并行识别时，结果仍按提交顺序
+    写入 result_queue。
+
+    ASR 后端支持 transcribe_batch 且 max_batch > 1 时，工作线程取到任务后如果队列中还有积压，
+    会在 batch_wait 秒内继续收集，最多 max_batch 段一起批量识别，每段的结果仍按提交顺序分别输出；
+    队列为空时立即单独识别，空闲时的单段延迟不受影响。
+
+    ASR 后端带有解码策略（asr.policy，见 asr_policy.DecodePolicy）时，通过 submit 提交的语音段在开始识别前
+    按语音时长、队列积压和已排队时间选择 beam_size 与提示词，所用策略记录在每个任务的耗时统计中。
+    """
+
+    def __init__(self, asr, result_queue: queue.Queue, num_workers: int = 1, max_pending: int = 8,
+                 submit_timeout: float = 0.05, max_batch: int = 1, batch_wait: float = 0.03):
+        self.asr = asr
+        self.result_queue = result_queue
+        self.num_workers = max(1, num_workers)
+        self.submit_timeout = submit_timeout
+        self._job_queue = queue.Queue(maxsize=max_pending)
+        self._threads = []
+        self._seq = 0
+        self._next_seq = 0           # 下一个应当输出的任务序号
+        self._completed = {}         # 已完成但尚未按序输出的任务
+        self._seq_lock = threading.Lock()
+        self._order_lock = threading.Lock()
+        self.dropped_jobs = 0
+        self.timings = deque(maxlen=100)
+        self.max_batch = max_batch if hasattr(asr, 'transcribe_batch') else 1
+        self.batch_wait = batch_wait
+        self.batches = 0             # 批量识别的次数
+        self.batched_jobs = 0        # 通过批量识别完成的语音段数
+        self.policy = getattr(asr, 'policy', None)
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.num_workers):
+            t = threading.Thread(target=self._worker, name="asr-worker-{}".format(i), daemon=True)
+            t.start()
+            self._threads.append(t)
+        system_logger.info("ASR 工作线程池已启动，线程数: {}, 最大批量: {}".format(self.num_workers, self.max_batch))
+
+    def stop(self):
+        """等待已提交的任务完成后停止工作线程"""
+        for _ in self._threads:
+            self._job_queue.put(None)
+        for t in self._threads:
+            t.join()
+        self._threads = []
+
+    def submit(self, audio, **transcribe_kwargs) -> bool:
+        """提交一段语音进行识别，队列已满时丢弃并返回 False"""
+        audio_seconds = len(audio) / SAMPLE_RATE if not isinstance(audio, str) else 0.0
+        return self._submit(None, audio_seconds, audio, transcribe_kwargs)
+
+    def submit_call(self, fn, audio_seconds: float = 0.0) -> bool:
+        """提交一个返回识别文本的任务"""
+        return self._submit(fn, audio_seconds)
+
+    def _submit(self, fn, audio_seconds: float, audio=None, transcribe_kwargs=None) -> bool:
+        with self._seq_lock:
+            job = AsrJob(self._seq, fn, audio_seconds, audio, transcribe_kwargs)
+            try:
+                self._job_queue.put(job, timeout=self.submit_timeout)
+            except queue.Full:
+                self.dropped_jobs += 1
+                system_logger.warning("ASR 任务队列已满，丢弃当前语音段（累计丢弃 {} 段）".format(self.dropped_jobs))
+                return False
+            self._seq += 1
+        return True
+
+    def pending(self) -> int:
+        """排队中的任务数"""
+        return self._job_queue.qsize()
+
+    def _worker(self):
+        while True:
+            job = self._job_queue.get()
+            if job is None:
+                break
+
+            jobs, stop = [job], False
+            if self.max_batch > 1 and job.batch_key() is not None:
+                more, stop = self._collect_backlog()
+                jobs += more
+
+            # 参数相同的语音段合并识别，其余任务逐个执行
+            groups = {}
+            for item in jobs:
+                key = item.batch_key()
+                groups.setdefault(key if key is not None else ('single', item.seq), []).append(item)
+            for key, group in groups.items():
+                if len(group) > 1:
+                    self._run_batch(group, key)
+                else:
+                    self._run_single(group[0])
+
+            for item in sorted(jobs, key=lambda j: j.seq):
+                self._log_timing(item)
+                self._deliver(item)
+            if stop:
+                break
+
+    def _collect_backlog(self):
+        """队列中已有积压时，在 batch_wait 秒内继续取任务，最多凑满 max_batch 个；队列为空时立即返回"""
+        jobs = []
+        deadline = None
+        while len(jobs) < self.max_batch - 1:
+            try:
+                if deadline is None:
+                    item = self._job_queue.get_nowait()
+                    deadline = time.time() + self.batch_wait
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    item = self._job_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return jobs, True
+            jobs.append(item)
+        return jobs, False
+
+    def _choose_policy(self, jobs: list, transcribe_kwargs: dict) -> dict:
+        """为即将一起识别的语音段选择解码策略并记录到各任务上，返回调整后的识别参数；
+        ASR 后端没有解码策略时原样返回；批量识别时各段在同一次调用中完成，按总语音时长估算耗时"""
+        if self.policy is None or isinstance(jobs[0].audio, str):
+            return transcribe_kwargs
+        policy = self.policy.choose(sum(job.speech_seconds() for job in jobs), queue_depth=self.pending(),
+                                    waited=max(time.time() - job.submit_time for job in jobs))
+        for job in jobs:
+            job.policy = policy
+        return self.policy.apply(policy, transcribe_kwargs)
+
+    def _record_policy(self, jobs: list, update_estimate: bool = True):
+        """把实际耗时反馈给解码策略；批量识别的耗时由多段语音分摊，不用于更新 RTF 估计"""
+        if self.policy is None or jobs[0].policy is None:
+            return
+        for job in jobs:
+            self.policy.record(job.policy, job.speech_seconds() if update_estimate else 0.0,
+                               job.end_time - job.start_time, total_latency=job.end_time - job.submit_time)
+
+    def _run_single(self, job: AsrJob):
+        job.start_time = time.time()
+        try:
+            if job.fn is not None:
+                job.text = job.fn()
+            else:
+                job.text = self.asr.transcribe(job.audio, **self._choose_policy([job], job.transcribe_kwargs))
+        except Exception as e:
+            system_logger.error("识别失败：{}".format(e))
+        job.end_time = time.time()
+        self._record_policy([job])
+
+    def _run_batch(self, jobs: list, key):
+        """一次批量识别多段语音，失败时退回逐段识别"""
+        language, has_prompt, prompt = key
+        kwargs = {'language': language}
+        if has_prompt:
+            kwargs['prompt'] = prompt
+        kwargs = self._choose_policy(jobs, kwargs)
+        start_time = time.time()
+        try:
+            results = self.asr.transcribe_batch([job.batch_audio() for job in jobs], batch_size=self.max_batch,
+                                                **kwargs)
+        except Exception as e:
+            system_logger.error("批量识别失败，改为逐段识别：{}".format(e))
+            for job in jobs:
+                self._run_single(job)
+            return
+        end_time = time.time()
+
+        for job, segments in zip(jobs, results):
+            job.text = "".join(text for _, _, text in segments)
+            job.start_time, job.end_time = start_time, end_time
+            job.batch_size = len(jobs)
+        self._record_policy(jobs, update_estimate=False)
+        self.batches += 1
+        self.batched_jobs += len(jobs)
+        system_logger.info("[ASR 批量] {} 段语音, 音频共 {:.2f}秒, 识别 {:.3f}秒".format(
+            len(jobs), sum(job.audio_seconds for job in jobs), end_time - start_time))
+
+    def _log_timing(self, job: AsrJob):
+        timing = job.timing()
+        self.timings.append(timing)
+        system_logger.info("[ASR 任务 {}] 音频 {:.2f}秒, 排队 {:.3f}秒, 识别 {:.3f}秒, RTF {:.3f}, 批量 {}, 策略 {}".format(
+            timing['seq'], timing['audio_seconds'], timing['queue_wait'],
+            timing['transcribe_time'], timing['rtf'], timing['batch_size'], timing['policy'] or "-"))
+
+    def _deliver(self, job: AsrJob):
+        """按提交顺序输出识别结果"""
+        with self._order_lock:
+            self._completed[job.seq] = job
+            while self._next_seq in self._completed:
+                done = self._completed.pop(self._next_seq)
+                self._next_seq += 1
+                # 空结果（包括被 ASR 过滤拦截的幻觉 / 无语音）不送入结果队列，不会触发 LLM
+                if done.text:
+                    system_logger.info("识别结果：{}".format(done.text))
+                    self.result_queue.put(done.text)
+                else:
+                    system_logger.info("[ASR 任务 {}] 识别结果为空，不送入结果队列（批量 {}）".format(
+                        done.seq, done.batch_size))
+
+    def get_stats(self) -> dict:
+        return {
+            'workers': self.num_workers,
+            'pending': self.pending(),
+            'dropped_jobs': self.dropped_jobs,
+            'max_batch': self.max_batch,
+            'batches': self.batches,
+            'batched_jobs': self.batched_jobs,
+            'policy': self.policy.get_stats() if self.policy is not None else None,
+            'recent_timings': list(self.timings),
+        }
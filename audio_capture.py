@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# audio_capture.py
+
+"""
+麦克风采集模块
+"""
+import threading
+import pyaudio
+import numpy as np
+from logger_config import system_logger
+
+
+class RingBuffer:
+    """预分配的 int16 环形缓冲区（单生产者 / 单消费者）
+
+    每个槽位保存一帧音频（CHUNK 个采样点）。消费者跟不上时覆盖最旧的帧，
+    并记录溢出帧数，生产者永远不会被阻塞。
+    """
+
+    def __init__(self, capacity_frames: int, frame_samples: int):
+        self.capacity = capacity_frames
+        self.frame_samples = frame_samples
+        self._buf = np.zeros((capacity_frames, frame_samples), dtype=np.int16)
+        self._write_pos = 0  # 累计写入帧数
+        self._read_pos = 0   # 累计读取帧数
+        self._cond = threading.Condition(threading.Lock())
+        self.overflow_frames = 0
+
+    def write(self, data: bytes) -> None:
+        """写入一帧数据（在 PyAudio 回调线程中调用）"""
+        frame = np.frombuffer(data, dtype=np.int16)
+        with self._cond:
+            if self._write_pos - self._read_pos >= self.capacity:
+                # 缓冲区已满，丢弃最旧的一帧
+                self._read_pos += 1
+                self.overflow_frames += 1
+            np.copyto(self._buf[self._write_pos % self.capacity], frame)
+            self._write_pos += 1
+            self._cond.notify()
+
+    def read(self, out: np.ndarray, timeout: float = None) -> bool:
+        """读取一帧数据到 out 中，超时返回 False"""
+        with self._cond:
+            if self._write_pos == self._read_pos:
+                self._cond.wait(timeout)
+                if self._write_pos == self._read_pos:
+                    return False
+            np.copyto(out, self._buf[self._read_pos % self.capacity])
+            self._read_pos += 1
+            return True
+
+    def pending(self) -> int:
+        """当前未读帧数"""
+        with self._cond:
+            return self._write_pos - self._read_pos
+
+    def clear(self) -> None:
+        with self._cond:
+            self._read_pos = self._write_pos
+
+
+class UtteranceBuffer:
+    """预分配的 float32 语音段缓冲区
+
+    语音帧直接追加到连续内存中，识别时通过 detach() 把整段缓冲区的视图交给 ASR，
+    随后为下一段语音换用新的缓冲区，交接过程不产生拷贝。
+    """
+
+    def __init__(self, initial_seconds: float, rate: int):
+        self._initial_samples = max(1, int(initial_seconds * rate))
+        self._buf = np.empty(self._initial_samples, dtype=np.float32)
+        self.size = 0
+
+    def append(self, chunk: np.ndarray) -> None:
+        end = self.size + len(chunk)
+        if end > len(self._buf):
+            # 超出预分配容量时按倍数扩容
+            new_buf = np.empty(max(end, 2 * len(self._buf)), dtype=np.float32)
+            new_buf[:self.size] = self._buf[:self.size]
+            self._buf = new_buf
+        self._buf[self.size:end] = chunk
+        self.size = end
+
+    def view(self) -> np.ndarray:
+        """当前语音段的视图（不拷贝）"""
+        return self._buf[:self.size]
+
+    def detach(self) -> np.ndarray:
+        """取出当前语音段并重置缓冲区"""
+        audio = self._buf[:self.size]
+        self._buf = np.empty(self._initial_samples, dtype=np.float32)
+        self.size = 0
+        return audio
+
+    def clear(self) -> None:
+        self.size = 0
+
+
+class CallbackAudioCapture:
+    """基于 PyAudio stream_callback 的非阻塞采集
+
+    回调线程只负责把数据写入环形缓冲区，VAD、分段和识别都在消费者线程中完成，
+    下游处理再慢也不会让采集停顿。
+    """
+
+    def __init__(self, rate: int, channels: int, chunk: int, buffer_seconds: float):
+        self.rate = rate
+        self.channels = channels
+        self.chunk = chunk
+        capacity = max(1, int(buffer_seconds * rate / chunk))
+        self.ring = RingBuffer(capacity, chunk * channels)
+        self._frame = np.zeros(chunk * channels, dtype=np.int16)
+        self.input_overflow_count = 0  # PyAudio 报告的输入溢出次数
+        self._p = None
+        self._stream = None
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        if status & pyaudio.paInputOverflow:
+            self.input_overflow_count += 1
+        self.ring.write(in_data)
+        return (None, pyaudio.paContinue)
+
+    def start(self):
+        self.ring.clear()
+        self._p = pyaudio.PyAudio()
+        self._stream = self._p.open(format=pyaudio.paInt16,
+                                    channels=self.channels,
+                                    rate=self.rate,
+                                    input=True,
+                                    frames_per_buffer=self.chunk,
+                                    stream_callback=self._callback)
+        self._stream.start_stream()
+
+    def read(self, timeout: float = 0.5):
+        """读取一帧 int16 数据，超时返回 None
+
+        返回的数组在下一次 read 时会被覆盖，需要保留时请自行拷贝。
+        """
+        if self.ring.read(self._frame, timeout):
+            return self._frame
+        return None
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        if self._p is not None:
+            self._p.terminate()
+            self._p = None
+        stats = self.get_stats()
+        if stats['ring_overflow_frames'] or stats['input_overflow_count']:
+            system_logger.warning("采集溢出统计：环形缓冲区丢帧 {}，输入溢出 {} 次".format(
+                stats['ring_overflow_frames'], stats['input_overflow_count']))
+
+    def get_stats(self) -> dict:
+        return {
+            'mode': 'callback',
+            'ring_capacity_frames': self.ring.capacity,
+            'ring_pending_frames': self.ring.pending(),
+            'ring_overflow_frames': self.ring.overflow_frames,
+            'input_overflow_count': self.input_overflow_count,
+        }
+
+
+class BlockingAudioCapture:
+    """基于阻塞 stream.read 的采集（兼容旧行为）"""
+
+    def __init__(self, rate: int, channels: int, chunk: int):
+        self.rate = rate
+        self.channels = channels
+        self.chunk = chunk
+        self._p = None
+        self._stream = None
+
+    def start(self):
+        self._p = pyaudio.PyAudio()
+        self._stream = self._p.open(format=pyaudio.paInt16,
+                                    channels=self.channels,
+                                    rate=self.rate,
+                                    input=True,
+                                    frames_per_buffer=self.chunk)
+
+    def read(self, timeout: float = 0.5):
+        data = self._stream.read(self.chunk)
+        return np.frombuffer(data, dtype=np.int16)
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        if self._p is not None:
+            self._p.terminate()
+            self._p = None
+
+    def get_stats(self) -> dict:
+        return {'mode': 'blocking'}
+
+
+def create_capture(mode: str, rate: int, channels: int, chunk: int, buffer_seconds: float = 10.0):
+    """根据配置创建采集器"""
+    if mode == 'blocking':
+        return BlockingAudioCapture(rate, channels, chunk)
+    if mode != 'callback':
+        system_logger.warning("未知的采集模式 {}，使用 callback 模式".format(mode))
+    return CallbackAudioCapture(rate, channels, chunk, buffer_seconds)
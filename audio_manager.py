@@ -8,13 +8,17 @@
 """
 import pyaudio
 import numpy as np
-import torch
 import threading
 import queue
-import wave
 from collections import deque
 from vad_controller import VadController
-from asr import WhisperASR, TransformersASR, FasterWhisperASR
+from vad_engine import VadEngine
+from audio_capture import create_capture, UtteranceBuffer
+from asr_worker import AsrWorkerPool
+from asr_streaming import StreamingSession
+from endpointer import AdaptiveEndpointer, START, SPEECH, PAUSE, END, IDLE
+from speculative_turn import SpeculativeTurnManager, SPECULATIVE_ENABLED, SPECULATIVE_LLM
+from asr import create_asr
 from tts_playback import stop_playback_flag, audio_queue, text_queue
 from logger_config import system_logger
 from config_manager import config_manager
@@ -27,126 +31,216 @@ CHANNELS = config_manager.get('audio.channels')
 RATE = config_manager.get('audio.rate')
 CHUNK = config_manager.get('audio.chunk')
 SILENCE_FRAME_THRESHOLD = config_manager.get('audio.silence_frame_threshold')
+CAPTURE_MODE = config_manager.get('audio.capture_mode', 'callback')
+RING_BUFFER_SECONDS = config_manager.get('audio.ring_buffer_seconds', 10)
+UTTERANCE_BUFFER_SECONDS = config_manager.get('audio.utterance_buffer_seconds', 30)
+SPEECH_PAD_SAMPLES = int(RATE * 0.03)    # 与 silero 默认的 speech_pad_ms=30 一致
+SPEECH_MERGE_SAMPLES = int(RATE * 0.3)   # 间隔小于 300ms 的语音区间合并
+STREAMING_ENABLED = config_manager.get('asr.streaming.enabled', False)
+STREAMING_INTERVAL = config_manager.get('asr.streaming.interval_ms', 500) / 1000.0
+STREAMING_COMMIT_MARGIN = config_manager.get('asr.streaming.commit_margin_ms', 1000) / 1000.0
 
 class AudioManager:
-    def __init__(self, result_queue: queue.Queue):
+    def __init__(self, result_queue: queue.Queue, responder=None):
+        """
+        Args:
+            result_queue: 识别结果队列
+            responder: 推测式轮次结束时用于预生成回复的函数（识别文本 -> BufferedReply 或 None）
+        """
         self.result_queue = result_queue
         self.running = False
         self.vad_controller = VadController()
-        # self.asr = WhisperASR()
-        # self.asr = TransformersASR()
-        self.asr = FasterWhisperASR()
+        self.vad_engine = VadEngine(RATE, CHUNK, backend=config_manager.get('vad.backend', 'jit'))
+        # 端点检测：进入/退出滞回、噪声基底和按说话人停顿统计自适应的静音超时
+        self.endpointer = AdaptiveEndpointer.from_config(SILENCE_FRAME_THRESHOLD, CHUNK / RATE * 1000)
+        # ASR 后端由 asr.backend 选择：faster_whisper / whisper / transformers
+        self.asr = create_asr()
+        self.capture = create_capture(CAPTURE_MODE, RATE, CHANNELS, CHUNK, RING_BUFFER_SECONDS)
+        self.asr_pool = AsrWorkerPool(self.asr, result_queue,
+                                      num_workers=config_manager.get('asr.workers', 1),
+                                      max_pending=config_manager.get('asr.max_pending', 8),
+                                      max_batch=config_manager.get('asr.batch.max_size', 8),
+                                      batch_wait=config_manager.get('asr.batch.wait_ms', 30) / 1000.0)
+        # 流式识别的中间结果队列，供需要实时字幕等功能的消费者读取
+        self.partial_queue = queue.Queue(maxsize=config_manager.get('asr.streaming.partial_queue_size', 32))
+        self.streaming = STREAMING_ENABLED and hasattr(self.asr, 'transcribe_segments')
+        if STREAMING_ENABLED and not self.streaming:
+            system_logger.warning("当前 ASR 后端不支持流式识别，已关闭流式模式")
+        # 推测式轮次结束：短暂停顿时提前识别并预生成回复，流式模式下尾部识别已经很短，不再推测
+        self.speculator = None
+        if SPECULATIVE_ENABLED and self.streaming:
+            system_logger.warning("流式识别模式下不启用推测式轮次结束")
+        elif SPECULATIVE_ENABLED:
+            self.speculator = SpeculativeTurnManager(self.asr, self.asr_pool,
+                                                     responder if SPECULATIVE_LLM else None)
 
-        
 
     def start_listening(self):
         self.running = True
+        self.asr_pool.start()
         self.thread = threading.Thread(target=self._listen_loop)
         self.thread.start()
         
     def stop_listening(self):
         self.running = False
         self.thread.join()
+        self.asr_pool.stop()
+        stats = self.vad_engine.get_latency_stats()
+        if stats['frames']:
+            system_logger.info("VAD 每帧耗时 ({})：平均 {:.3f}ms, p95 {:.3f}ms, 最大 {:.3f}ms, 单核占用 {:.1%}".format(
+                self.vad_engine.backend, stats['mean_ms'], stats['p95_ms'], stats['max_ms'], stats['cpu_load']))
+        gate = getattr(self.asr, 'gate', None)
+        if gate is not None and gate.enabled:
+            stats = gate.get_stats()
+            system_logger.info("ASR 过滤：检查 {} 段语音，拦截 {} 段，节省 LLM 调用 {} 次，拦截分段 {}".format(
+                stats['utterances_checked'], stats['utterances_rejected'], stats['llm_calls_saved'],
+                stats['segments_rejected']))
+        stats = self.endpointer.get_stats()
+        if stats['utterances']:
+            system_logger.info("端点检测：{} 段语音，平均结束等待 {:.0f}ms，当前超时 {:.0f}ms，疑似截断 {} 次，噪声基底 {:.3f}".format(
+                stats['utterances'], stats['mean_end_wait_ms'], stats['timeout_ms'], stats['suspected_chops'],
+                stats['noise_floor']))
+        if self.speculator is not None:
+            stats = self.speculator.get_stats()
+            system_logger.info("推测式轮次结束：命中 {} 次，落空 {} 次，命中率 {:.1%}，命中时平均节省 {:.3f}秒，跳过 {} 次".format(
+                stats['hits'], stats['misses'], stats['hit_rate'], stats['mean_saved'], stats['skipped']))
+        policy = getattr(self.asr, 'policy', None)
+        if policy is not None and policy.enabled:
+            stats = policy.get_stats()
+            system_logger.info("ASR 解码策略：使用次数 {}，超出延迟预算 {} 次，RTF 估计 {}".format(
+                stats['counts'], stats['over_budget'], {k: round(v, 3) for k, v in stats['rtf'].items()}))
         
     def set_vad_sensitivity(self, sensitivity: float):
         """设置 VAD 敏感度"""
         self.vad_controller.set_sensitivity(sensitivity)
+
+    def get_capture_stats(self) -> dict:
+        """获取采集统计（包括溢出计数）"""
+        return self.capture.get_stats()
             
     def _listen_loop(self):
-        p = pyaudio.PyAudio()
-        stream = p.open(format=FORMAT,
-                        channels=CHANNELS,
-                        rate=RATE,
-                        input=True,
-                        frames_per_buffer=CHUNK)
+        try:
+            self.capture.start()
+        except Exception as e:
+            system_logger.error("音频设备打开失败：{}".format(e))
+            return
         
-        system_logger.info("开始监听...")
+        system_logger.info("开始监听... (采集模式: {})".format(self.capture.get_stats()['mode']))
         
-        model, utils = torch.hub.load(
-            repo_or_dir='snakers4/silero-vad',
-            model='silero_vad',
-            force_reload=False,
-            source='local'
-        )
+        # VAD 模型在构造时已加载并预热，这里只重置状态
+        self.vad_engine.reset()
+        self.endpointer.reset()
         
-        get_speech_timestamps, _,_ , _,_ = utils
         audio_buffer = deque(maxlen=int(RATE / CHUNK * 2))
-        speech_buffer = []
-        head_buffer = []
-        recording = False
-        silence_frames = 0
+        utterance = UtteranceBuffer(UTTERANCE_BUFFER_SECONDS, RATE)
+        speech_ts = []
+        session = None
         
         while self.running:
             try:
-                data = stream.read(CHUNK)
+                frame = self.capture.read(timeout=0.5)
             except Exception as e:
                 system_logger.error("音频读取错误：{}".format(e))
                 break
                 
-            # 将音频数据转换为 numpy 数组
-            audio_np = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+            if frame is None:
+                continue
+                
+            # 将音频数据转换为 float32 numpy 数组
+            audio_np = frame.astype(np.float32)
+            audio_np *= 1.0 / 32768.0
             
             # 使用原始音频进行 VAD 检测
-            audio_tensor = torch.tensor(audio_np)
             threshold = self.vad_controller.get_threshold()
-            
-            with torch.no_grad():
-                prob = model(audio_tensor, RATE).item()
+            prob = self.vad_engine(audio_np)
+            state = self.endpointer.update(prob, threshold)
                 
-            if prob > threshold:
-                if not recording:
-                    system_logger.info("检测到说话开始... (概率: {:.3f}, 阈值: {:.3f})".format(prob, threshold))
-                    speech_buffer = []
-                    head_buffer = list(audio_buffer)
-                    recording = True
+            if state in (START, SPEECH):
+                if state == START:
+                    system_logger.info("检测到说话开始... (概率: {:.3f}, 阈值: {:.3f})".format(
+                        prob, self.endpointer.thresholds(threshold)[0]))
+                    utterance.clear()
+                    speech_ts = []
+                    for head_chunk in audio_buffer:
+                        utterance.append(head_chunk)
+                    
+                    if self.streaming:
+                        session = StreamingSession(self.asr, self.partial_queue,
+                                                   STREAMING_INTERVAL, STREAMING_COMMIT_MARGIN,
+                                                   language="zh", prompt=config_manager.get('asr_prompt'))
+                        session.start(utterance.view)
                     
                     # 真正的用户语音，执行打断操作
                     self._interrupt_tts()
-                        
-                speech_buffer.append(data)
-                silence_frames = 0
+                elif self.speculator is not None and self.speculator.active:
+                    # 停顿后继续说话，之前的推测作废
+                    self.speculator.cancel()
+                    
+                # 记录语音区间（样本坐标），识别时跳过首尾静音
+                chunk_start = utterance.size
+                if speech_ts and chunk_start - speech_ts[-1]['end'] <= SPEECH_MERGE_SAMPLES:
+                    speech_ts[-1]['end'] = chunk_start + len(audio_np)
+                else:
+                    speech_ts.append({'start': chunk_start, 'end': chunk_start + len(audio_np)})
+                    
+                utterance.append(audio_np)
             else:
-                if recording:
-                    silence_frames += 1
-                    speech_buffer.append(data)
+                if state != IDLE:
+                    utterance.append(audio_np)
                     
-                    if silence_frames >= SILENCE_FRAME_THRESHOLD:
-                        system_logger.info("检测到说话结束，开始识别...")
+                    if self.speculator is not None and state == PAUSE \
+                            and self.endpointer.silence_frames == self.speculator.tentative_silence_frames:
+                        # 短暂停顿：用停顿前的语音提前识别并预生成回复，回复在确认说话结束前不播放
+                        self.speculator.start(
+                            utterance.view(),
+                            language="zh",
+                            prompt=config_manager.get('asr_prompt'),
+                            speech_timestamps=self._pad_speech_timestamps(speech_ts, utterance.size)
+                        )
+                    
+                    if state == END:
+                        decision = self.endpointer.decisions[-1]
+                        system_logger.info("检测到说话结束（静音 {:.0f}ms，超时 {:.0f}ms），提交识别...".format(
+                            decision['silence_frames'] * self.endpointer.frame_ms,
+                            decision['timeout_frames'] * self.endpointer.frame_ms))
                         
-                        final_audio = list(head_buffer) + speech_buffer
-
-
-                        # 保存为 WAV 文件
-                        filename = "temp.wav"
-                        with wave.open(filename, 'wb') as wf:
-                            wf.setnchannels(CHANNELS)
-                            wf.setsampwidth(p.get_sample_size(FORMAT))
-                            wf.setframerate(RATE)
-                            wf.writeframes(b''.join(final_audio))
-                            
-                        # 调用 Whisper 识别
-                        try:
-                            text = self.asr.transcribe(
-                                filename,
+                        final_audio = utterance.detach()
+                        final_ts = self._pad_speech_timestamps(speech_ts, len(final_audio))
+                        
+                        # 提交到 ASR 工作线程池（直接传入内存中的音频），监听不中断
+                        if self.speculator is not None and self.speculator.active:
+                            # 停顿后只有静音，推测结果即最终结果
+                            self.speculator.commit(len(final_audio) / RATE)
+                        elif session is not None:
+                            # 流式模式只需识别尚未确认的尾部
+                            session.freeze(final_audio)
+                            self.asr_pool.submit_call(session.finish, len(final_audio) / RATE)
+                            session = None
+                        else:
+                            self.asr_pool.submit(
+                                final_audio,
                                 language="zh",
-                                prompt=config_manager.get('asr_prompt')
+                                prompt=config_manager.get('asr_prompt'),
+                                speech_timestamps=final_ts
                             )
-                            system_logger.info("识别结果：{}".format(text))
-                            self.result_queue.put(text)
-                        except Exception as e:
-                            system_logger.error("识别失败：{}".format(e))
                                 
                         # 重置状态
-                        recording = False
-                        speech_buffer = []
-                        silence_frames = 0
+                        speech_ts = []
                         audio_buffer.clear()
                 else:
-                    audio_buffer.append(data)
+                    audio_buffer.append(audio_np)
                     
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
+        if session is not None:
+            session.cancel()
+        if self.speculator is not None:
+            self.speculator.cancel()
+        self.capture.stop()
+        
+    @staticmethod
+    def _pad_speech_timestamps(speech_ts: list, total_samples: int) -> list:
+        """为语音区间两侧补充 SPEECH_PAD_SAMPLES 的余量"""
+        return [{'start': max(0, ts['start'] - SPEECH_PAD_SAMPLES),
+                 'end': min(total_samples, ts['end'] + SPEECH_PAD_SAMPLES)} for ts in speech_ts]
         
     def _interrupt_tts(self):
         clean_flag = False
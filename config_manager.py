@@ -70,11 +70,59 @@ class ConfigManager:
             },
             "vad": {
                 "sensitivity": 0.6,
-                "play_sensitivity_factor": 0.2
+                "play_sensitivity_factor": 0.2,
+                "backend": "jit"
             },
             "asr": {
+                "backend": "faster_whisper",
                 "model_path": "resources/Belle-whisper-large-v3-turbo-zh",
-                "device": None
+                "device": None,
+                "whisper_model": "large-v3-turbo",
+                "compute_type": None,
+                "cpu_threads": 0,
+                "num_workers": None,
+                "workers": 1,
+                "max_pending": 8,
+                "batch": {
+                    "max_size": 8,
+                    "wait_ms": 30
+                },
+                "gate": {
+                    "enabled": True,
+                    "action": "drop",
+                    "no_speech_prob": 0.6,
+                    "no_speech_logprob": -1.0,
+                    "min_avg_logprob": -1.5,
+                    "max_compression_ratio": 2.4,
+                    "blocklist": None,
+                    "exact_blocklist": None
+                },
+                "policy": {
+                    "enabled": True,
+                    "latency_budget_ms": 1000,
+                    "short_utterance_seconds": 1.5,
+                    "beam_size": 5,
+                    "short_prompt_chars": 24,
+                    "beam_rtf": 0.15,
+                    "greedy_rtf": 0.08
+                },
+                "streaming": {
+                    "enabled": False,
+                    "interval_ms": 500,
+                    "commit_margin_ms": 1000,
+                    "partial_queue_size": 32
+                }
+            },
+            "offline": {
+                "batch_size": 8,
+                "prefetch_segments": 32,
+                "max_segment_seconds": 28,
+                "min_silence_ms": 300
+            },
+            "speculative_turn": {
+                "enabled": False,
+                "tentative_silence_frames": 8,
+                "start_llm": True
             },
             "asr_prompt": "这是钟离、温迪和玉超在进行的人工智能方面的技术讨论，其中包括 whisper 和 LLM 模型的内容。输出需要带标点符号。",
             "silence_detection": {
@@ -92,7 +140,28 @@ class ConfigManager:
                 "channels": 1,
                 "rate": 16000,
                 "chunk": 512,
-                "silence_frame_threshold": 20
+                "silence_frame_threshold": 20,
+                "capture_mode": "callback",
+                "ring_buffer_seconds": 10,
+                "utterance_buffer_seconds": 30
+            },
+            "endpoint": {
+                "enabled": True,
+                "hysteresis": 0.15,
+                "min_silence_frames": 10,
+                "max_silence_frames": 40,
+                "pause_percentile": 95,
+                "margin_frames": 3,
+                "min_pauses": 10,
+                "pause_history": 200,
+                "min_pause_frames": 4,
+                "noise_window_frames": 94,
+                "noise_percentile": 90,
+                "noise_margin": 0.2,
+                "max_threshold": 0.9,
+                "uncertain_extension_frames": 6,
+                "rejoin_frames": 15,
+                "log_path": None
             },
             "audio_similarity": {
                 "similarity_threshold": 0.85,
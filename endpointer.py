@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# endpointer.py
+
+"""
+自适应端点检测模块
+"""
+import json
+import time
+import threading
+from collections import deque
+import numpy as np
+from logger_config import system_logger
+from config_manager import config_manager
+
+# update() 返回的帧状态
+IDLE = 'idle'       # 说话之外的非语音帧
+START = 'start'     # 说话开始
+SPEECH = 'speech'   # 说话中的语音帧
+PAUSE = 'pause'     # 说话中的停顿（非语音帧）
+END = 'end'         # 说话结束
+
+
+class AdaptiveEndpointer:
+    """基于 VAD 概率的自适应端点检测
+
+    - 进入 / 退出滞回：概率高于进入阈值时开始说话，说话中只有低于退出阈值（进入阈值 - hysteresis，
+      与 get_speech_timestamps 的 neg_threshold 一致）的帧才算静音，阈值附近的抖动不会打断计数；
+    - 噪声基底：在非语音帧上滚动统计 VAD 概率的高分位数，环境噪声抬高概率时两个阈值随之抬高；
+    - 自适应静音超时：记录说话人句中停顿（停顿后又继续说话）的时长，超时取其高分位数加余量，
+      限制在 [min_silence_frames, max_silence_frames]，样本不足时使用固定的 default_silence_frames；
+      说话结束后很快又开始说话时，视为句中停顿被截断，按实际停顿时长计入统计，超时随之变长；
+    - 概率趋势：停顿末尾几帧的平均概率仍处于噪声基底和退出阈值之间（犹豫、吸气）时，
+      超时再延长 uncertain_extension_frames。
+    每段语音结束时的判定记录在 decisions 中，配置 log_path 时同时追加写入 JSONL 文件（含逐帧概率），
+    可以用 replay() 在录下的概率序列上离线比较不同参数。
+    """
+
+    def __init__(self, default_silence_frames: int = 20, enabled: bool = True, hysteresis: float = 0.15,
+                 min_silence_frames: int = 10, max_silence_frames: int = 40, pause_percentile: float = 95,
+                 margin_frames: int = 3, min_pauses: int = 10, pause_history: int = 200, min_pause_frames: int = 4,
+                 noise_window_frames: int = 94, noise_percentile: float = 90, noise_margin: float = 0.2,
+                 max_threshold: float = 0.9, uncertain_extension_frames: int = 6, rejoin_frames: int = 15,
+                 frame_ms: float = 32.0, log_path: str = None):
+        self.default_silence_frames = default_silence_frames
+        self.enabled = enabled
+        self.hysteresis = hysteresis
+        self.min_silence_frames = min_silence_frames
+        self.max_silence_frames = max_silence_frames
+        self.pause_percentile = pause_percentile
+        self.margin_frames = margin_frames
+        self.min_pauses = min_pauses
+        self.min_pause_frames = min_pause_frames
+        self.noise_percentile = noise_percentile
+        self.noise_margin = noise_margin
+        self.max_threshold = max_threshold
+        self.uncertain_extension_frames = uncertain_extension_frames
+        self.rejoin_frames = rejoin_frames
+        self.frame_ms = frame_ms
+        self.log_path = log_path
+
+        self._lock = threading.Lock()
+        self.pauses = deque(maxlen=pause_history)
+        self._noise_probs = deque(maxlen=noise_window_frames)
+        self.noise_floor = 0.0
+        self.decisions = deque(maxlen=200)
+        self.utterances = 0
+        self.suspected_chops = 0
+        self.total_end_wait_frames = 0
+        self.reset()
+
+    @classmethod
+    def from_config(cls, default_silence_frames: int, frame_ms: float):
+        return cls(default_silence_frames=default_silence_frames, frame_ms=frame_ms,
+                   enabled=config_manager.get('endpoint.enabled', True),
+                   hysteresis=config_manager.get('endpoint.hysteresis', 0.15),
+                   min_silence_frames=config_manager.get('endpoint.min_silence_frames', 10),
+                   max_silence_frames=config_manager.get('endpoint.max_silence_frames', 40),
+                   pause_percentile=config_manager.get('endpoint.pause_percentile', 95),
+                   margin_frames=config_manager.get('endpoint.margin_frames', 3),
+                   min_pauses=config_manager.get('endpoint.min_pauses', 10),
+                   pause_history=config_manager.get('endpoint.pause_history', 200),
+                   min_pause_frames=config_manager.get('endpoint.min_pause_frames', 4),
+                   noise_window_frames=config_manager.get('endpoint.noise_window_frames', 94),
+                   noise_percentile=config_manager.get('endpoint.noise_percentile', 90),
+                   noise_margin=config_manager.get('endpoint.noise_margin', 0.2),
+                   max_threshold=config_manager.get('endpoint.max_threshold', 0.9),
+                   uncertain_extension_frames=config_manager.get('endpoint.uncertain_extension_frames', 6),
+                   rejoin_frames=config_manager.get('endpoint.rejoin_frames', 15),
+                   log_path=config_manager.get('endpoint.log_path'))
+
+    def reset(self):
+        """重置当前语音段的状态（保留停顿统计和噪声基底）"""
+        self.in_speech = False
+        self.silence_frames = 0
+        self._frame = 0                 # 已处理的帧数
+        self._start_frame = 0
+        self._speech_frames = 0
+        self._utterance_pauses = []
+        self._pause_probs = []
+        self._probs = []
+        self._last_end_frame = None
+        self._last_silence_frames = 0
+
+    def thresholds(self, threshold: float):
+        """按噪声基底调整后的 (进入阈值, 退出阈值)"""
+        if not self.enabled:
+            return threshold, threshold
+        enter = max(threshold, min(self.noise_floor + self.noise_margin, self.max_threshold))
+        return enter, max(enter - self.hysteresis, 0.01)
+
+    def timeout_frames(self) -> int:
+        """当前的静音超时（帧数）"""
+        if not self.enabled:
+            return self.default_silence_frames
+        with self._lock:
+            if len(self.pauses) < self.min_pauses:
+                return self.default_silence_frames
+            timeout = int(np.ceil(np.percentile(self.pauses, self.pause_percentile))) + self.margin_frames
+        return int(min(max(timeout, self.min_silence_frames), self.max_silence_frames))
+
+    def update(self, prob: float, threshold: float) -> str:
+        """输入一帧的 VAD 概率和基础阈值，返回该帧的状态：IDLE / START / SPEECH / PAUSE / END"""
+        self._frame += 1
+        enter, exit_ = self.thresholds(threshold)
+
+        if not self.in_speech:
+            if prob > enter:
+                self._start(prob, enter)
+                return START
+            self._add_noise(prob)
+            return IDLE
+
+        if self.log_path:
+            self._probs.append(round(float(prob), 3))
+        if prob >= exit_:
+            if self.silence_frames >= self.min_pause_frames:
+                # 停顿后继续说话：这是一次句中停顿
+                self._add_pause(self.silence_frames)
+                self._utterance_pauses.append(self.silence_frames)
+            self.silence_frames = 0
+            self._pause_probs = []
+            self._speech_frames += 1
+            return SPEECH
+
+        self.silence_frames += 1
+        self._pause_probs.append(prob)
+        self._add_noise(prob)
+        timeout = self.timeout_frames()
+        if self.silence_frames < timeout:
+            return PAUSE
+        extended = self.enabled and self._uncertain(exit_)
+        if extended and self.silence_frames < timeout + self.uncertain_extension_frames:
+            return PAUSE
+        self._end(timeout, enter, exit_, extended)
+        return END
+
+    def _start(self, prob: float, enter: float):
+        if self._last_end_frame is not None and self._frame - self._last_end_frame <= self.rejoin_frames:
+            # 上一段结束后很快又开始说话：上一段很可能是在句中停顿处被截断的
+            gap = self._last_silence_frames + self._frame - self._last_end_frame
+            self._add_pause(gap)
+            self.suspected_chops += 1
+            self._record({'event': 'rejoin', 'time': time.time(), 'pause_frames': gap})
+            system_logger.info("[端点检测] 结束后 {:.0f}ms 又开始说话，按句中停顿（{:.0f}ms）计入统计".format(
+                (self._frame - self._last_end_frame) * self.frame_ms, gap * self.frame_ms))
+        self.in_speech = True
+        self.silence_frames = 0
+        self._start_frame = self._frame
+        self._speech_frames = 1
+        self._utterance_pauses = []
+        self._pause_probs = []
+        self._probs = [round(float(prob), 3)] if self.log_path else []
+        self._last_end_frame = None
+
+    def _end(self, timeout: int, enter: float, exit_: float, extended: bool):
+        self.utterances += 1
+        self.total_end_wait_frames += self.silence_frames
+        self._record({
+            'event': 'end',
+            'time': time.time(),
+            'frames': self._frame - self._start_frame + 1,
+            'speech_frames': self._speech_frames,
+            'pauses': self._utterance_pauses,
+            'silence_frames': self.silence_frames,
+            'timeout_frames': timeout,
+            'extended': extended,
+            'enter_threshold': round(enter, 3),
+            'exit_threshold': round(exit_, 3),
+            'noise_floor': round(self.noise_floor, 3),
+        })
+        self._last_end_frame = self._frame
+        self._last_silence_frames = self.silence_frames
+        self.in_speech = False
+        self.silence_frames = 0
+        self._pause_probs = []
+        self._probs = []
+
+    def _uncertain(self, exit_: float) -> bool:
+        """停顿末尾的概率仍明显高于噪声基底（介于噪声基底和退出阈值之间），说话可能还没结束"""
+        recent = self._pause_probs[-4:]
+        return bool(recent) and sum(recent) / len(recent) > (self.noise_floor + exit_) / 2
+
+    def _add_pause(self, frames: int):
+        with self._lock:
+            self.pauses.append(frames)
+
+    def _add_noise(self, prob: float):
+        self._noise_probs.append(prob)
+        # 每 8 帧更新一次噪声基底，避免每帧排序
+        if self._frame % 8 == 0:
+            self.noise_floor = float(np.percentile(self._noise_probs, self.noise_percentile))
+
+    def _record(self, decision: dict):
+        self.decisions.append(decision)
+        if self.log_path:
+            if decision['event'] == 'end':
+                decision = dict(decision, probs=self._probs)
+            try:
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(decision, ensure_ascii=False) + '\n')
+            except OSError as e:
+                system_logger.error("端点检测记录写入失败：{}".format(e))
+
+    def get_stats(self) -> dict:
+        """语音段数、平均结束等待、疑似截断次数和当前参数"""
+        with self._lock:
+            pauses = list(self.pauses)
+        return {
+            'enabled': self.enabled,
+            'utterances': self.utterances,
+            'mean_end_wait_ms': self.total_end_wait_frames / self.utterances * self.frame_ms if self.utterances else 0.0,
+            'suspected_chops': self.suspected_chops,
+            'timeout_ms': self.timeout_frames() * self.frame_ms,
+            'noise_floor': self.noise_floor,
+            'pauses_observed': len(pauses),
+            'pause_p50_ms': float(np.percentile(pauses, 50)) * self.frame_ms if pauses else 0.0,
+        }
+
+
+def replay(probs, threshold: float, **kwargs):
+    """在录下的逐帧 VAD 概率（如 log_path 记录中的 probs）上离线运行端点检测，用于比较不同参数
+
+    kwargs 为 AdaptiveEndpointer 的参数。返回 (每帧状态列表, 端点检测实例)，
+    实例的 decisions 和 get_stats() 给出各段的判定和平均结束等待。
+    """
+    endpointer = AdaptiveEndpointer(**kwargs)
+    return [endpointer.update(prob, threshold) for prob in probs], endpointer
@@ -16,6 +16,8 @@ import ollama_stream
 import tts_playback
 from audio_manager import AudioManager
 
+SPEAKER_NAME = "玉超"
+
 def process_input(text_queue, voice_result_queue):
     """处理输入，无论来自键盘还是语音"""
     while True:
@@ -45,7 +47,12 @@ def process_input(text_queue, voice_result_queue):
         if content:
             system_logger.info(f"收到{'语音' if source == 'voice' else '文字'}输入：{content}")
             try:
-                ollama_stream.chat_handle(content, "玉超", tts_playback.submit_text)
+                reply = getattr(content, 'reply', None)
+                if reply is not None:
+                    # 推测式轮次结束已预生成回复，直接播放
+                    reply.commit(tts_playback.submit_text)
+                else:
+                    ollama_stream.chat_handle(content, SPEAKER_NAME, tts_playback.submit_text)
             except Exception as e:
                 system_logger.error("LLM 处理失败：{}".format(e))
 
@@ -59,7 +66,8 @@ def main():
     tts_playback.start_play_threads()
     
     # 创建并启动音频管理器（包含语音识别功能）
-    audio_manager = AudioManager(voice_result_queue)
+    audio_manager = AudioManager(voice_result_queue,
+                                 responder=lambda text: ollama_stream.BufferedReply.start(text, SPEAKER_NAME))
     # 将 AudioManager 实例传递给 tts_queue
     tts_playback.set_audio_manager(audio_manager)
     audio_manager.start_listening()
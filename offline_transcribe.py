@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# offline_transcribe.py
+
+"""
+长录音离线转写模块
+
+用法：python offline_transcribe.py 录音文件 [-o 转写结果.txt] [--batch-size 8]
+"""
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+import numpy as np
+from logger_config import system_logger
+from config_manager import config_manager
+from vad_engine import VadEngine, SILERO_REPO
+
+# Whisper 系列模型固定使用 16kHz 采样率
+SAMPLE_RATE = 16000
+
+BATCH_SIZE = config_manager.get('offline.batch_size', 8)
+PREFETCH_SEGMENTS = config_manager.get('offline.prefetch_segments', 32)
+MAX_SEGMENT_SECONDS = config_manager.get('offline.max_segment_seconds', 28)
+MIN_SILENCE_MS = config_manager.get('offline.min_silence_ms', 300)
+
+
+def _silero_utils():
+    # 与 vad_engine 相同，直接从本地 silero-vad 源码目录导入
+    src_dir = os.path.join(SILERO_REPO, 'src')
+    if src_dir not in sys.path:
+        sys.path.insert(0, src_dir)
+    from silero_vad import utils_vad
+    return utils_vad
+
+
+def format_timestamp(seconds: float) -> str:
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return "{:02d}:{:02d}:{:06.3f}".format(int(hours), int(minutes), seconds)
+
+
+class SpeechSegmentReader:
+    """后台线程：流式读取录音，用 Silero VAD 切分语音段并放入有界预取队列
+
+    录音按块解码，get_speech_timestamps_stream 每确定一个语音段就立即切出对应音频，
+    只保留尚未切出的音频块，内存占用与录音长度无关。队列满时 VAD 暂停，
+    领先 ASR 的语音段数不超过 prefetch_segments。
+    """
+
+    def __init__(self, path: str, vad_model, prefetch_segments: int = PREFETCH_SEGMENTS,
+                 max_segment_seconds: float = MAX_SEGMENT_SECONDS, min_silence_ms: int = MIN_SILENCE_MS):
+        self.path = path
+        self.vad_model = vad_model
+        self.max_segment_seconds = max_segment_seconds
+        self.min_silence_ms = min_silence_ms
+        self.segment_queue = queue.Queue(maxsize=max(1, prefetch_segments))
+        self.audio_seconds = 0.0
+        self.speech_seconds = 0.0
+        self.error = None
+        self._blocks = []           # [(起始样本, 音频块)]，尚未被语音段用完的音频
+        self._samples = 0
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="offline-vad", daemon=True)
+        self._thread.start()
+
+    def __iter__(self):
+        """按时间顺序返回 (起始秒, 结束秒, 音频)"""
+        while True:
+            item = self.segment_queue.get()
+            if item is None:
+                break
+            yield item
+        if self.error is not None:
+            raise self.error
+
+    def _read_blocks(self, utils_vad):
+        for block in utils_vad.read_audio_stream(self.path, SAMPLE_RATE):
+            block = block.numpy()
+            self._blocks.append((self._samples, block))
+            self._samples += len(block)
+            self.audio_seconds = self._samples / SAMPLE_RATE
+            yield block
+
+    def _cut(self, start: int, end: int) -> np.ndarray:
+        """拷贝出 [start, end) 的音频，并丢弃之后不再需要的音频块"""
+        audio = np.concatenate([block[max(0, start - offset):end - offset]
+                                for offset, block in self._blocks
+                                if offset < end and offset + len(block) > start])
+        while self._blocks and self._blocks[0][0] + len(self._blocks[0][1]) <= end:
+            self._blocks.pop(0)
+        return audio
+
+    def _run(self):
+        try:
+            utils_vad = _silero_utils()
+            speeches = utils_vad.get_speech_timestamps_stream(
+                self._read_blocks(utils_vad), self.vad_model, sampling_rate=SAMPLE_RATE,
+                max_speech_duration_s=self.max_segment_seconds, min_silence_duration_ms=self.min_silence_ms)
+            for speech in speeches:
+                audio = self._cut(speech['start'], speech['end'])
+                self.speech_seconds += len(audio) / SAMPLE_RATE
+                self.segment_queue.put((speech['start'] / SAMPLE_RATE, speech['end'] / SAMPLE_RATE, audio))
+        except Exception as e:
+            system_logger.error("录音读取或 VAD 切分失败：{}".format(e))
+            self.error = e
+        finally:
+            self.segment_queue.put(None)
+
+
+def transcribe_file(path: str, output_path: str, asr=None, vad_model=None, batch_size: int = BATCH_SIZE,
+                    language: str = "zh", prompt: str = None) -> dict:
+    """转写一段长录音，逐批写入带时间戳的文本，返回耗时与吞吐统计
+
+    VAD 切分在后台线程中进行，与 ASR 并行；ASR 每次从预取队列取出最多 batch_size 个语音段批量识别。
+    """
+    if asr is None:
+        from asr import FasterWhisperASR
+        asr = FasterWhisperASR()
+    if vad_model is None:
+        vad_model = VadEngine(SAMPLE_RATE, 512, backend=config_manager.get('vad.backend', 'jit')).model
+    if prompt is None:
+        prompt = config_manager.get('asr_prompt')
+
+    start_time = time.time()
+    reader = SpeechSegmentReader(path, vad_model)
+    reader.start()
+
+    stats = {'segments': 0, 'lines': 0, 'batches': 0, 'asr_time': 0.0}
+    with open(output_path, 'w', encoding='utf-8') as f:
+        batch = []
+        segments = iter(reader)
+        while True:
+            item = next(segments, None)
+            if item is not None:
+                batch.append(item)
+                if len(batch) < batch_size:
+                    continue
+            if not batch:
+                break
+
+            asr_start = time.time()
+            results = asr.transcribe_batch([audio for _, _, audio in batch], language=language, prompt=prompt,
+                                           batch_size=batch_size)
+            stats['asr_time'] += time.time() - asr_start
+            stats['batches'] += 1
+            stats['segments'] += len(batch)
+
+            for (segment_start, _, _), result in zip(batch, results):
+                for start, end, text in result:
+                    text = text.strip()
+                    if text:
+                        f.write("[{} --> {}] {}\n".format(format_timestamp(segment_start + start),
+                                                          format_timestamp(segment_start + end), text))
+                        stats['lines'] += 1
+            f.flush()
+            batch = []
+
+    wall_time = time.time() - start_time
+    stats.update({
+        'audio_seconds': reader.audio_seconds,
+        'speech_seconds': reader.speech_seconds,
+        'wall_time': wall_time,
+        # 每秒墙钟时间处理的录音秒数
+        'throughput': reader.audio_seconds / wall_time if wall_time > 0 else 0.0,
+    })
+    system_logger.info("离线转写完成：录音 {:.1f}秒（语音 {:.1f}秒）, {} 个语音段 / {} 批, 耗时 {:.1f}秒"
+                       "（ASR {:.1f}秒）, 吞吐 {:.1f} 录音秒/秒, 结果写入 {}".format(
+                           stats['audio_seconds'], stats['speech_seconds'], stats['segments'], stats['batches'],
+                           wall_time, stats['asr_time'], stats['throughput'], output_path))
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="长录音离线转写：Silero VAD 切分 + faster-whisper 批量识别")
+    parser.add_argument('input', help="录音文件")
+    parser.add_argument('-o', '--output', default=None, help="转写结果文件（默认与录音同名的 .txt）")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="每批识别的语音段数")
+    parser.add_argument('--language', default="zh")
+    args = parser.parse_args(argv)
+
+    output_path = args.output or os.path.splitext(args.input)[0] + '.txt'
+    stats = transcribe_file(args.input, output_path, batch_size=args.batch_size, language=args.language)
+    print("录音 {:.1f}秒, 耗时 {:.1f}秒, 吞吐 {:.1f} 录音秒/秒 -> {}".format(
+        stats['audio_seconds'], stats['wall_time'], stats['throughput'], output_path))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,8 @@ LLM处理模块
 import os
 import json
 import time
+import queue
+import threading
 import ollama
 from concurrent.futures import ThreadPoolExecutor
 from sentence_segmenter import SentenceSegmenter
@@ -19,6 +21,8 @@ from config_manager import config_manager
 # 全局工具初始化
 segmenter = SentenceSegmenter()
 executor = ThreadPoolExecutor(max_workers=1)
+# 同一时刻只进行一次生成，保证对话历史按轮次追加；预生成的回复也持有该锁直到生成结束
+generation_lock = threading.Lock()
 default_model = config_manager.get('ollama.model')
 history_max = config_manager.get('ollama.max_history')
 history_compress_interval = config_manager.get('ollama.compress_interval')
@@ -108,23 +112,41 @@ history_manager.load_from_file()  # 启动时尝试加载
 local_time = None
 formatted_local = None
 
-def stream_chat(prompt: str, model: str = default_model, speaker_id: str = "unknown"):
+def record_turn(prompt: str, response: str, turn_time: datetime = None):
+    """把一轮对话写入历史并保存；turn_time 为该轮的生成时间，传入时同时更新时间上下文"""
+    global local_time, formatted_local
+
+    if turn_time is not None:
+        local_time = turn_time
+        formatted_local = turn_time.strftime("%Y年%m月%d日%H时%M分%S秒")
+    history_manager.add_message("user", prompt)
+    history_manager.add_message("assistant", response.strip())
+    history_manager.maybe_compress_history()
+    history_manager.save_to_file()  # 每次对话后自动保存
+
+def stream_chat(prompt: str, model: str = default_model, speaker_id: str = "unknown", cancel_event=None):
     """
     流式处理函数，分离思考过程和回复内容
     Args:
         prompt: 用户输入文本
         model: 使用的模型名称
         speaker_id: 说话人标识
+        cancel_event: threading.Event，置位后停止生成；传入时为预生成的回复，本轮对话和时间上下文
+            都不在这里更新，由调用方确认采用后通过 record_turn 写入
     Yields:
         dict: 包含类型和内容的事件对象，格式为:
             {'type': 'thinking', 'content': '...'} 或
             {'type': 'response', 'content': '...'}
+    Returns:
+        str: 完整的回复文本（生成器的返回值）
     """
     global local_time, formatted_local
     
     last_time = local_time
-    local_time = datetime.now()
-    formatted_local = local_time.strftime("%Y年%m月%d日%H时%M分%S秒")
+    now = datetime.now()
+    formatted_now = now.strftime("%Y年%m月%d日%H时%M分%S秒")
+    if cancel_event is None:
+        local_time, formatted_local = now, formatted_now
     
     # 系统提示
     system_prompt = [
@@ -138,12 +160,12 @@ def stream_chat(prompt: str, model: str = default_model, speaker_id: str = "unkn
     ]
     
     # 环境提示（时间）
-    if last_time is None or (local_time - last_time) > timedelta(minutes=10):
+    if last_time is None or (now - last_time) > timedelta(minutes=10):
         environment_prompt = [{
             "role": "system",
-            "content": config_manager.get('ai_prompts.time_context').format(current_time=formatted_local)
+            "content": config_manager.get('ai_prompts.time_context').format(current_time=formatted_now)
         }]
-        last_time = local_time
+        last_time = now
     else:
         environment_prompt = []
         
@@ -203,6 +225,11 @@ def stream_chat(prompt: str, model: str = default_model, speaker_id: str = "unkn
             if stop_playback_flag.is_set():
                 system_logger.info("[LLM 中断操作] 用户开始说话，跳过当前LLM生成")
                 break
+            if cancel_event is not None and cancel_event.is_set():
+                system_logger.info("[LLM 取消] 预生成的回复已作废，停止生成")
+                # 作废回复中未闭合的内容不能带入下一轮
+                segmenter.reset()
+                break
                 
         # 输出剩余内容
         if segmenter.buffer:
@@ -235,11 +262,10 @@ def stream_chat(prompt: str, model: str = default_model, speaker_id: str = "unkn
         system_logger.error(f"[LLM异常] 耗时: {llm_total_time:.2f}秒, 错误: {str(e)}")
         yield {'type': 'error', 'content': "流式处理异常: {}".format(str(e))}
     finally:
-        # 保存用户输入和模型输出到历史
-        history_manager.add_message("user", prompt)
-        history_manager.add_message("assistant", response_buffer.strip())
-        history_manager.maybe_compress_history()
-        history_manager.save_to_file()  # 每次对话后自动保存
+        # 保存用户输入和模型输出到历史；预生成的回复由 BufferedReply.commit 在确认采用后保存
+        if cancel_event is None:
+            record_turn(prompt, response_buffer)
+    return response_buffer.strip()
 
 def handle_response_event(event: dict, speaker: str, tts_handler):
     """处理响应事件"""
@@ -264,5 +290,69 @@ def handle_response_event(event: dict, speaker: str, tts_handler):
 
 def chat_handle(user_prompt: str, speaker_name: str, tts_handler):
     """主对话处理函数"""
-    for event in stream_chat(user_prompt, speaker_id=speaker_name):
-        handle_response_event(event, speaker_name, tts_handler)
\ No newline at end of file
+    with generation_lock:
+        for event in stream_chat(user_prompt, speaker_id=speaker_name):
+            handle_response_event(event, speaker_name, tts_handler)
+
+
+class BufferedReply:
+    """预先生成的回复
+
+    在后台线程中生成，事件先缓存而不播放；commit 时按顺序交给 TTS（此后的事件直接转发），
+    生成结束后把本轮对话写入历史；cancel 时停止生成，本轮对话不写入历史，无论生成是否已经结束。
+    """
+
+    def __init__(self, user_prompt: str, speaker_name: str):
+        self.user_prompt = user_prompt
+        self.speaker_name = speaker_name
+        self.cancel_event = threading.Event()
+        self.events = queue.Queue()
+        self.start_time = time.time()
+        self.first_event_time = None    # 第一条回复内容生成完成的时间
+        self.turn_time = datetime.now()
+        self.response = None            # 生成结束后的完整回复文本，生成失败时为 None
+        self._thread = threading.Thread(target=self._run, name="llm-speculative", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def start(cls, user_prompt: str, speaker_name: str):
+        """开始预生成；已有生成在进行时不预生成，返回 None"""
+        if not generation_lock.acquire(blocking=False):
+            return None
+        try:
+            return cls(user_prompt, speaker_name)
+        except Exception:
+            generation_lock.release()
+            raise
+
+    def _run(self):
+        try:
+            stream = stream_chat(self.user_prompt, speaker_id=self.speaker_name, cancel_event=self.cancel_event)
+            while True:
+                try:
+                    event = next(stream)
+                except StopIteration as stop:
+                    self.response = stop.value
+                    break
+                if self.first_event_time is None and event['type'] == 'response':
+                    self.first_event_time = time.time()
+                self.events.put(event)
+        except Exception as e:
+            system_logger.error("预生成回复失败：{}".format(e))
+        finally:
+            generation_lock.release()
+            self.events.put(None)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def commit(self, tts_handler):
+        """把已缓存和后续生成的回复交给 TTS，直到生成结束，然后把本轮对话写入历史"""
+        while True:
+            event = self.events.get()
+            if event is None:
+                break
+            handle_response_event(event, self.speaker_name, tts_handler)
+        if self.response is not None and not self.cancel_event.is_set():
+            with generation_lock:
+                record_turn(self.user_prompt, self.response, self.turn_time)
\ No newline at end of file
@@ -31,6 +31,14 @@ class SentenceSegmenter:
         self.speaker_buffer = ""
         self.content_buffer = ""
         
+    def reset(self):
+        """丢弃所有未闭合的内容，回到初始状态"""
+        self.buffer = ""
+        self.speech_buffer = ""
+        self.state = 'idle'
+        self.speaker_buffer = ""
+        self.content_buffer = ""
+        
     def push(self, new_text):
         """接收新的文本片段，返回新闭合的句子列表（兼容说话人识别）"""
         results = []
@@ -4,10 +4,29 @@ try:
 except:
     pass
 
-from silero_vad.model import load_silero_vad
-from silero_vad.utils_vad import (get_speech_timestamps,
-                                  save_audio,
-                                  read_audio,
-                                  VADIterator,
-                                  collect_chunks,
-                                  drop_chunks)
+from silero_vad.onnx_vad import OnnxStreamingVAD, get_onnx_model_path
+
+# torch-dependent API is imported lazily, so that the torch-free ONNX engine
+# can be used without pulling torch into the process
+_lazy_imports = {
+    'load_silero_vad': 'silero_vad.model',
+    'get_speech_timestamps': 'silero_vad.utils_vad',
+    'get_speech_timestamps_fast': 'silero_vad.utils_vad',
+    'get_speech_probs': 'silero_vad.utils_vad',
+    'get_speech_timestamps_stream': 'silero_vad.utils_vad',
+    'save_audio': 'silero_vad.utils_vad',
+    'read_audio': 'silero_vad.utils_vad',
+    'read_audio_stream': 'silero_vad.utils_vad',
+    'VADIterator': 'silero_vad.utils_vad',
+    'BatchedVADIterator': 'silero_vad.utils_vad',
+    'collect_chunks': 'silero_vad.utils_vad',
+    'drop_chunks': 'silero_vad.utils_vad',
+    'ChunkViews': 'silero_vad.utils_vad',
+}
+
+
+def __getattr__(name):
+    if name in _lazy_imports:
+        import importlib
+        return getattr(importlib.import_module(_lazy_imports[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
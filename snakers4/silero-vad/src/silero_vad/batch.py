@@ -0,0 +1,274 @@
+"""
+Speech timestamps for many audio files in parallel
+
+    python -m silero_vad.batch DIRS_FILES_OR_MANIFESTS ... --output results.jsonl [--workers 8]
+
+Every worker process loads its own model and runs torch with one thread. Results are appended to a JSONL file
+(one line per audio: path, duration, speech timestamps or error) as soon as the file is done, so the output of
+an interrupted run is valid and a restart with the same output skips the files that are already there.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import warnings
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator, List
+
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.ogg', '.mp3', '.opus', '.m4a')
+BACKENDS = ['jit', 'onnx', 'onnx_numpy']
+
+_model = None
+_sampling_rate = None
+
+
+class WorkerInitError(RuntimeError):
+    """The model of the selected backend could not be loaded or the worker processes died"""
+
+
+def list_audio_files(inputs: Iterable[str]) -> List[str]:
+    """
+    Audio files of directories (recursive), manifests and single files
+
+    A manifest is a .txt / .lst file with one path per line or a .jsonl file with a "path" field per line,
+    relative paths are resolved against the manifest directory.
+    """
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, names in sorted(os.walk(item)):
+                files.extend(os.path.join(root, name) for name in sorted(names) if name.lower().endswith(AUDIO_EXTENSIONS))
+        elif item.lower().endswith(('.txt', '.lst', '.jsonl')):
+            base = os.path.dirname(os.path.abspath(item))
+            with open(item) as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    path = json.loads(line)['path'] if item.lower().endswith('.jsonl') else line
+                    files.append(path if os.path.isabs(path) else os.path.join(base, path))
+        else:
+            files.append(item)
+    return files
+
+
+def load_finished(output_path: str) -> set:
+    """Paths that already have a result (not an error) in the output file, an unfinished last line is ignored"""
+    finished = set()
+    if not os.path.exists(output_path):
+        return finished
+    with open(output_path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if 'error' not in result:
+                finished.add(result['path'])
+    return finished
+
+
+def _load_model(backend: str, sampling_rate: int):
+    if backend == 'onnx_numpy':
+        from silero_vad.onnx_vad import OnnxStreamingVAD
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            return OnnxStreamingVAD(sampling_rate=sampling_rate)
+    from silero_vad.model import load_silero_vad
+    return load_silero_vad(onnx=backend == 'onnx')
+
+
+def _init_worker(backend: str, sampling_rate: int):
+    global _model, _sampling_rate
+    import torch
+    torch.set_num_threads(1)
+    _model = _load_model(backend, sampling_rate)
+    _sampling_rate = sampling_rate
+
+
+def _process_file(path: str, vad_params: dict) -> dict:
+    """Speech timestamps of one file with the worker model, exceptions are returned as an error entry"""
+    from silero_vad.utils_vad import read_audio_stream, get_speech_timestamps_stream
+
+    start = time.perf_counter()
+    num_samples = 0
+
+    def counted(blocks):
+        nonlocal num_samples
+        for block in blocks:
+            num_samples += len(block)
+            yield block
+
+    try:
+        speeches = list(get_speech_timestamps_stream(counted(read_audio_stream(path, _sampling_rate)), _model,
+                                                     sampling_rate=_sampling_rate, **vad_params))
+    except Exception as e:
+        return {'path': path, 'error': f'{type(e).__name__}: {e}'}
+    return {'path': path,
+            'duration': round(num_samples / _sampling_rate, 3),
+            'sampling_rate': _sampling_rate,
+            'speech_timestamps': speeches,
+            'processing_time': round(time.perf_counter() - start, 3)}
+
+
+def process_files(files: Iterable[str],
+                  num_workers: int = None,
+                  backend: str = 'jit',
+                  sampling_rate: int = 16000,
+                  max_pending: int = None,
+                  **vad_params) -> Iterator[dict]:
+    """
+    Yields the speech timestamps of every file as soon as it is done, in completion order
+
+    Parameters
+    ----------
+    files: iterable of str
+        Audio paths, consumed lazily
+
+    num_workers: int (default - os.cpu_count())
+        Worker processes, each with its own model and one torch thread; 0 runs in the current process
+
+    backend: str (default - 'jit')
+        'jit', 'onnx' (OnnxWrapper) or 'onnx_numpy' (OnnxStreamingVAD)
+
+    sampling_rate: int (default - 16000)
+        Audio is resampled to this rate, 8000 or 16000
+
+    max_pending: int (default - 4 * num_workers)
+        Files submitted to the pool ahead of the finished ones
+
+    vad_params:
+        Keyword arguments of get_speech_timestamps (threshold, min_silence_duration_ms, return_seconds, ...)
+
+    Yields
+    ----------
+    result: dict
+        path, duration, sampling_rate, speech_timestamps and processing_time, or path and error
+
+    Raises WorkerInitError if the model cannot be loaded or the worker processes die (missing model file,
+    broken backend dependency, out of memory). The files in flight are yielded as errors before that.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown backend {backend}, available: {BACKENDS}')
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+
+    if num_workers == 0:
+        try:
+            _init_worker(backend, sampling_rate)
+        except Exception as e:
+            raise WorkerInitError(f"Could not load the '{backend}' backend: {type(e).__name__}: {e}") from e
+        for path in files:
+            yield _process_file(path, vad_params)
+        return
+
+    max_pending = max_pending or 4 * num_workers
+    files = iter(files)
+    with ProcessPoolExecutor(num_workers, initializer=_init_worker, initargs=(backend, sampling_rate)) as executor:
+        pending = {}
+        while True:
+            for path in files:
+                pending[executor.submit(_process_file, path, vad_params)] = path
+                if len(pending) >= max_pending:
+                    break
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            broken = None
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    yield future.result()
+                except BrokenProcessPool as e:
+                    broken = e
+                    yield {'path': path, 'error': f'{type(e).__name__}: {e}'}
+                except Exception as e:
+                    yield {'path': path, 'error': f'{type(e).__name__}: {e}'}
+            if broken is not None:
+                for future, path in pending.items():
+                    future.cancel()
+                    yield {'path': path, 'error': f'{type(broken).__name__}: {broken}'}
+                raise WorkerInitError(f"Worker processes of the '{backend}' backend died, check that the model "
+                                      f"and the backend dependencies load: {broken}") from broken
+
+
+def run_batch(inputs: Iterable[str],
+              output_path: str,
+              resume: bool = True,
+              **kwargs) -> dict:
+    """
+    Runs process_files over directories / manifests / files and appends the results to a JSONL file
+
+    With resume=True the files that already have a result in output_path are skipped (failed ones are retried).
+    kwargs are passed to process_files. Returns counts of the processed, failed and skipped files; if the
+    workers could not load the model, the run stops early and the message is returned as 'error'.
+    """
+    files = list_audio_files(inputs)
+    finished = load_finished(output_path) if resume else set()
+    todo = [path for path in files if path not in finished]
+
+    mode = 'a' if resume else 'w'
+    if mode == 'a' and os.path.exists(output_path) and os.path.getsize(output_path):
+        with open(output_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            complete = f.read(1) == b'\n'
+        if not complete:  # the previous run was killed in the middle of a line
+            with open(output_path, 'a') as f:
+                f.write('\n')
+
+    stats = {'processed': 0, 'failed': 0, 'skipped': len(files) - len(todo), 'audio_seconds': 0.0}
+    start = time.perf_counter()
+    with open(output_path, mode) as f:
+        try:
+            for result in process_files(todo, **kwargs):
+                f.write(json.dumps(result, ensure_ascii=False) + '\n')
+                f.flush()
+                if 'error' in result:
+                    stats['failed'] += 1
+                else:
+                    stats['processed'] += 1
+                    stats['audio_seconds'] += result['duration']
+        except WorkerInitError as e:
+            stats['error'] = str(e)
+    stats['wall_seconds'] = time.perf_counter() - start
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Speech timestamps for many audio files in parallel')
+    parser.add_argument('inputs', nargs='+', help='audio files, directories or manifests (.txt / .lst / .jsonl)')
+    parser.add_argument('--output', '-o', required=True, help='JSONL file with the results')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default - number of CPUs)')
+    parser.add_argument('--backend', default='jit', choices=BACKENDS)
+    parser.add_argument('--sampling-rate', type=int, default=16000, choices=[8000, 16000])
+    parser.add_argument('--no-resume', action='store_true', help='overwrite the output instead of skipping finished files')
+    parser.add_argument('--samples', action='store_true', help='timestamps in samples instead of seconds')
+    parser.add_argument('--threshold', type=float, default=0.5)
+    parser.add_argument('--neg-threshold', type=float, default=None)
+    parser.add_argument('--min-speech-duration-ms', type=int, default=250)
+    parser.add_argument('--max-speech-duration-s', type=float, default=float('inf'))
+    parser.add_argument('--min-silence-duration-ms', type=int, default=100)
+    parser.add_argument('--speech-pad-ms', type=int, default=30)
+    args = parser.parse_args(argv)
+
+    stats = run_batch(args.inputs, args.output, resume=not args.no_resume,
+                      num_workers=args.workers, backend=args.backend, sampling_rate=args.sampling_rate,
+                      threshold=args.threshold, neg_threshold=args.neg_threshold,
+                      min_speech_duration_ms=args.min_speech_duration_ms,
+                      max_speech_duration_s=args.max_speech_duration_s,
+                      min_silence_duration_ms=args.min_silence_duration_ms,
+                      speech_pad_ms=args.speech_pad_ms,
+                      return_seconds=not args.samples)
+    speed = stats['audio_seconds'] / stats['wall_seconds'] if stats['wall_seconds'] else 0.0
+    print(f"processed {stats['processed']}, failed {stats['failed']}, skipped {stats['skipped']}, "
+          f"{stats['audio_seconds']:.0f} s of audio in {stats['wall_seconds']:.1f} s ({speed:.0f}x real time)")
+    if 'error' in stats:
+        print(f"stopped: {stats['error']}", file=sys.stderr)
+    return 1 if stats['failed'] or 'error' in stats else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""
+Benchmark of the silero VAD backends on the current machine
+
+    python -m silero_vad.benchmark [--wavs DIR_OR_FILES ...] [--json results.json]
+
+Compares the .jit model, the ONNX models (opset 16 and 15) and an int8 dynamically quantized ONNX export:
+per-window streaming latency, throughput for batches of 1-64 windows, thread scaling and agreement of the
+speech probabilities with the float .jit model on a set of reference audios.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import warnings
+import numpy as np
+
+from silero_vad.onnx_vad import OnnxStreamingVAD, get_onnx_model_path
+
+BACKENDS = ['jit', 'onnx', 'onnx_op15', 'onnx_int8']
+BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64]
+THREADS = [1, 2, 4]
+
+
+def export_quantized_onnx(out_path: str = None,
+                          sampling_rate: int = 16000,
+                          opset_version: int = 16) -> str:
+    """
+    Int8 dynamic quantization of the packaged ONNX model, requires the onnx package
+
+    The weights of the packaged model live inside the If node selecting the sampling rate, where the
+    quantizer does not look. The graph is first specialized for one sampling rate (the selected branch is
+    inlined and its constants become initializers), then the Conv weights are quantized to int8.
+    The resulting model supports only the given sampling rate.
+
+    Parameters
+    ----------
+    out_path: str (default - ~/.cache/silero_vad/silero_vad_{8k|16k}_op{opset_version}_int8.onnx)
+        Where to save the model, an existing file is reused
+
+    sampling_rate: int (default - 16000)
+        8000 or 16000
+
+    opset_version: int (default - 16)
+        Opset of the packaged model to quantize, 15 is 16000 only
+    """
+    try:
+        import onnx
+        from onnx import helper, numpy_helper
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+    except ImportError:
+        raise ImportError('Quantized export requires the onnx package: pip install onnx')
+
+    if out_path is None:
+        out_path = os.path.join(os.path.expanduser('~'), '.cache', 'silero_vad',
+                                f'silero_vad_{sampling_rate // 1000}k_op{opset_version}_int8.onnx')
+    if os.path.exists(out_path):
+        return out_path
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+
+    model = onnx.load(get_onnx_model_path(opset_version))
+    graph = model.graph
+    constants = {node.output[0]: node for node in graph.node if node.op_type == 'Constant'}
+    if_node = next(node for node in graph.node if node.op_type == 'If')
+    equal_node = next(node for node in graph.node if node.op_type == 'Equal')
+    branch_rate = int(numpy_helper.to_array(constants[next(i for i in equal_node.input if i in constants)].attribute[0].t))
+    branches = {attribute.name: attribute.g for attribute in if_node.attribute}
+    branch = branches['then_branch' if branch_rate == sampling_rate else 'else_branch']
+
+    nodes, initializers = [], []
+    for node in branch.node:
+        if node.op_type == 'Constant' and node.attribute[0].name == 'value':
+            tensor = onnx.TensorProto()
+            tensor.CopyFrom(node.attribute[0].t)
+            tensor.name = node.output[0]
+            initializers.append(tensor)
+        else:
+            nodes.append(node)
+    # graph outputs are Identity copies of the If outputs
+    identities = {node.input[0]: node.output[0] for node in graph.node if node.op_type == 'Identity'}
+    for if_output, branch_output in zip(if_node.output, branch.output):
+        nodes.append(helper.make_node('Identity', [branch_output.name], [identities[if_output]]))
+
+    specialized = helper.make_model(helper.make_graph(nodes, graph.name, list(graph.input), list(graph.output), initializers),
+                                    opset_imports=model.opset_import, ir_version=model.ir_version)
+    onnx.checker.check_model(specialized)
+
+    float_path = out_path + '.float.onnx'
+    onnx.save(specialized, float_path)
+    try:
+        quantize_dynamic(float_path, out_path, weight_type=QuantType.QInt8)
+    finally:
+        os.remove(float_path)
+    return out_path
+
+
+class _Runner():
+    """Uniform (batch, window) -> (batch,) interface over the .jit model and OnnxStreamingVAD"""
+
+    def __init__(self, backend: str, sampling_rate: int = 16000, num_threads: int = 1, int8_path: str = None):
+        self.backend = backend
+        self.sampling_rate = sampling_rate
+        self.num_threads = num_threads
+        self.window_size_samples = 512 if sampling_rate == 16000 else 256
+
+        if backend == 'jit':
+            import torch
+            from silero_vad.utils_vad import init_jit_model
+            self._torch = torch
+            self.model = init_jit_model(os.path.join(os.path.dirname(get_onnx_model_path()), 'silero_vad.jit'))
+        else:
+            path = {'onnx': lambda: get_onnx_model_path(16),
+                    'onnx_op15': lambda: get_onnx_model_path(15),
+                    'onnx_int8': lambda: export_quantized_onnx(int8_path, sampling_rate=sampling_rate)}[backend]()
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                self.model = OnnxStreamingVAD(path, sampling_rate=sampling_rate, num_threads=num_threads)
+
+    def reset(self, batch_size: int = 1):
+        """Resets the states, call before every measurement (also sets the torch thread count for .jit)"""
+        if self.backend == 'jit':
+            self._torch.set_num_threads(self.num_threads)
+            self.model.reset_states()
+        else:
+            self.model.reset_states(batch_size)
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        if self.backend == 'jit':
+            with self._torch.no_grad():
+                return self.model(self._torch.from_numpy(x), self.sampling_rate).numpy()[:, 0]
+        return self.model(x)[:, 0]
+
+    def probs(self, audio: np.ndarray) -> np.ndarray:
+        """Streaming per-window probabilities of a whole audio, last window zero padded"""
+        num_windows = -(-len(audio) // self.window_size_samples)
+        padded = np.zeros(num_windows * self.window_size_samples, dtype=np.float32)
+        padded[:len(audio)] = audio
+        self.reset(1)
+        return np.array([self(window[None])[0] for window in padded.reshape(num_windows, -1)], dtype=np.float32)
+
+
+def measure_latency(runner: _Runner, num_windows: int = 2000, warmup: int = 100) -> dict:
+    """Per-window latency of batch 1 streaming inference, in milliseconds"""
+    audio = (np.random.default_rng(0).standard_normal((num_windows + warmup, 1, runner.window_size_samples)) * 0.1).astype(np.float32)
+    runner.reset(1)
+    latencies = np.zeros(num_windows)
+    for i, window in enumerate(audio):
+        start = time.perf_counter()
+        runner(window)
+        if i >= warmup:
+            latencies[i - warmup] = time.perf_counter() - start
+    latencies *= 1000
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    window_ms = runner.window_size_samples / runner.sampling_rate * 1000
+    return {'mean_ms': float(latencies.mean()), 'p50_ms': float(p50), 'p90_ms': float(p90), 'p99_ms': float(p99),
+            'max_ms': float(latencies.max()), 'rtf': float(latencies.mean() / window_ms)}
+
+
+def measure_throughput(runner: _Runner, batch_size: int, seconds: float = 1.0) -> float:
+    """Windows per second for batches of batch_size independent streams"""
+    x = (np.random.default_rng(0).standard_normal((batch_size, runner.window_size_samples)) * 0.1).astype(np.float32)
+    runner.reset(batch_size)
+    for _ in range(10):
+        runner(x)
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        runner(x)
+        calls += 1
+    return calls * batch_size / (time.perf_counter() - start)
+
+
+def check_agreement(runner: _Runner, reference: _Runner, audios: list, threshold: float = 0.5) -> dict:
+    """Agreement of the speech probabilities and of the speech windows (prob >= threshold) with the reference"""
+    diffs, agreements, windows = [], [], 0
+    for audio in audios:
+        probs, ref_probs = runner.probs(audio), reference.probs(audio)
+        diffs.append(np.abs(probs - ref_probs))
+        agreements.append(((probs >= threshold) == (ref_probs >= threshold)).sum())
+        windows += len(probs)
+    diffs = np.concatenate(diffs)
+    return {'max_abs_diff': float(diffs.max()), 'mean_abs_diff': float(diffs.mean()),
+            'decision_agreement': float(np.sum(agreements) / windows), 'windows': windows}
+
+
+def _read_reference_audios(paths: list, sampling_rate: int) -> list:
+    from silero_vad.utils_vad import read_audio_stream
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.lower().endswith(('.wav', '.flac', '.ogg', '.mp3', '.opus'))))
+        else:
+            files.append(path)
+    return [np.concatenate([block.numpy() for block in read_audio_stream(file, sampling_rate)]) for file in files]
+
+
+def run_benchmark(backends: list = BACKENDS,
+                  sampling_rate: int = 16000,
+                  batch_sizes: list = BATCH_SIZES,
+                  threads: list = THREADS,
+                  reference_audios: list = None,
+                  latency_windows: int = 2000,
+                  throughput_seconds: float = 1.0,
+                  int8_path: str = None) -> dict:
+    """
+    Runs all measurements and returns {backend: {'latency', 'throughput', 'threads', 'agreement'}}.
+    Backends that cannot be loaded (e.g. onnx_int8 without the onnx package) get an 'error' entry.
+    """
+    results = {}
+    reference = _Runner('jit', sampling_rate) if reference_audios else None
+    for backend in backends:
+        try:
+            runner = _Runner(backend, sampling_rate, int8_path=int8_path)
+        except Exception as e:
+            results[backend] = {'error': str(e)}
+            continue
+
+        result = {'latency': measure_latency(runner, latency_windows),
+                  'throughput': {batch_size: measure_throughput(runner, batch_size, throughput_seconds)
+                                 for batch_size in batch_sizes}}
+        scaling_batch = max(batch_sizes)
+        result['threads'] = {}
+        for num_threads in threads:
+            threaded = runner if num_threads == 1 else _Runner(backend, sampling_rate, num_threads, int8_path=int8_path)
+            result['threads'][num_threads] = measure_throughput(threaded, scaling_batch, throughput_seconds)
+        if reference_audios:
+            result['agreement'] = check_agreement(runner, reference, reference_audios)
+        results[backend] = result
+    return results
+
+
+def print_results(results: dict):
+    print('\nStreaming latency (batch 1, ms per window)')
+    print(f"{'backend':>10} {'mean':>7} {'p50':>7} {'p90':>7} {'p99':>7} {'max':>7} {'rtf':>7}")
+    for backend, result in results.items():
+        if 'error' in result:
+            print(f'{backend:>10} skipped: {result["error"]}')
+            continue
+        latency = result['latency']
+        print(f"{backend:>10} {latency['mean_ms']:7.3f} {latency['p50_ms']:7.3f} {latency['p90_ms']:7.3f} "
+              f"{latency['p99_ms']:7.3f} {latency['max_ms']:7.3f} {latency['rtf']:7.4f}")
+
+    measured = {backend: result for backend, result in results.items() if 'error' not in result}
+    if not measured:
+        return
+    first = next(iter(measured.values()))
+
+    print('\nThroughput (windows per second, 1 thread)')
+    print(f"{'backend':>10}" + ''.join(f'{f"b={b}":>10}' for b in first['throughput']))
+    for backend, result in measured.items():
+        print(f'{backend:>10}' + ''.join(f'{value:10.0f}' for value in result['throughput'].values()))
+
+    print(f'\nThread scaling (windows per second, batch {max(first["throughput"])})')
+    print(f"{'backend':>10}" + ''.join(f'{f"t={t}":>10}' for t in first['threads']))
+    for backend, result in measured.items():
+        print(f'{backend:>10}' + ''.join(f'{value:10.0f}' for value in result['threads'].values()))
+
+    if 'agreement' in first:
+        print('\nAgreement with the float .jit model')
+        print(f"{'backend':>10} {'max diff':>10} {'mean diff':>10} {'decisions':>10}")
+        for backend, result in measured.items():
+            agreement = result['agreement']
+            print(f"{backend:>10} {agreement['max_abs_diff']:10.4f} {agreement['mean_abs_diff']:10.5f} "
+                  f"{agreement['decision_agreement']:10.2%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark of the silero VAD backends')
+    parser.add_argument('--backends', nargs='+', default=BACKENDS, choices=BACKENDS)
+    parser.add_argument('--sampling-rate', type=int, default=16000, choices=[8000, 16000])
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=BATCH_SIZES)
+    parser.add_argument('--threads', nargs='+', type=int, default=THREADS)
+    parser.add_argument('--wavs', nargs='+', default=None, help='reference audio files or directories for the agreement check')
+    parser.add_argument('--latency-windows', type=int, default=2000)
+    parser.add_argument('--throughput-seconds', type=float, default=1.0)
+    parser.add_argument('--int8-path', default=None, help='where to export (or load) the int8 model')
+    parser.add_argument('--json', default=None, help='save the results to this file')
+    args = parser.parse_args(argv)
+
+    if args.sampling_rate == 8000 and 'onnx_op15' in args.backends:
+        args.backends = [backend for backend in args.backends if backend != 'onnx_op15']  # 16000 only model
+
+    reference_audios = _read_reference_audios(args.wavs, args.sampling_rate) if args.wavs else None
+    results = run_benchmark(args.backends, args.sampling_rate, args.batch_sizes, args.threads, reference_audios,
+                            args.latency_windows, args.throughput_seconds, args.int8_path)
+    print_results(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
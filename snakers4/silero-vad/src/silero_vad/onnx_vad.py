@@ -0,0 +1,141 @@
+import os
+import warnings
+import numpy as np
+
+
+def get_onnx_model_path(opset_version: int = 16) -> str:
+    """Path of the packaged ONNX model, resolved without importing torch"""
+    available_ops = [15, 16]
+    if opset_version not in available_ops:
+        raise Exception(f'Available ONNX opset_version: {available_ops}')
+    model_name = 'silero_vad.onnx' if opset_version == 16 else f'silero_vad_16k_op{opset_version}.onnx'
+    return os.path.join(os.path.dirname(__file__), 'data', model_name)
+
+
+class OnnxStreamingVAD():
+
+    def __init__(self,
+                 path: str = None,
+                 sampling_rate: int = 16000,
+                 batch_size: int = 1,
+                 force_onnx_cpu: bool = True,
+                 num_threads: int = 1):
+
+        """
+        Torch-free streaming counterpart of OnnxWrapper
+
+        State, context, model input and model outputs live in preallocated NumPy arrays
+        bound to the session via IOBinding, so a call performs no per-chunk allocations.
+
+        Parameters
+        ----------
+        path: str (default - packaged silero_vad.onnx)
+            Path to the ONNX model
+
+        sampling_rate: int (default - 16000)
+            8000 or 16000, fixed for the lifetime of the object
+
+        batch_size: int (default - 1)
+            Number of independent streams processed per call
+
+        force_onnx_cpu: bool (default - True)
+            Use CPUExecutionProvider even if other providers are available
+
+        num_threads: int (default - 1)
+            intra_op_num_threads of the session, more threads only pay off for large batches
+        """
+
+        import onnxruntime
+
+        path = str(path) if path is not None else get_onnx_model_path()
+
+        opts = onnxruntime.SessionOptions()
+        opts.inter_op_num_threads = 1
+        opts.intra_op_num_threads = num_threads
+
+        if force_onnx_cpu and 'CPUExecutionProvider' in onnxruntime.get_available_providers():
+            self.session = onnxruntime.InferenceSession(path, providers=['CPUExecutionProvider'], sess_options=opts)
+        else:
+            self.session = onnxruntime.InferenceSession(path, sess_options=opts)
+
+        if '16k' in path:
+            warnings.warn('This model support only 16000 sampling rate!')
+            self.sample_rates = [16000]
+        else:
+            self.sample_rates = [8000, 16000]
+
+        if sampling_rate not in self.sample_rates:
+            raise ValueError(f"Supported sampling rates: {self.sample_rates}")
+
+        self.sampling_rate = sampling_rate
+        self.num_samples = 512 if sampling_rate == 16000 else 256
+        self.context_size = 64 if sampling_rate == 16000 else 32
+        self._has_sr_input = 'sr' in [i.name for i in self.session.get_inputs()]
+        self._sr = np.array(sampling_rate, dtype=np.int64)
+        self.reset_states(batch_size)
+
+    def reset_states(self, batch_size: int = None):
+        if batch_size is None:
+            batch_size = self.batch_size
+        if getattr(self, 'batch_size', None) != batch_size:
+            self._allocate(batch_size)
+        self._input.fill(0)
+        self._state.fill(0)
+
+    def _allocate(self, batch_size: int):
+        from onnxruntime import OrtValue
+
+        self.batch_size = batch_size
+        # [context | new samples], the context part is refreshed in place after every call
+        self._input = np.zeros((batch_size, self.context_size + self.num_samples), dtype=np.float32)
+        self._state = np.zeros((2, batch_size, 128), dtype=np.float32)
+        self._out = np.zeros((batch_size, 1), dtype=np.float32)
+        self._state_out = np.zeros((2, batch_size, 128), dtype=np.float32)
+
+        self._binding = self.session.io_binding()
+        self._binding.bind_ortvalue_input('input', OrtValue.ortvalue_from_numpy(self._input))
+        self._binding.bind_ortvalue_input('state', OrtValue.ortvalue_from_numpy(self._state))
+        if self._has_sr_input:
+            self._binding.bind_ortvalue_input('sr', OrtValue.ortvalue_from_numpy(self._sr))
+        self._binding.bind_ortvalue_output('output', OrtValue.ortvalue_from_numpy(self._out))
+        self._binding.bind_ortvalue_output('stateN', OrtValue.ortvalue_from_numpy(self._state_out))
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        """
+        x: np.ndarray
+            float32 chunk of num_samples samples, shape (num_samples,) or (batch_size, num_samples)
+
+        Returns a (batch_size, 1) array of speech probabilities. The array is reused by the
+        next call, copy it if it has to be kept.
+        """
+        if x.shape[-1] != self.num_samples:
+            raise ValueError(f"Provided number of samples is {x.shape[-1]} (Supported values: 256 for 8000 sample rate, 512 for 16000)")
+
+        self._input[:, self.context_size:] = x
+        self.session.run_with_iobinding(self._binding)
+        np.copyto(self._state, self._state_out)
+        self._input[:, :self.context_size] = self._input[:, -self.context_size:]
+        return self._out
+
+    def audio_forward(self, x: np.ndarray) -> np.ndarray:
+        """
+        Speech probabilities of every window of a whole audio, shape (batch_size, num_windows)
+
+        x: np.ndarray
+            float32 audio of shape (num_samples_total,) or (batch_size, num_samples_total),
+            the last window is zero padded
+        """
+        if x.ndim == 1:
+            x = x[None, :]
+        self.reset_states(x.shape[0])
+
+        num_windows = -(-x.shape[1] // self.num_samples)
+        outs = np.empty((x.shape[0], num_windows), dtype=np.float32)
+        full_windows = x.shape[1] // self.num_samples
+        for i in range(full_windows):
+            outs[:, i] = self(x[:, i * self.num_samples:(i + 1) * self.num_samples])[:, 0]
+        if num_windows > full_windows:
+            last = np.zeros((x.shape[0], self.num_samples), dtype=np.float32)
+            last[:, :x.shape[1] - full_windows * self.num_samples] = x[:, full_windows * self.num_samples:]
+            outs[:, -1] = self(last)[:, 0]
+        return outs
@@ -1,6 +1,8 @@
 import torch
 import torchaudio
-from typing import Callable, List
+import numpy as np
+import math
+from typing import Callable, Iterable, Iterator, List, Sequence
 import warnings
 
 languages = ['ru', 'en', 'de', 'es']
@@ -164,6 +166,107 @@ def read_audio(path: str,
     return wav.squeeze(0)
 
 
+def read_audio_stream(path: str,
+                      sampling_rate: int = 16000,
+                      block_seconds: float = 30.0) -> Iterator[torch.Tensor]:
+    """
+    Generator counterpart of read_audio for recordings that do not fit in memory
+
+    The file is decoded block by block (soundfile if available and able to open the file, torchaudio.load
+    with frame_offset otherwise, e.g. for mp3 / m4a / opus on older libsndfile versions),
+    down-mixed to mono and resampled with a streaming resampler that gives the same samples as
+    resampling the whole file with torchaudio. Memory use does not depend on the file length.
+
+    Parameters
+    ----------
+    path: str
+        Path to the audio file
+
+    sampling_rate: int (default - 16000)
+        Sampling rate of the yielded audio
+
+    block_seconds: float (default - 30.0)
+        Approximate duration of one yielded block
+
+    Yields
+    ----------
+    block: torch.Tensor, one dimensional float32 audio
+    """
+    try:
+        import soundfile
+        with soundfile.SoundFile(path) as f:
+            orig_sr = f.samplerate
+    except (ImportError, RuntimeError):  # soundfile.LibsndfileError is a RuntimeError
+        soundfile = None
+        orig_sr = torchaudio.load(path, frame_offset=0, num_frames=1)[1]
+
+    resampler = _StreamingResampler(orig_sr, sampling_rate)
+    block_frames = resampler.block_frames(int(block_seconds * orig_sr))
+
+    if soundfile is not None:
+        blocks = (torch.from_numpy(block.mean(axis=1))
+                  for block in soundfile.blocks(path, blocksize=block_frames, dtype='float32', always_2d=True))
+    else:
+        blocks = _torchaudio_blocks(path, block_frames)
+
+    yield from resampler(blocks)
+
+
+def _torchaudio_blocks(path: str, block_frames: int) -> Iterator[torch.Tensor]:
+    offset = 0
+    while True:
+        wav, _ = torchaudio.load(path, frame_offset=offset, num_frames=block_frames)
+        if not wav.shape[1]:
+            return
+        yield wav.mean(dim=0)
+        offset += wav.shape[1]
+
+
+class _StreamingResampler():
+    """Block-wise torchaudio.functional.resample
+
+    Blocks are cut at multiples of the reduced input period, so each one is resampled together with enough
+    neighbouring input to cover the sinc kernel and its output is exactly the corresponding slice of the
+    whole-file result. Output of a block is yielded once the next input block has arrived.
+    """
+
+    def __init__(self, orig_freq: int, new_freq: int):
+        self.orig_freq = orig_freq
+        self.new_freq = new_freq
+        gcd = math.gcd(orig_freq, new_freq)
+        self.orig_step = orig_freq // gcd
+        self.new_step = new_freq // gcd
+        # kernel half width of torchaudio's sinc_interp_hann (lowpass_filter_width=6, rolloff=0.99)
+        width = math.ceil(6 * self.orig_step / (min(self.orig_step, self.new_step) * 0.99))
+        self.context = self.orig_step * (width // self.orig_step + 2)
+
+    def block_frames(self, frames: int) -> int:
+        """Block length rounded to a multiple of the input period, at least the kernel context"""
+        frames = max(frames, self.context)
+        return frames - frames % self.orig_step
+
+    def __call__(self, blocks: Iterable[torch.Tensor]) -> Iterator[torch.Tensor]:
+        if self.orig_freq == self.new_freq:
+            yield from blocks
+            return
+
+        history = torch.zeros(0)
+        current = None
+        for block in blocks:
+            if current is not None:
+                yield self._resample(history, current, block[:self.context])
+                history = torch.cat([history, current])[-self.context:]
+            current = block
+        if current is not None:
+            yield self._resample(history, current, torch.zeros(0))
+
+    def _resample(self, history: torch.Tensor, current: torch.Tensor, lookahead: torch.Tensor) -> torch.Tensor:
+        out = torchaudio.functional.resample(torch.cat([history, current, lookahead]), self.orig_freq, self.new_freq)
+        out_start = len(history) * self.new_step // self.orig_step
+        out_len = -(-len(current) * self.new_step // self.orig_step)
+        return out[out_start:out_start + out_len]
+
+
 def save_audio(path: str,
                tensor: torch.Tensor,
                sampling_rate: int = 16000):
@@ -307,64 +410,430 @@ def get_speech_timestamps(audio: torch.Tensor,
         if progress_tracking_callback:
             progress_tracking_callback(progress_percent)
 
-    triggered = False
-    speeches = []
-    current_speech = {}
+    if neg_threshold is None:
+        neg_threshold = max(threshold - 0.15, 0.01)
+
+    speeches = _segment_speech_probs(speech_probs, threshold, neg_threshold, window_size_samples,
+                                     min_speech_samples, max_speech_samples, min_silence_samples,
+                                     min_silence_samples_at_max_speech, audio_length_samples)
+    speeches = _pad_speech_timestamps(speeches, speech_pad_samples, audio_length_samples,
+                                      sampling_rate, step, return_seconds, time_resolution)
+
+    if visualize_probs:
+        make_visualization(speech_probs, window_size_samples / sampling_rate)
+
+    return speeches
+
+
+def get_speech_probs(audio: torch.Tensor,
+                     model,
+                     sampling_rate: int = 16000) -> np.ndarray:
+    """Speech probability of every window of a one dimensional audio as a float32 NumPy array
+
+    The whole audio is passed to the model's audio_forward (the window loop of the .jit model runs
+    inside TorchScript), so there is no per-window .item() call or Python bookkeeping.
+    """
+    from silero_vad.onnx_vad import OnnxStreamingVAD
+
+    if isinstance(model, OnnxStreamingVAD):
+        return model.audio_forward(audio.numpy())[0]
+    return model.audio_forward(audio.unsqueeze(0), sampling_rate)[0].numpy()
+
+
+@torch.no_grad()
+def get_speech_timestamps_fast(audio: torch.Tensor,
+                               model,
+                               threshold: float = 0.5,
+                               sampling_rate: int = 16000,
+                               min_speech_duration_ms: int = 250,
+                               max_speech_duration_s: float = float('inf'),
+                               min_silence_duration_ms: int = 100,
+                               speech_pad_ms: int = 30,
+                               return_seconds: bool = False,
+                               time_resolution: int = 1,
+                               visualize_probs: bool = False,
+                               progress_tracking_callback: Callable[[float], None] = None,
+                               neg_threshold: float = None,
+                               window_size_samples: int = 512,):
+
+    """
+    Drop-in replacement of get_speech_timestamps for long offline audios
+
+    Window probabilities are computed with get_speech_probs, the segmentation runs over the
+    resulting NumPy array (run-length encoded when max_speech_duration_s is not set).
+    Returns exactly the same timestamps as get_speech_timestamps for the same arguments,
+    progress_tracking_callback is only called once with 100 when the probabilities are ready.
+    """
+
+    if not torch.is_tensor(audio):
+        try:
+            audio = torch.Tensor(audio)
+        except:
+            raise TypeError("Audio cannot be casted to tensor. Cast it manually")
+
+    if len(audio.shape) > 1:
+        for i in range(len(audio.shape)):  # trying to squeeze empty dimensions
+            audio = audio.squeeze(0)
+        if len(audio.shape) > 1:
+            raise ValueError("More than one dimension in audio. Are you trying to process audio with 2 channels?")
+
+    if sampling_rate > 16000 and (sampling_rate % 16000 == 0):
+        step = sampling_rate // 16000
+        sampling_rate = 16000
+        audio = audio[::step]
+        warnings.warn('Sampling rate is a multiply of 16000, casting to 16000 manually!')
+    else:
+        step = 1
+
+    if sampling_rate not in [8000, 16000]:
+        raise ValueError("Currently silero VAD models support 8000 and 16000 (or multiply of 16000) sample rates")
+
+    window_size_samples = 512 if sampling_rate == 16000 else 256
+
+    min_speech_samples = sampling_rate * min_speech_duration_ms / 1000
+    speech_pad_samples = sampling_rate * speech_pad_ms / 1000
+    max_speech_samples = sampling_rate * max_speech_duration_s - window_size_samples - 2 * speech_pad_samples
+    min_silence_samples = sampling_rate * min_silence_duration_ms / 1000
+    min_silence_samples_at_max_speech = sampling_rate * 98 / 1000
+
+    audio_length_samples = len(audio)
+
+    # float64 so that comparisons with the thresholds match the Python floats of the reference implementation
+    speech_probs = get_speech_probs(audio, model, sampling_rate).astype(np.float64)
+    if progress_tracking_callback:
+        progress_tracking_callback(100.0)
 
     if neg_threshold is None:
         neg_threshold = max(threshold - 0.15, 0.01)
-    temp_end = 0  # to save potential segment end (and tolerate some silence)
-    prev_end = next_start = 0  # to save potential segment limits in case of maximum segment size reached
 
-    for i, speech_prob in enumerate(speech_probs):
-        if (speech_prob >= threshold) and temp_end:
-            temp_end = 0
-            if next_start < prev_end:
-                next_start = window_size_samples * i
-
-        if (speech_prob >= threshold) and not triggered:
-            triggered = True
-            current_speech['start'] = window_size_samples * i
-            continue
-
-        if triggered and (window_size_samples * i) - current_speech['start'] > max_speech_samples:
-            if prev_end:
-                current_speech['end'] = prev_end
-                speeches.append(current_speech)
-                current_speech = {}
-                if next_start < prev_end:  # previously reached silence (< neg_thres) and is still not speech (< thres)
-                    triggered = False
+    if max_speech_samples == float('inf') and neg_threshold <= threshold:
+        speeches = _segment_speech_runs(speech_probs, threshold, neg_threshold, window_size_samples,
+                                        min_speech_samples, min_silence_samples, audio_length_samples)
+    else:
+        speeches = _segment_speech_probs(speech_probs.tolist(), threshold, neg_threshold, window_size_samples,
+                                         min_speech_samples, max_speech_samples, min_silence_samples,
+                                         min_silence_samples_at_max_speech, audio_length_samples)
+    speeches = _pad_speech_timestamps(speeches, speech_pad_samples, audio_length_samples,
+                                      sampling_rate, step, return_seconds, time_resolution)
+
+    if visualize_probs:
+        make_visualization(speech_probs, window_size_samples / sampling_rate)
+
+    return speeches
+
+
+@torch.no_grad()
+def get_speech_timestamps_stream(audio_blocks: Iterable[torch.Tensor],
+                                 model,
+                                 threshold: float = 0.5,
+                                 sampling_rate: int = 16000,
+                                 min_speech_duration_ms: int = 250,
+                                 max_speech_duration_s: float = float('inf'),
+                                 min_silence_duration_ms: int = 100,
+                                 speech_pad_ms: int = 30,
+                                 return_seconds: bool = False,
+                                 time_resolution: int = 1,
+                                 neg_threshold: float = None) -> Iterator[dict]:
+
+    """
+    Streaming variant of get_speech_timestamps for recordings that do not fit in memory
+
+    Consumes consecutive one dimensional blocks of any length (e.g. from read_audio_stream) and yields
+    each speech chunk as soon as it is closed and its padding is known. Neither the audio nor the window
+    probabilities are kept, only the unfinished window and the currently open chunk.
+    The yielded chunks are the same as get_speech_timestamps would return for the concatenated audio.
+
+    Parameters are the same as for get_speech_timestamps, except
+
+    audio_blocks: iterable of torch.Tensor (or anything castable to it), one dimensional
+        Consecutive blocks of audio at sampling_rate
+
+    Yields
+    ----------
+    speech: dict
+        start and end of a speech chunk (samples or seconds based on return_seconds)
+    """
+
+    from silero_vad.onnx_vad import OnnxStreamingVAD
+
+    if sampling_rate > 16000 and (sampling_rate % 16000 == 0):
+        step = sampling_rate // 16000
+        sampling_rate = 16000
+        warnings.warn('Sampling rate is a multiply of 16000, casting to 16000 manually!')
+    else:
+        step = 1
+
+    if sampling_rate not in [8000, 16000]:
+        raise ValueError("Currently silero VAD models support 8000 and 16000 (or multiply of 16000) sample rates")
+
+    window_size_samples = 512 if sampling_rate == 16000 else 256
+
+    if isinstance(model, OnnxStreamingVAD):
+        def model_prob(chunk):
+            return float(model(chunk.numpy())[0, 0])
+    else:
+        def model_prob(chunk):
+            return model(chunk, sampling_rate).item()
+
+    model.reset_states()
+    min_speech_samples = sampling_rate * min_speech_duration_ms / 1000
+    speech_pad_samples = sampling_rate * speech_pad_ms / 1000
+    max_speech_samples = sampling_rate * max_speech_duration_s - window_size_samples - 2 * speech_pad_samples
+    min_silence_samples = sampling_rate * min_silence_duration_ms / 1000
+    min_silence_samples_at_max_speech = sampling_rate * 98 / 1000
+
+    if neg_threshold is None:
+        neg_threshold = max(threshold - 0.15, 0.01)
+
+    segmenter = _SpeechSegmenter(threshold, neg_threshold, window_size_samples, min_speech_samples,
+                                 max_speech_samples, min_silence_samples, min_silence_samples_at_max_speech)
+
+    pending = None  # last closed chunk, its start is padded but its end depends on the next chunk
+    ready = []  # padded chunks, in seconds mode waiting until rounding cannot exceed the audio length
+    remainder = torch.zeros(0)
+    input_samples = 0  # samples received at the original sampling rate, to keep the decimation phase
+    audio_length_samples = 0
+
+    def close(speeches):
+        nonlocal pending
+        for speech in speeches:
+            if pending is not None:
+                silence_duration = speech['start'] - pending['end']
+                if silence_duration < 2 * speech_pad_samples:
+                    pending['end'] += int(silence_duration // 2)
+                    speech['start'] = int(max(0, speech['start'] - silence_duration // 2))
                 else:
-                    current_speech['start'] = next_start
-                prev_end = next_start = temp_end = 0
+                    pending['end'] = int(pending['end'] + speech_pad_samples)
+                    speech['start'] = int(max(0, speech['start'] - speech_pad_samples))
+                ready.append(pending)
             else:
-                current_speech['end'] = window_size_samples * i
-                speeches.append(current_speech)
-                current_speech = {}
-                prev_end = next_start = temp_end = 0
-                triggered = False
-                continue
+                speech['start'] = int(max(0, speech['start'] - speech_pad_samples))
+            pending = speech
+
+    def emit(final):
+        while ready and (final or not return_seconds or
+                         round(ready[0]['end'] / sampling_rate, time_resolution) <= audio_length_samples / sampling_rate):
+            yield _convert_speech_timestamp(ready.pop(0), audio_length_samples, sampling_rate, step,
+                                            return_seconds, time_resolution)
+
+    for block in audio_blocks:
+        if not torch.is_tensor(block):
+            block = torch.as_tensor(block)
+        block = block.float().reshape(-1)
+        if step > 1:
+            phase = (-input_samples) % step
+            input_samples += len(block)
+            block = block[phase::step]
+
+        audio = torch.cat([remainder, block])
+        num_windows = len(audio) // window_size_samples
+        audio_length_samples += num_windows * window_size_samples
+        speech_probs = [model_prob(audio[i * window_size_samples:(i + 1) * window_size_samples])
+                        for i in range(num_windows)]
+        remainder = audio[num_windows * window_size_samples:].clone()
+        close(segmenter.process(speech_probs))
+
+        # no later chunk can start before this point, so once it is far enough the padding of the pending chunk is final
+        if pending is not None:
+            next_start = segmenter.current_speech['start'] if segmenter.triggered else audio_length_samples
+            if next_start - pending['end'] >= 2 * speech_pad_samples:
+                pending['end'] = int(pending['end'] + speech_pad_samples)
+                ready.append(pending)
+                pending = None
+        yield from emit(final=False)
+
+    if len(remainder):
+        audio_length_samples += len(remainder)
+        chunk = torch.nn.functional.pad(remainder, (0, int(window_size_samples - len(remainder))))
+        close(segmenter.process([model_prob(chunk)]))
+    close(segmenter.flush(audio_length_samples))
+
+    if pending is not None:
+        pending['end'] = int(min(audio_length_samples, pending['end'] + speech_pad_samples))
+        ready.append(pending)
+    yield from emit(final=True)
+
+
+def _segment_speech_runs(speech_probs: np.ndarray,
+                         threshold: float,
+                         neg_threshold: float,
+                         window_size_samples: int,
+                         min_speech_samples: float,
+                         min_silence_samples: float,
+                         audio_length_samples: int) -> List[dict]:
+    """Same result as _segment_speech_probs without a maximum speech duration, iterating over
+    runs of speech / silence / undecided windows instead of single windows
+    """
+    # 1 - speech (>= threshold), -1 - silence (< neg_threshold), 0 - undecided
+    if not len(speech_probs):
+        return []
+    classes = np.where(speech_probs >= threshold, 1, np.where(speech_probs < neg_threshold, -1, 0))
+    run_starts = np.flatnonzero(np.diff(classes, prepend=classes[0] - 1))
+    run_ends = np.append(run_starts[1:], len(classes))
 
-        if (speech_prob < neg_threshold) and triggered:
+    triggered = False
+    speeches = []
+    start = 0
+    temp_end = 0
+
+    for run_start, run_end, cls in zip(run_starts.tolist(), run_ends.tolist(), classes[run_starts].tolist()):
+        if cls == 1:
+            if not triggered:
+                triggered = True
+                start = window_size_samples * run_start
+            temp_end = 0
+        elif cls == -1 and triggered:
             if not temp_end:
-                temp_end = window_size_samples * i
-            if ((window_size_samples * i) - temp_end) > min_silence_samples_at_max_speech:  # condition to avoid cutting in very short silence
-                prev_end = temp_end
-            if (window_size_samples * i) - temp_end < min_silence_samples:
-                continue
-            else:
-                current_speech['end'] = temp_end
-                if (current_speech['end'] - current_speech['start']) > min_speech_samples:
-                    speeches.append(current_speech)
-                current_speech = {}
-                prev_end = next_start = temp_end = 0
+                temp_end = window_size_samples * run_start
+            # first window of the run where the silence is long enough to close the chunk
+            close = max(run_start, int(math.ceil((temp_end + min_silence_samples) / window_size_samples)))
+            while close > run_start and (window_size_samples * (close - 1)) - temp_end >= min_silence_samples:
+                close -= 1
+            while (window_size_samples * close) - temp_end < min_silence_samples:
+                close += 1
+            if close < run_end:
+                if (temp_end - start) > min_speech_samples:
+                    speeches.append({'start': start, 'end': temp_end})
+                temp_end = 0
                 triggered = False
+
+    if triggered and (audio_length_samples - start) > min_speech_samples:
+        speeches.append({'start': start, 'end': audio_length_samples})
+
+    return speeches
+
+
+def _segment_speech_probs(speech_probs,
+                          threshold: float,
+                          neg_threshold: float,
+                          window_size_samples: int,
+                          min_speech_samples: float,
+                          max_speech_samples: float,
+                          min_silence_samples: float,
+                          min_silence_samples_at_max_speech: float,
+                          audio_length_samples: int) -> List[dict]:
+    """Hysteresis state machine turning per-window speech probabilities into unpadded speech chunks
+    """
+    segmenter = _SpeechSegmenter(threshold, neg_threshold, window_size_samples, min_speech_samples,
+                                 max_speech_samples, min_silence_samples, min_silence_samples_at_max_speech)
+    return segmenter.process(speech_probs) + segmenter.flush(audio_length_samples)
+
+
+class _SpeechSegmenter():
+    """Incremental form of the get_speech_timestamps state machine, fed with consecutive blocks of
+    window probabilities. Chunks are returned (unpadded) by the call that closes them.
+    """
+
+    def __init__(self,
+                 threshold: float,
+                 neg_threshold: float,
+                 window_size_samples: int,
+                 min_speech_samples: float,
+                 max_speech_samples: float,
+                 min_silence_samples: float,
+                 min_silence_samples_at_max_speech: float):
+        self.threshold = threshold
+        self.neg_threshold = neg_threshold
+        self.window_size_samples = window_size_samples
+        self.min_speech_samples = min_speech_samples
+        self.max_speech_samples = max_speech_samples
+        self.min_silence_samples = min_silence_samples
+        self.min_silence_samples_at_max_speech = min_silence_samples_at_max_speech
+
+        self.num_windows = 0
+        self.triggered = False
+        self.current_speech = {}
+        self.temp_end = 0  # to save potential segment end (and tolerate some silence)
+        self.prev_end = self.next_start = 0  # to save potential segment limits in case of maximum segment size reached
+
+    def process(self, speech_probs) -> List[dict]:
+        threshold = self.threshold
+        neg_threshold = self.neg_threshold
+        window_size_samples = self.window_size_samples
+        min_speech_samples = self.min_speech_samples
+        max_speech_samples = self.max_speech_samples
+        min_silence_samples = self.min_silence_samples
+        min_silence_samples_at_max_speech = self.min_silence_samples_at_max_speech
+
+        triggered = self.triggered
+        current_speech = self.current_speech
+        temp_end = self.temp_end
+        prev_end, next_start = self.prev_end, self.next_start
+        speeches = []
+
+        for i, speech_prob in enumerate(speech_probs, self.num_windows):
+            if (speech_prob >= threshold) and temp_end:
+                temp_end = 0
+                if next_start < prev_end:
+                    next_start = window_size_samples * i
+
+            if (speech_prob >= threshold) and not triggered:
+                triggered = True
+                current_speech['start'] = window_size_samples * i
                 continue
 
-    if current_speech and (audio_length_samples - current_speech['start']) > min_speech_samples:
-        current_speech['end'] = audio_length_samples
-        speeches.append(current_speech)
+            if triggered and (window_size_samples * i) - current_speech['start'] > max_speech_samples:
+                if prev_end:
+                    current_speech['end'] = prev_end
+                    speeches.append(current_speech)
+                    current_speech = {}
+                    if next_start < prev_end:  # previously reached silence (< neg_thres) and is still not speech (< thres)
+                        triggered = False
+                    else:
+                        current_speech['start'] = next_start
+                    prev_end = next_start = temp_end = 0
+                else:
+                    current_speech['end'] = window_size_samples * i
+                    speeches.append(current_speech)
+                    current_speech = {}
+                    prev_end = next_start = temp_end = 0
+                    triggered = False
+                    continue
+
+            if (speech_prob < neg_threshold) and triggered:
+                if not temp_end:
+                    temp_end = window_size_samples * i
+                if ((window_size_samples * i) - temp_end) > min_silence_samples_at_max_speech:  # condition to avoid cutting in very short silence
+                    prev_end = temp_end
+                if (window_size_samples * i) - temp_end < min_silence_samples:
+                    continue
+                else:
+                    current_speech['end'] = temp_end
+                    if (current_speech['end'] - current_speech['start']) > min_speech_samples:
+                        speeches.append(current_speech)
+                    current_speech = {}
+                    prev_end = next_start = temp_end = 0
+                    triggered = False
+                    continue
+
+        self.num_windows += len(speech_probs)
+        self.triggered = triggered
+        self.current_speech = current_speech
+        self.temp_end = temp_end
+        self.prev_end, self.next_start = prev_end, next_start
+        return speeches
+
+    def flush(self, audio_length_samples: int) -> List[dict]:
+        """Close the chunk still open at the end of the audio"""
+        speeches = []
+        current_speech = self.current_speech
+        if current_speech and (audio_length_samples - current_speech['start']) > self.min_speech_samples:
+            current_speech['end'] = audio_length_samples
+            speeches.append(current_speech)
+        self.current_speech = {}
+        self.triggered = False
+        return speeches
+
 
+def _pad_speech_timestamps(speeches: List[dict],
+                           speech_pad_samples: float,
+                           audio_length_samples: int,
+                           sampling_rate: int,
+                           step: int,
+                           return_seconds: bool,
+                           time_resolution: int) -> List[dict]:
+    """Pad speech chunks by speech_pad_samples and convert them to the requested units
+    """
     for i, speech in enumerate(speeches):
         if i == 0:
             speech['start'] = int(max(0, speech['start'] - speech_pad_samples))
@@ -379,20 +848,27 @@ def get_speech_timestamps(audio: torch.Tensor,
         else:
             speech['end'] = int(min(audio_length_samples, speech['end'] + speech_pad_samples))
 
+    for speech_dict in speeches:
+        _convert_speech_timestamp(speech_dict, audio_length_samples, sampling_rate, step,
+                                  return_seconds, time_resolution)
+
+    return speeches
+
+
+def _convert_speech_timestamp(speech_dict: dict,
+                              audio_length_samples: int,
+                              sampling_rate: int,
+                              step: int,
+                              return_seconds: bool,
+                              time_resolution: int) -> dict:
     if return_seconds:
         audio_length_seconds = audio_length_samples / sampling_rate
-        for speech_dict in speeches:
-            speech_dict['start'] = max(round(speech_dict['start'] / sampling_rate, time_resolution), 0)
-            speech_dict['end'] = min(round(speech_dict['end'] / sampling_rate, time_resolution), audio_length_seconds)
+        speech_dict['start'] = max(round(speech_dict['start'] / sampling_rate, time_resolution), 0)
+        speech_dict['end'] = min(round(speech_dict['end'] / sampling_rate, time_resolution), audio_length_seconds)
     elif step > 1:
-        for speech_dict in speeches:
-            speech_dict['start'] *= step
-            speech_dict['end'] *= step
-
-    if visualize_probs:
-        make_visualization(speech_probs, window_size_samples / sampling_rate)
-
-    return speeches
+        speech_dict['start'] *= step
+        speech_dict['end'] *= step
+    return speech_dict
 
 
 class VADIterator:
@@ -489,10 +965,206 @@ class VADIterator:
         return None
 
 
+class BatchedVADIterator:
+    def __init__(self,
+                 model,
+                 threshold: float = 0.5,
+                 sampling_rate: int = 16000,
+                 min_silence_duration_ms: int = 100,
+                 speech_pad_ms: int = 30
+                 ):
+
+        """
+        Class for stream imitation over many independent streams at once
+
+        All attached streams are advanced with a single batched model call per window,
+        the start/end hysteresis of VADIterator is evaluated with tensor ops for all streams.
+        Streams can be attached and detached at any time without resetting the others.
+
+        Parameters
+        ----------
+        model: preloaded .jit/.onnx silero VAD model (exposing _state / _context like OnnxWrapper)
+
+        threshold: float (default - 0.5)
+            Speech threshold. Silero VAD outputs speech probabilities for each audio chunk, probabilities ABOVE this value are considered as SPEECH.
+
+        sampling_rate: int (default - 16000)
+            Currently silero VAD models support 8000 and 16000 sample rates
+
+        min_silence_duration_ms: int (default - 100 milliseconds)
+            In the end of each speech chunk wait for min_silence_duration_ms before separating it
+
+        speech_pad_ms: int (default - 30 milliseconds)
+            Final speech chunks are padded by speech_pad_ms each side
+        """
+
+        self.model = model
+        self.threshold = threshold
+        self.sampling_rate = sampling_rate
+
+        if sampling_rate not in [8000, 16000]:
+            raise ValueError('BatchedVADIterator does not support sampling rates other than [8000, 16000]')
+
+        self.window_size_samples = 512 if sampling_rate == 16000 else 256
+        self.context_size = 64 if sampling_rate == 16000 else 32
+        self.min_silence_samples = sampling_rate * min_silence_duration_ms / 1000
+        self.speech_pad_samples = sampling_rate * speech_pad_ms / 1000
+
+        self.stream_ids = []
+        self._state = torch.zeros((2, 0, 128))
+        self._context = torch.zeros((0, self.context_size))
+        self.triggered = torch.zeros(0, dtype=torch.bool)
+        self.temp_end = torch.zeros(0, dtype=torch.long)
+        self.current_sample = torch.zeros(0, dtype=torch.long)
+
+    @property
+    def num_streams(self):
+        return len(self.stream_ids)
+
+    def attach(self, stream_id):
+        """Add a new stream with fresh model state"""
+        if stream_id in self.stream_ids:
+            raise ValueError(f'Stream {stream_id} is already attached')
+        self.stream_ids.append(stream_id)
+        self._state = torch.cat([self._state, torch.zeros((2, 1, 128))], dim=1)
+        self._context = torch.cat([self._context, torch.zeros((1, self.context_size))], dim=0)
+        self.triggered = torch.cat([self.triggered, torch.zeros(1, dtype=torch.bool)])
+        self.temp_end = torch.cat([self.temp_end, torch.zeros(1, dtype=torch.long)])
+        self.current_sample = torch.cat([self.current_sample, torch.zeros(1, dtype=torch.long)])
+
+    def detach(self, stream_id):
+        """Remove a stream, the state of the other streams is kept"""
+        idx = self.stream_ids.index(stream_id)
+        del self.stream_ids[idx]
+        keep = torch.tensor([i for i in range(len(self.stream_ids) + 1) if i != idx], dtype=torch.long)
+        self._state = self._state[:, keep]
+        self._context = self._context[keep]
+        self.triggered = self.triggered[keep]
+        self.temp_end = self.temp_end[keep]
+        self.current_sample = self.current_sample[keep]
+
+    def reset_states(self):
+        """Reset all attached streams"""
+        self._state.zero_()
+        self._context.zero_()
+        self.triggered.zero_()
+        self.temp_end.zero_()
+        self.current_sample.zero_()
+
+    @torch.no_grad()
+    def __call__(self, x, return_seconds=False, time_resolution: int = 1):
+        """
+        x: torch.Tensor
+            audio chunks of shape (num_streams, window_size_samples), rows ordered as self.stream_ids
+
+        return_seconds: bool (default - False)
+            whether return timestamps in seconds (default - samples)
+
+        time_resolution: int (default - 1)
+            time resolution of speech coordinates when requested as seconds
+
+        Returns
+        ----------
+        events: dict
+            {stream_id: {'start': ...} or {'end': ...}} for the streams that produced an event
+        """
+
+        if not torch.is_tensor(x):
+            try:
+                x = torch.Tensor(x)
+            except:
+                raise TypeError("Audio cannot be casted to tensor. Cast it manually")
+
+        if x.dim() != 2 or x.shape[0] != self.num_streams:
+            raise ValueError(f"Expected input of shape ({self.num_streams}, {self.window_size_samples}), got {tuple(x.shape)}")
+        if not self.num_streams:
+            return {}
+
+        # run all streams through the model in one call, carrying per-stream state
+        self.model._state = self._state
+        self.model._context = self._context
+        self.model._last_sr = self.sampling_rate
+        self.model._last_batch_size = self.num_streams
+        speech_probs = self.model(x, self.sampling_rate).squeeze(1)
+        self._state = self.model._state
+        self._context = self.model._context
+
+        window_size_samples = x.shape[1]
+        self.current_sample += window_size_samples
+
+        is_speech = speech_probs >= self.threshold
+        self.temp_end[is_speech] = 0
+
+        starts = is_speech & ~self.triggered
+        self.triggered |= starts
+
+        is_silence = (speech_probs < self.threshold - 0.15) & self.triggered
+        new_temp_end = is_silence & (self.temp_end == 0)
+        self.temp_end[new_temp_end] = self.current_sample[new_temp_end]
+        ends = is_silence & (self.current_sample - self.temp_end >= self.min_silence_samples)
+
+        speech_start = torch.clamp(self.current_sample - self.speech_pad_samples - window_size_samples, min=0)
+        speech_end = self.temp_end + self.speech_pad_samples - window_size_samples
+        self.temp_end[ends] = 0
+        self.triggered[ends] = False
+
+        events = {}
+        for i in torch.nonzero(starts | ends).flatten().tolist():
+            key, value = ('start', speech_start[i].item()) if starts[i] else ('end', speech_end[i].item())
+            events[self.stream_ids[i]] = {key: int(value) if not return_seconds else round(value / self.sampling_rate, time_resolution)}
+        return events
+
+
+class ChunkViews(Sequence):
+    """Lazy sequence of audio chunks, every item is a view into the original audio (no samples are copied)
+
+    Returned by collect_chunks / drop_chunks with lazy=True. Chunk bounds are kept as two int64 arrays
+    with python slicing semantics, so thousands of chunks cut from a long recording cost a few bytes each
+    until they are accessed.
+    """
+
+    def __init__(self, wav, starts: np.ndarray, ends: np.ndarray):
+        self.wav = wav
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return ChunkViews(self.wav, self.starts[idx], self.ends[idx])
+        return self.wav[int(self.starts[idx]):int(self.ends[idx])]
+
+    @property
+    def num_samples(self) -> int:
+        """Total length of the chunks in samples"""
+        num_samples = len(self.wav)
+        starts = np.clip(np.where(self.starts < 0, self.starts + num_samples, self.starts), 0, num_samples)
+        ends = np.clip(np.where(self.ends < 0, self.ends + num_samples, self.ends), 0, num_samples)
+        return int(np.maximum(ends - starts, 0).sum())
+
+    def gather(self):
+        """All chunks concatenated into one array of the same type as the audio, the only copy made"""
+        if not len(self):
+            return self.wav[:0]
+        if isinstance(self.wav, np.ndarray):
+            return np.concatenate(list(self))
+        return torch.cat(list(self))
+
+
+def _chunk_bounds(tss: List[dict]):
+    """Start / end arrays of the coordinate list"""
+    starts = np.fromiter((ts['start'] for ts in tss), dtype=np.int64, count=len(tss))
+    ends = np.fromiter((ts['end'] for ts in tss), dtype=np.int64, count=len(tss))
+    return starts, ends
+
+
 def collect_chunks(tss: List[dict],
                    wav: torch.Tensor,
                    seconds: bool = False,
-                   sampling_rate: int = None) -> torch.Tensor:
+                   sampling_rate: int = None,
+                   lazy: bool = False) -> torch.Tensor:
     """Collect audio chunks from a longer audio clip
 
     This method extracts audio chunks from an audio clip, using a list of
@@ -500,22 +1172,28 @@ def collect_chunks(tss: List[dict],
     passed either as sample numbers or in seconds, in which case the audio
     sampling rate is also needed.
 
+    The chunk bounds are computed once as arrays and the result is a single
+    concatenation of views into wav, lazy=True skips even that copy.
+
     Parameters
     ----------
     tss: List[dict]
         Coordinate list of the clips to collect from the audio.
-    wav: torch.Tensor, one dimensional
-        One dimensional float torch.Tensor, containing the audio to clip.
+    wav: torch.Tensor or np.ndarray, one dimensional
+        One dimensional float torch.Tensor (or numpy array), containing the audio to clip.
     seconds: bool (default - False)
         Whether input coordinates are passed as seconds or samples.
     sampling_rate: int (default - None)
         Input audio sampling rate. Required if seconds is True.
+    lazy: bool (default - False)
+        Return a ChunkViews sequence of views into wav instead of the
+        concatenated audio, nothing is copied.
 
     Returns
     -------
     torch.Tensor, one dimensional
         One dimensional float torch.Tensor of the concatenated clipped audio
-        chunks.
+        chunks (the same type as wav), or ChunkViews if lazy is True.
 
     Raises
     ------
@@ -526,19 +1204,17 @@ def collect_chunks(tss: List[dict],
     if seconds and not sampling_rate:
         raise ValueError('sampling_rate must be provided when seconds is True')
 
-    chunks = list()
     _tss = _seconds_to_samples_tss(tss, sampling_rate) if seconds else tss
+    chunks = ChunkViews(wav, *_chunk_bounds(_tss))
 
-    for i in _tss:
-        chunks.append(wav[i['start']:i['end']])
-
-    return torch.cat(chunks)
+    return chunks if lazy else chunks.gather()
 
 
 def drop_chunks(tss: List[dict],
                 wav: torch.Tensor,
                 seconds: bool = False,
-                sampling_rate: int = None) -> torch.Tensor:
+                sampling_rate: int = None,
+                lazy: bool = False) -> torch.Tensor:
     """Drop audio chunks from a longer audio clip
 
     This method extracts audio chunks from an audio clip, using a list of
@@ -546,22 +1222,28 @@ def drop_chunks(tss: List[dict],
     sample numbers or in seconds, in which case the audio sampling rate is also
     needed.
 
+    The bounds of the kept parts are computed once as arrays and the result is
+    a single concatenation of views into wav, lazy=True skips even that copy.
+
     Parameters
     ----------
     tss: List[dict]
         Coordinate list of the clips to drop from from the audio.
-    wav: torch.Tensor, one dimensional
-        One dimensional float torch.Tensor, containing the audio to clip.
+    wav: torch.Tensor or np.ndarray, one dimensional
+        One dimensional float torch.Tensor (or numpy array), containing the audio to clip.
     seconds: bool (default - False)
         Whether input coordinates are passed as seconds or samples.
     sampling_rate: int (default - None)
         Input audio sampling rate. Required if seconds is True.
+    lazy: bool (default - False)
+        Return a ChunkViews sequence of views into wav (the gaps between
+        the dropped chunks) instead of the concatenated audio, nothing is copied.
 
     Returns
     -------
     torch.Tensor, one dimensional
         One dimensional float torch.Tensor of the input audio minus the dropped
-        chunks.
+        chunks (the same type as wav), or ChunkViews if lazy is True.
 
     Raises
     ------
@@ -572,16 +1254,12 @@ def drop_chunks(tss: List[dict],
     if seconds and not sampling_rate:
         raise ValueError('sampling_rate must be provided when seconds is True')
 
-    chunks = list()
-    cur_start = 0
-
     _tss = _seconds_to_samples_tss(tss, sampling_rate) if seconds else tss
+    starts, ends = _chunk_bounds(_tss)
+    # kept parts are the gaps before every dropped chunk, audio after the last chunk is not kept
+    chunks = ChunkViews(wav, np.concatenate(([0], ends))[:-1], starts)
 
-    for i in _tss:
-        chunks.append((wav[cur_start: i['start']]))
-        cur_start = i['end']
-
-    return torch.cat(chunks)
+    return chunks if lazy else chunks.gather()
 
 
 def _seconds_to_samples_tss(tss: List[dict], sampling_rate: int) -> List[dict]:
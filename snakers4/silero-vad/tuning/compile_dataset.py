@@ -0,0 +1,13 @@
+from utils import SileroVadDataset
+from omegaconf import OmegaConf
+
+
+if __name__ == '__main__':
+    config = OmegaConf.load('config.yml')
+
+    if not config.get('compiled_dataset_dir', ''):
+        raise ValueError('Set compiled_dataset_dir in config.yml')
+
+    for mode in ['train', 'val']:
+        SileroVadDataset(config, mode=mode)
+    print('Done')
@@ -30,7 +30,11 @@ if __name__ == '__main__':
     model.to(config.device)
 
     print('Making predicts...')
-    all_predicts, all_gts = predict(model, loader, config.device, sr=8000 if config.tune_8k else 16000)
+    predictions = predict(model, loader, config.device, sr=8000 if config.tune_8k else 16000,
+                          spill_dir=config.get('predictions_spill_dir', '') or None)
     print('Calculating thresholds...')
-    best_ths_enter, best_ths_exit, best_acc = calculate_best_thresholds(all_predicts, all_gts)
+    best_ths_enter, best_ths_exit, best_acc = calculate_best_thresholds(predictions,
+                                                                        num_steps=config.get('ths_search_steps', 20),
+                                                                        refine_iterations=config.get('ths_refine_iterations', 0),
+                                                                        num_workers=config.get('ths_search_workers', 0))
     print(f'Best threshold: {best_ths_enter}\nBest exit threshold: {best_ths_exit}\nBest accuracy: {best_acc}')
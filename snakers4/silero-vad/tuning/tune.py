@@ -1,4 +1,5 @@
-from utils import SileroVadDataset, SileroVadPadder, VADDecoderRNNJIT, train, validate, init_jit_model
+from utils import SileroVadDataset, SileroVadPadder, VADDecoderRNNJIT, train, validate, init_jit_model, \
+                  build_features_cache, CachedFeaturesDataset, CachedFeaturesPadder, train_cached, validate_cached
 from omegaconf import OmegaConf
 import torch.nn as nn
 import torch
@@ -7,18 +8,6 @@ import torch
 if __name__ == '__main__':
     config = OmegaConf.load('config.yml')
 
-    train_dataset = SileroVadDataset(config, mode='train')
-    train_loader = torch.utils.data.DataLoader(train_dataset,
-                                               batch_size=config.batch_size,
-                                               collate_fn=SileroVadPadder,
-                                               num_workers=config.num_workers)
-
-    val_dataset = SileroVadDataset(config, mode='val')
-    val_loader = torch.utils.data.DataLoader(val_dataset,
-                                             batch_size=config.batch_size,
-                                             collate_fn=SileroVadPadder,
-                                             num_workers=config.num_workers)
-
     if config.jit_model_path:
         print(f'Loading model from the local folder: {config.jit_model_path}')
         model = init_jit_model(config.jit_model_path, device=config.device)
@@ -36,6 +25,48 @@ if __name__ == '__main__':
 
     print('Model loaded')
     model.to(config.device)
+
+    cache_features = config.get('cache_encoder_features', False)
+    if cache_features:
+        # the encoder is frozen: its outputs for the validation set and the non-augmented training samples
+        # are computed once, only the augmented share of every epoch goes through the encoder
+        train_cache = build_features_cache(config, 'train', model, config.device)
+        val_cache = build_features_cache(config, 'val', model, config.device)
+
+        train_dataset = CachedFeaturesDataset(*train_cache)
+        num_augmented = int(round(len(train_dataset) * config.aug_prob))
+        sampler = torch.utils.data.RandomSampler(train_dataset, replacement=True,
+                                                 num_samples=max(1, len(train_dataset) - num_augmented))
+        train_loader = torch.utils.data.DataLoader(train_dataset,
+                                                   batch_size=config.batch_size,
+                                                   sampler=sampler,
+                                                   collate_fn=CachedFeaturesPadder,
+                                                   num_workers=config.num_workers)
+        if num_augmented:
+            aug_dataset = torch.utils.data.Subset(SileroVadDataset(config, mode='train', aug_prob=1.0),
+                                                  range(num_augmented))
+            aug_loader = torch.utils.data.DataLoader(aug_dataset,
+                                                     batch_size=config.batch_size,
+                                                     collate_fn=SileroVadPadder,
+                                                     num_workers=config.num_workers)
+
+        val_loader = torch.utils.data.DataLoader(CachedFeaturesDataset(*val_cache),
+                                                 batch_size=config.batch_size,
+                                                 collate_fn=CachedFeaturesPadder,
+                                                 num_workers=config.num_workers)
+    else:
+        train_dataset = SileroVadDataset(config, mode='train')
+        train_loader = torch.utils.data.DataLoader(train_dataset,
+                                                   batch_size=config.batch_size,
+                                                   collate_fn=SileroVadPadder,
+                                                   num_workers=config.num_workers)
+
+        val_dataset = SileroVadDataset(config, mode='val')
+        val_loader = torch.utils.data.DataLoader(val_dataset,
+                                                 batch_size=config.batch_size,
+                                                 collate_fn=SileroVadPadder,
+                                                 num_workers=config.num_workers)
+
     decoder = VADDecoderRNNJIT().to(config.device)
     decoder.load_state_dict(model._model_8k.decoder.state_dict() if config.tune_8k else model._model.decoder.state_dict())
     decoder.train()
@@ -47,8 +78,15 @@ if __name__ == '__main__':
     best_val_roc = 0
     for i in range(config.num_epochs):
         print(f'Starting epoch {i + 1}')
-        train_loss = train(config, train_loader, model, decoder, criterion, optimizer, config.device)
-        val_loss, val_roc = validate(config, val_loader, model, decoder, criterion, config.device)
+        if cache_features:
+            train_loss = train_cached(train_loader, decoder, criterion, optimizer, config.device)
+            if num_augmented:
+                aug_loss = train(config, aug_loader, model, decoder, criterion, optimizer, config.device)
+                train_loss = (train_loss * len(sampler) + aug_loss * num_augmented) / (len(sampler) + num_augmented)
+            val_loss, val_roc = validate_cached(val_loader, decoder, criterion, config.device)
+        else:
+            train_loss = train(config, train_loader, model, decoder, criterion, optimizer, config.device)
+            val_loss, val_roc = validate(config, val_loader, model, decoder, criterion, config.device)
         print(f'Metrics after epoch {i + 1}:\n'
               f'\tTrain loss: {round(train_loss, 3)}\n',
               f'\tValidation loss: {round(val_loss, 3)}\n'
@@ -1,4 +1,5 @@
-from sklearn.metrics import roc_auc_score, accuracy_score
+from sklearn.metrics import roc_auc_score
+from concurrent.futures import ProcessPoolExecutor
 from torch.utils.data import Dataset
 import torch.nn as nn
 from tqdm import tqdm
@@ -9,6 +10,8 @@ import warnings
 import random
 import torch
 import gc
+import os
+import math
 warnings.filterwarnings('ignore')
 
 
@@ -60,7 +63,9 @@ def build_audiomentations_augs(p):
 class SileroVadDataset(Dataset):
     def __init__(self,
                  config,
-                 mode='train'):
+                 mode='train',
+                 aug_prob=None,
+                 deterministic=False):
 
         self.num_samples = 512  # constant, do not change
         self.sr = 16000  # constant, do not change
@@ -79,17 +84,33 @@ class SileroVadDataset(Dataset):
         self.mode = mode
         print(f'DATASET SIZE : {len(self.dataframe)}')
 
-        if mode == 'train':
-            self.augs = build_audiomentations_augs(p=config.aug_prob)
+        # deterministic - items by index and without augmentations, e.g. for the encoder features cache
+        self.deterministic = deterministic
+        if mode == 'train' and not deterministic:
+            self.augs = build_audiomentations_augs(p=config.aug_prob if aug_prob is None else aug_prob)
         else:
             self.augs = None
 
+        if self.resample_to_8k:
+            self.resample_8k = torchaudio.transforms.Resample(orig_freq=self.sr, new_freq=8000)
+
+        self.compiled = None
+        self.compiled_arrays = None
+        if config.get('compiled_dataset_dir', ''):
+            self.compiled = compile_dataset(self, dataset_path, config.compiled_dataset_dir,
+                                            with_8k=self.resample_to_8k, num_workers=config.num_workers)
+
     def __getitem__(self, idx):
-        idx = None if self.mode == 'train' else idx
+        idx = None if self.mode == 'train' and not self.deterministic else idx
+        if self.mode == 'val' and self.resample_to_8k and self.compiled is not None:
+            wav, gt, mask = self.load_compiled_sample(idx, sampling_rate=8000)
+            return torch.from_numpy(wav), torch.FloatTensor(gt), torch.from_numpy(mask)
+
         wav, gt, mask = self.load_speech_sample(idx)
 
         if self.mode == 'train':
-            wav = self.add_augs(wav)
+            if self.augs is not None:
+                wav = self.add_augs(wav)
             if len(wav) > self.max_train_length_samples:
                 wav = wav[:self.max_train_length_samples]
                 gt = gt[:int(self.max_train_length_samples / self.num_samples)]
@@ -97,9 +118,7 @@ class SileroVadDataset(Dataset):
 
         wav = torch.FloatTensor(wav)
         if self.resample_to_8k:
-            transform = torchaudio.transforms.Resample(orig_freq=self.sr,
-                                                       new_freq=8000)
-            wav = transform(wav)
+            wav = self.resample_8k(wav)
         return wav, torch.FloatTensor(gt), torch.from_numpy(mask)
 
     def __len__(self):
@@ -108,6 +127,24 @@ class SileroVadDataset(Dataset):
     def load_speech_sample(self, idx=None):
         if idx is None:
             idx = random.randint(0, len(self.index_dict) - 1)
+        if self.compiled is not None:
+            return self.load_compiled_sample(idx)
+        return self.read_speech_sample(idx)
+
+    def load_compiled_sample(self, idx, sampling_rate=16000):
+        if self.compiled_arrays is None:  # opened lazily, so that every dataloader worker has its own maps
+            self.compiled_arrays = open_compiled_dataset(self.compiled)
+        audio, labels = self.compiled_arrays['audio_8k' if sampling_rate == 8000 else 'audio_16k'], self.compiled_arrays['labels']
+        step = self.sr // sampling_rate
+        start, end = self.compiled['offsets'][idx] // step, self.compiled['offsets'][idx + 1] // step
+        frame_start, frame_end = self.compiled['frame_offsets'][idx], self.compiled['frame_offsets'][idx + 1]
+
+        wav = audio[start:end].astype(np.float32)
+        gt = labels[frame_start:frame_end].astype(int)
+        mask = np.where(gt == 0, self.noise_loss, 1.0)
+        return wav, gt, mask
+
+    def read_speech_sample(self, idx):
         wav = read_audio(self.index_dict[idx]['audio_path'], self.sr).numpy()
 
         if len(wav) % self.num_samples != 0:
@@ -145,6 +182,83 @@ class SileroVadDataset(Dataset):
                 continue
 
 
+class _RawSpeechSamples(Dataset):
+    def __init__(self, dataset, with_8k):
+        self.dataset = dataset
+        self.with_8k = with_8k
+
+    def __getitem__(self, idx):
+        wav, gt, _ = self.dataset.read_speech_sample(idx)
+        wav_8k = self.dataset.resample_8k(torch.from_numpy(wav)).numpy() if self.with_8k else None
+        return wav.astype(np.float16), wav_8k.astype(np.float16) if self.with_8k else None, gt.astype(np.uint8)
+
+    def __len__(self):
+        return len(self.dataset)
+
+
+def _keep_item(item):
+    return item
+
+
+def compile_dataset(dataset, dataset_path, compiled_dir, with_8k=False, num_workers=0):
+    """
+    One-time compilation of a SileroVadDataset into contiguous files in compiled_dir: float16 16 kHz audio
+    (padded to whole windows, and optionally its 8 kHz resampling), uint8 window labels and an index with
+    the offsets of every audio. Audio decoding, resampling and label computation happen only here,
+    the dataset then slices the memory-mapped files. Recompiled if the dataframe file changes.
+    Returns the index as a dict.
+    """
+    paths = {key: os.path.join(compiled_dir, f'{dataset.mode}_{key}')
+             for key in ['audio_16k.f16', 'audio_8k.f16', 'labels.u8', 'index.npz']}
+    meta = np.array([os.path.abspath(dataset_path), str(os.path.getmtime(dataset_path)), str(len(dataset))])
+
+    if os.path.exists(paths['index.npz']):
+        with np.load(paths['index.npz']) as index:
+            compiled = {key: index[key] for key in index.files}
+        if np.array_equal(compiled['meta'], meta) and (not with_8k or compiled['with_8k']):
+            print(f'Using compiled {dataset.mode} dataset: {compiled_dir}')
+            compiled['paths'] = paths
+            return compiled
+
+    print(f'Compiling {dataset.mode} dataset to {compiled_dir}')
+    os.makedirs(compiled_dir, exist_ok=True)
+    loader = torch.utils.data.DataLoader(_RawSpeechSamples(dataset, with_8k),
+                                         batch_size=None,
+                                         collate_fn=_keep_item,
+                                         num_workers=num_workers)
+    lengths, frames = [], []
+    with open(paths['audio_16k.f16'], 'wb') as f_16k, open(paths['labels.u8'], 'wb') as f_labels, \
+            open(paths['audio_8k.f16'], 'wb') as f_8k:
+        for wav, wav_8k, gt in tqdm(loader, total=len(loader)):
+            f_16k.write(wav.tobytes())
+            if with_8k:
+                f_8k.write(wav_8k.tobytes())
+            f_labels.write(gt.tobytes())
+            lengths.append(len(wav))
+            frames.append(len(gt))
+
+    compiled = {
+        'offsets': np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+        'frame_offsets': np.concatenate([[0], np.cumsum(frames)]).astype(np.int64),
+        'with_8k': np.array(with_8k),
+        'meta': meta,
+    }
+    np.savez(paths['index.npz'], **compiled)
+    compiled['paths'] = paths
+    return compiled
+
+
+def open_compiled_dataset(compiled):
+    paths = compiled['paths']
+    arrays = {
+        'audio_16k': np.memmap(paths['audio_16k.f16'], dtype=np.float16, mode='r'),
+        'labels': np.memmap(paths['labels.u8'], dtype=np.uint8, mode='r'),
+    }
+    if compiled['with_8k']:
+        arrays['audio_8k'] = np.memmap(paths['audio_8k.f16'], dtype=np.float16, mode='r')
+    return arrays
+
+
 def SileroVadPadder(batch):
     wavs = [batch[i][0] for i in range(len(batch))]
     labels = [batch[i][1] for i in range(len(batch))]
@@ -216,27 +330,15 @@ def train(config,
     losses = AverageMeter()
     decoder.train()
 
-    context_size = 32 if config.tune_8k else 64
-    num_samples = 256 if config.tune_8k else 512
-    stft_layer = jit_model._model_8k.stft if config.tune_8k else jit_model._model.stft
-    encoder_layer = jit_model._model_8k.encoder if config.tune_8k else jit_model._model.encoder
+    encoder = encoder_layers(config, jit_model)
 
     with torch.enable_grad():
         for _, (x, targets, masks) in tqdm(enumerate(loader), total=len(loader)):
             targets = targets.to(device)
             x = x.to(device)
             masks = masks.to(device)
-            x = torch.nn.functional.pad(x, (context_size, 0))
-
-            outs = []
-            state = torch.zeros(0)
-            for i in range(context_size, x.shape[1], num_samples):
-                input_ = x[:, i-context_size:i+num_samples]
-                out = stft_layer(input_)
-                out = encoder_layer(out)
-                out, state = decoder(out, state)
-                outs.append(out)
-            stacked = torch.cat(outs, dim=2).squeeze(1)
+
+            stacked = decode_features(encode_windows(x, *encoder), decoder)
 
             loss = criterion(stacked, targets)
             loss = (loss * masks).mean()
@@ -263,27 +365,15 @@ def validate(config,
     predicts = []
     gts = []
 
-    context_size = 32 if config.tune_8k else 64
-    num_samples = 256 if config.tune_8k else 512
-    stft_layer = jit_model._model_8k.stft if config.tune_8k else jit_model._model.stft
-    encoder_layer = jit_model._model_8k.encoder if config.tune_8k else jit_model._model.encoder
+    encoder = encoder_layers(config, jit_model)
 
     with torch.no_grad():
         for _, (x, targets, masks) in tqdm(enumerate(loader), total=len(loader)):
             targets = targets.to(device)
             x = x.to(device)
             masks = masks.to(device)
-            x = torch.nn.functional.pad(x, (context_size, 0))
-
-            outs = []
-            state = torch.zeros(0)
-            for i in range(context_size, x.shape[1], num_samples):
-                input_ = x[:, i-context_size:i+num_samples]
-                out = stft_layer(input_)
-                out = encoder_layer(out)
-                out, state = decoder(out, state)
-                outs.append(out)
-            stacked = torch.cat(outs, dim=2).squeeze(1)
+
+            stacked = decode_features(encode_windows(x, *encoder), decoder)
 
             predicts.extend(stacked[masks != 0].tolist())
             gts.extend(targets[masks != 0].tolist())
@@ -299,6 +389,169 @@ def validate(config,
     return losses.avg, round(score, 3)
 
 
+def encoder_layers(config, jit_model):
+    """Frozen stft / encoder layers of the tuned sampling rate with their window sizes, in the encode_windows order"""
+    if config.tune_8k:
+        return jit_model._model_8k.stft, jit_model._model_8k.encoder, 32, 256
+    return jit_model._model.stft, jit_model._model.encoder, 64, 512
+
+
+def encode_windows(x, stft_layer, encoder_layer, context_size, num_samples):
+    """Frozen encoder outputs of every window of a padded batch of audios, (batch, 128, num_windows)"""
+    x = torch.nn.functional.pad(x, (context_size, 0))
+    outs = []
+    for i in range(context_size, x.shape[1], num_samples):
+        input_ = x[:, i-context_size:i+num_samples]
+        outs.append(encoder_layer(stft_layer(input_)))
+    return torch.cat(outs, dim=2)
+
+
+def decode_features(features, decoder):
+    """Decoder outputs for a padded batch of encoder features (batch, 128, num_windows)"""
+    outs = []
+    state = torch.zeros(0)
+    for i in range(features.shape[2]):
+        out, state = decoder(features[:, :, i:i+1], state)
+        outs.append(out)
+    return torch.cat(outs, dim=2).squeeze(1)
+
+
+def _padder_with_lengths(batch):
+    return SileroVadPadder(batch) + (torch.LongTensor([len(batch[i][1]) for i in range(len(batch))]),)
+
+
+def build_features_cache(config, mode, jit_model, device):
+    """
+    Computes the frozen encoder outputs of the whole dataset once (validation set or the training set
+    without augmentations, truncated to max_train_length_sec) and stores them in encoder_cache_dir:
+    a flat float32 (num_windows, 128) memory-mapped shard plus an index with the offsets, labels and masks.
+    An existing cache is reused if it was built for the same dataset and settings.
+    """
+    dataset_path = config.train_dataset_path if mode == 'train' else config.val_dataset_path
+    cache_dir = config.get('encoder_cache_dir', 'encoder_cache')
+    name = f'{mode}_{8 if config.tune_8k else 16}k'
+    features_path = os.path.join(cache_dir, f'{name}_features.f32')
+    index_path = os.path.join(cache_dir, f'{name}_index.npz')
+    meta = np.array([os.path.abspath(dataset_path), str(config.max_train_length_sec), str(config.noise_loss),
+                     str(os.path.getmtime(dataset_path))])
+
+    if os.path.exists(features_path) and os.path.exists(index_path):
+        with np.load(index_path) as index:
+            if np.array_equal(index['meta'], meta):
+                print(f'Using cached encoder features: {features_path}')
+                return features_path, index_path
+
+    print(f'Caching encoder features of the {mode} dataset to {features_path}')
+    os.makedirs(cache_dir, exist_ok=True)
+    dataset = SileroVadDataset(config, mode=mode, deterministic=True)
+    loader = torch.utils.data.DataLoader(dataset,
+                                         batch_size=config.batch_size,
+                                         collate_fn=_padder_with_lengths,
+                                         num_workers=config.num_workers)
+
+    encoder = encoder_layers(config, jit_model)
+
+    lengths, gts, masks = [], [], []
+    with torch.no_grad(), open(features_path, 'wb') as f:
+        for x, targets, batch_masks, batch_lengths in tqdm(loader, total=len(loader)):
+            features = encode_windows(x.to(device), *encoder)
+            features = features.permute(0, 2, 1).float().cpu().numpy()
+            for i, length in enumerate(batch_lengths.tolist()):
+                f.write(np.ascontiguousarray(features[i, :length]).tobytes())
+                gts.append(targets[i, :length].numpy().astype(np.uint8))
+                masks.append(batch_masks[i, :length].numpy().astype(np.float32))
+                lengths.append(length)
+
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    np.savez(index_path, offsets=offsets, gts=np.concatenate(gts), masks=np.concatenate(masks), meta=meta)
+    return features_path, index_path
+
+
+class CachedFeaturesDataset(Dataset):
+    """Encoder features of build_features_cache, sliced from the memory-mapped shard without copying the shard"""
+
+    def __init__(self, features_path, index_path):
+        self.features_path = features_path
+        with np.load(index_path) as index:
+            self.offsets = index['offsets']
+            self.gts = index['gts']
+            self.masks = index['masks']
+        self.features = None
+        print(f'CACHED DATASET SIZE : {len(self)}')
+
+    def __getitem__(self, idx):
+        if self.features is None:  # opened lazily, so that every dataloader worker has its own map
+            self.features = np.memmap(self.features_path, dtype=np.float32, mode='r').reshape(-1, 128)
+        start, end = self.offsets[idx], self.offsets[idx + 1]
+        return (torch.from_numpy(np.array(self.features[start:end])),
+                torch.from_numpy(self.gts[start:end].astype(np.float32)),
+                torch.from_numpy(self.masks[start:end]))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+def CachedFeaturesPadder(batch):
+    features, labels, masks = SileroVadPadder(batch)
+    return features.permute(0, 2, 1), labels, masks
+
+
+def train_cached(loader,
+                 decoder,
+                 criterion,
+                 optimizer,
+                 device):
+
+    losses = AverageMeter()
+    decoder.train()
+
+    with torch.enable_grad():
+        for _, (features, targets, masks) in tqdm(enumerate(loader), total=len(loader)):
+            features = features.to(device)
+            targets = targets.to(device)
+            masks = masks.to(device)
+
+            stacked = decode_features(features, decoder)
+
+            loss = criterion(stacked, targets)
+            loss = (loss * masks).mean()
+            loss.backward()
+            optimizer.step()
+            losses.update(loss.item(), masks.numel())
+
+    return losses.avg
+
+
+def validate_cached(loader,
+                    decoder,
+                    criterion,
+                    device):
+
+    losses = AverageMeter()
+    decoder.eval()
+
+    predicts = []
+    gts = []
+
+    with torch.no_grad():
+        for _, (features, targets, masks) in tqdm(enumerate(loader), total=len(loader)):
+            features = features.to(device)
+            targets = targets.to(device)
+            masks = masks.to(device)
+
+            stacked = decode_features(features, decoder)
+
+            predicts.extend(stacked[masks != 0].tolist())
+            gts.extend(targets[masks != 0].tolist())
+
+            loss = criterion(stacked, targets)
+            loss = (loss * masks).mean()
+            losses.update(loss.item(), masks.numel())
+    score = roc_auc_score(gts, predicts)
+
+    return losses.avg, round(score, 3)
+
+
 def init_jit_model(model_path: str,
                    device=torch.device('cpu')):
     torch.set_grad_enabled(False)
@@ -307,51 +560,234 @@ def init_jit_model(model_path: str,
     return model
 
 
-def predict(model, loader, device, sr):
+def predict(model, loader, device, sr, spill_dir=None):
+    """
+    Masked model outputs and targets of the whole loader as a PredictionsAccumulator:
+    flat float32 arrays with per-audio offsets, in memory or in .npy files in spill_dir
+    """
+    accumulator = PredictionsAccumulator(spill_dir)
     with torch.no_grad():
-        all_predicts = []
-        all_gts = []
         for _, (x, targets, masks) in tqdm(enumerate(loader), total=len(loader)):
             x = x.to(device)
             out = model.audio_forward(x, sr=sr)
 
-            for i, out_chunk in enumerate(out):
-                predict = out_chunk[masks[i] != 0].cpu().tolist()
-                gt = targets[i, masks[i] != 0].cpu().tolist()
+            valid = (masks != 0).to(out.device)
+            accumulator.append(out[valid].float().cpu().numpy(),
+                               targets.to(out.device)[valid].float().cpu().numpy(),
+                               valid.sum(dim=1).cpu().numpy())
+    return accumulator.finalize()
+
+
+class PredictionsAccumulator:
+    """
+    Predictions and targets of many audios stored back to back in two float32 arrays, audio i
+    is predicts[offsets[i]:offsets[i + 1]]. In memory the arrays are preallocated and grown
+    geometrically; with spill_dir they are streamed into predicts.npy / gts.npy and memory-mapped
+    by finalize, so memory use does not depend on the size of the validation set.
+    """
+
+    def __init__(self, spill_dir=None, initial_capacity=2 ** 20):
+        self.spill_dir = spill_dir
+        self.size = 0
+        self.lengths = []
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._files = [open(os.path.join(spill_dir, name), 'wb') for name in ['predicts.npy', 'gts.npy']]
+            for f in self._files:
+                self._write_header(f, 0)
+            self._data_offset = self._files[0].tell()
+        else:
+            self.predicts = np.empty(initial_capacity, dtype=np.float32)
+            self.gts = np.empty(initial_capacity, dtype=np.float32)
+
+    @staticmethod
+    def _write_header(f, size):
+        np.lib.format.write_array_header_1_0(f, {'descr': np.lib.format.dtype_to_descr(np.dtype(np.float32)),
+                                                 'fortran_order': False,
+                                                 'shape': (size,)})
+
+    def append(self, predicts, gts, lengths):
+        """Appends a batch: flat predicts / gts of len(lengths) audios in order"""
+        predicts = np.asarray(predicts, dtype=np.float32)
+        gts = np.asarray(gts, dtype=np.float32)
+        n = len(predicts)
+        if self.spill_dir:
+            self._files[0].write(predicts.tobytes())
+            self._files[1].write(gts.tobytes())
+        else:
+            if self.size + n > len(self.predicts):
+                capacity = max(2 * len(self.predicts), self.size + n)
+                self.predicts = self._grow(self.predicts, capacity)
+                self.gts = self._grow(self.gts, capacity)
+            self.predicts[self.size:self.size + n] = predicts
+            self.gts[self.size:self.size + n] = gts
+        self.size += n
+        self.lengths.extend(np.asarray(lengths).tolist())
+
+    def _grow(self, array, capacity):
+        grown = np.empty(capacity, dtype=array.dtype)
+        grown[:self.size] = array[:self.size]
+        return grown
+
+    def finalize(self):
+        self.offsets = np.concatenate([[0], np.cumsum(self.lengths)]).astype(np.int64)
+        if self.spill_dir:
+            for f in self._files:
+                f.seek(0)
+                self._write_header(f, self.size)
+                if f.tell() != self._data_offset:
+                    raise RuntimeError('Unexpected .npy header size, update numpy or disable spill_dir')
+                f.close()
+            self.predicts = np.load(os.path.join(self.spill_dir, 'predicts.npy'), mmap_mode='r')
+            self.gts = np.load(os.path.join(self.spill_dir, 'gts.npy'), mmap_mode='r')
+        else:
+            self.predicts = self.predicts[:self.size]
+            self.gts = self.gts[:self.size]
+        return self
 
-                all_predicts.append(predict)
-                all_gts.append(gt)
-    return all_predicts, all_gts
+    def __len__(self):
+        return len(self.lengths)
 
 
-def calculate_best_thresholds(all_predicts, all_gts):
-    best_acc = 0
-    for ths_enter in tqdm(np.linspace(0, 1, 20)):
-        for ths_exit in np.linspace(0, 1, 20):
-            if ths_exit >= ths_enter:
-                continue
+def calculate_best_thresholds(all_predicts, all_gts=None, num_steps=20, refine_iterations=0, num_workers=0):
+    """
+    Grid search of the enter / exit thresholds maximizing the mean per-audio accuracy
+
+    all_predicts is the PredictionsAccumulator returned by predict (all_gts is then not used)
+    or a list of per-audio prediction lists with the matching all_gts.
+
+    num_steps x num_steps grid over [0, 1] (pairs with exit < enter), refine_iterations times zoomed
+    into +-1 grid step around the best pair found so far, with num_steps points per axis rounded up to
+    an odd number so that the best pair itself is on the zoomed grid. Pairs are scored by
+    HysteresisEvaluator, split between num_workers processes if num_workers > 1.
+    Per-audio accuracies are rounded to 4 and their mean to 3 digits before comparing pairs.
+    """
+    if num_steps < 2:
+        raise ValueError(f'num_steps must be at least 2, got {num_steps}')
+    if isinstance(all_predicts, PredictionsAccumulator):
+        evaluator = HysteresisEvaluator(all_predicts.predicts, all_predicts.gts, all_predicts.offsets)
+    else:
+        evaluator = HysteresisEvaluator.from_lists(all_predicts, all_gts)
 
-            accs = []
-            for j, predict in enumerate(all_predicts):
-                predict_bool = []
-                is_speech = False
-                for i in predict:
-                    if i >= ths_enter:
-                        is_speech = True
-                        predict_bool.append(1)
-                    elif i <= ths_exit:
-                        is_speech = False
-                        predict_bool.append(0)
-                    else:
-                        val = 1 if is_speech else 0
-                        predict_bool.append(val)
-
-                score = round(accuracy_score(all_gts[j], predict_bool), 4)
-                accs.append(score)
-
-            mean_acc = round(np.mean(accs), 3)
-            if mean_acc > best_acc:
-                best_acc = mean_acc
-                best_ths_enter = round(ths_enter, 2)
-                best_ths_exit = round(ths_exit, 2)
+    best_acc = 0
+    best_ths_enter = best_ths_exit = None
+    best_enter = best_exit = None
+    step = 1 / (num_steps - 1)
+    zoom = np.linspace(-1, 1, num_steps + 1 - num_steps % 2)
+    enter_grid = exit_grid = np.linspace(0, 1, num_steps)
+    for iteration in range(refine_iterations + 1):
+        ths_enter, ths_exit = np.meshgrid(enter_grid, exit_grid, indexing='ij')
+        valid = ths_exit < ths_enter
+        ths_enter, ths_exit = ths_enter[valid], ths_exit[valid]
+
+        if num_workers > 1:
+            accs = _score_pairs_parallel(evaluator, ths_enter, ths_exit, num_workers)
+        else:
+            accs = evaluator.score(ths_enter, ths_exit)
+        mean_accs = [round(np.mean([round(acc, 4) for acc in pair_accs]), 3) for pair_accs in accs.tolist()]
+
+        decimals = max(2, math.ceil(-math.log10(step)))
+        best = int(np.argmax(mean_accs))
+        if best_enter is None or mean_accs[best] > best_acc:
+            best_acc = mean_accs[best]
+            best_enter, best_exit = ths_enter[best], ths_exit[best]
+            best_ths_enter = round(best_enter, decimals)
+            best_ths_exit = round(best_exit, decimals)
+        print(f'Threshold search iteration {iteration + 1}: {len(mean_accs)} pairs, grid step {step:.4f}, best accuracy {best_acc}')
+
+        enter_grid = np.unique(np.clip(best_enter + zoom * step, 0, 1))
+        exit_grid = np.unique(np.clip(best_exit + zoom * step, 0, 1))
+        step = step * (zoom[1] - zoom[0])
     return best_ths_enter, best_ths_exit, best_acc
+
+
+class HysteresisEvaluator:
+    """
+    Accuracy of the enter / exit threshold hysteresis for many threshold pairs at once
+
+    Predictions are one flat float32 array with an offsets index (as collected by predict). Audios are
+    sorted by length and scored in padded (pairs, audios, frames) blocks: the speech state of a frame is
+    the type of the last frame at or before it that crossed one of the thresholds, found with a running
+    maximum over the indices of such frames with the type stored in the lowest bit.
+    """
+
+    def __init__(self, predicts, gts, offsets, max_block_elements=2 ** 22):
+        self.predicts = predicts
+        self.gts = gts
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.lengths = np.diff(self.offsets)
+        self.max_block_elements = max_block_elements
+
+        # batches of audios with similar lengths, padded when scored, so that only one is copied at a time
+        order = np.argsort(self.lengths, kind='stable')
+        self.batches = []
+        start = 0
+        while start < len(order):
+            end = start + 1
+            while end < len(order) and (end - start + 1) * self.lengths[order[end]] <= max_block_elements:
+                end += 1
+            self.batches.append(order[start:end])
+            start = end
+
+    @classmethod
+    def from_lists(cls, all_predicts, all_gts, **kwargs):
+        lengths = [len(predict) for predict in all_predicts]
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        predicts = np.concatenate([np.asarray(predict, dtype=np.float32) for predict in all_predicts] + [np.zeros(0, dtype=np.float32)])
+        gts = np.concatenate([np.asarray(gt, dtype=np.float32) for gt in all_gts] + [np.zeros(0, dtype=np.float32)])
+        return cls(predicts, gts, offsets, **kwargs)
+
+    def _pad(self, items):
+        lengths = self.lengths[items]
+        num_frames = max(1, int(lengths.max()))
+        predicts = np.zeros((len(items), num_frames), dtype=np.float32)
+        gts = np.zeros((len(items), num_frames), dtype=bool)
+        valid = np.arange(num_frames)[None, :] < lengths[:, None]
+        for row, (start, end) in enumerate(zip(self.offsets[items].tolist(), self.offsets[items + 1].tolist())):
+            predicts[row, :end - start] = self.predicts[start:end]
+            gts[row, :end - start] = self.gts[start:end]
+        return predicts, gts, valid
+
+    def score(self, ths_enter, ths_exit):
+        """(pairs, audios) accuracies of every threshold pair on every audio, audios in the original order"""
+        ths_enter = np.asarray(ths_enter, dtype=np.float64)
+        ths_exit = np.asarray(ths_exit, dtype=np.float64)
+        accs = np.zeros((len(ths_enter), len(self.lengths)), dtype=np.float64)
+
+        for items in self.batches:
+            predicts, gts, valid = self._pad(items)
+            # 2 * index + 1 for frames entering speech, 2 * index for frames exiting it, -2 before the first one
+            enter_code = np.arange(1, 2 * predicts.shape[1], 2, dtype=np.int32)
+            exit_code = enter_code - 1
+            pairs_per_block = max(1, self.max_block_elements // predicts.size)
+            lengths = self.lengths[items]
+            for k in range(0, len(ths_enter), pairs_per_block):
+                enter = predicts[None] >= ths_enter[k:k + pairs_per_block, None, None]
+                exit_ = predicts[None] <= ths_exit[k:k + pairs_per_block, None, None]
+                last = np.where(enter, enter_code, np.where(exit_, exit_code, -2))
+                np.maximum.accumulate(last, axis=-1, out=last)
+                is_speech = (last & 1).astype(bool)
+                correct = ((is_speech == gts) & valid).sum(axis=-1)
+                accs[k:k + pairs_per_block, items] = correct / np.maximum(lengths, 1)
+        return accs
+
+
+_worker_evaluator = None
+
+
+def _init_score_worker(evaluator):
+    global _worker_evaluator
+    _worker_evaluator = evaluator
+
+
+def _score_pairs_worker(pairs):
+    return _worker_evaluator.score(*pairs)
+
+
+def _score_pairs_parallel(evaluator, ths_enter, ths_exit, num_workers):
+    chunks = [(ths_enter[i::num_workers], ths_exit[i::num_workers]) for i in range(num_workers)]
+    accs = np.zeros((len(ths_enter), len(evaluator.lengths)), dtype=np.float64)
+    with ProcessPoolExecutor(num_workers, initializer=_init_score_worker, initargs=(evaluator,)) as executor:
+        for i, chunk_accs in enumerate(executor.map(_score_pairs_worker, chunks)):
+            accs[i::num_workers] = chunk_accs
+    return accs
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# speculative_turn.py
+
+"""
+推测式轮次结束模块
+"""
+import threading
+import time
+from collections import deque
+from logger_config import system_logger
+from config_manager import config_manager
+
+SPECULATIVE_ENABLED = config_manager.get('speculative_turn.enabled', False)
+TENTATIVE_SILENCE_FRAMES = config_manager.get('speculative_turn.tentative_silence_frames', 8)
+SPECULATIVE_LLM = config_manager.get('speculative_turn.start_llm', True)
+# Whisper 系列模型固定使用 16kHz 采样率
+SAMPLE_RATE = 16000
+
+
+class SpeculativeText(str):
+    """识别文本，reply 为预先生成的回复（ollama_stream.BufferedReply），没有预生成时为 None"""
+
+    def __new__(cls, text: str, reply=None):
+        obj = super().__new__(cls, text)
+        obj.reply = reply
+        return obj
+
+
+class SpeculativeTurn:
+    """一次推测：在后台线程中识别停顿前的语音，识别出文字后立即开始预生成回复
+
+    ASR 后端带有解码策略时按语音时长和 ASR 队列积压选择解码参数，并把实际耗时反馈给策略；
+    带有识别结果过滤时，过滤计数先暂存，推测命中后才计入统计，作废时只计入增量解码的统计。
+    """
+
+    def __init__(self, asr, audio, transcribe_kwargs: dict, responder=None, queue_depth: int = 0):
+        self.asr = asr
+        self.audio = audio
+        self.transcribe_kwargs = transcribe_kwargs
+        self.responder = responder
+        self.queue_depth = queue_depth
+        self.text = ""
+        self.reply = None
+        self.policy = None
+        gate = getattr(asr, 'gate', None)
+        self.gate_tally = gate.new_tally() if gate is not None else None
+        self.start_time = time.time()
+        self.asr_done_time = None
+        self.commit_time = None
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._counted = False
+        self._thread = threading.Thread(target=self._run, name="asr-speculative", daemon=True)
+        self._thread.start()
+
+    @property
+    def decoding(self) -> bool:
+        """推测识别是否仍在进行（作废后识别仍会进行到结束）"""
+        return self.asr_done_time is None
+
+    def speech_seconds(self) -> float:
+        """首个语音区间起点到最后一个语音区间终点的时长"""
+        speech_timestamps = self.transcribe_kwargs.get('speech_timestamps')
+        if speech_timestamps:
+            return (speech_timestamps[-1]['end'] - speech_timestamps[0]['start']) / SAMPLE_RATE
+        return len(self.audio) / SAMPLE_RATE
+
+    def _run(self):
+        kwargs = dict(self.transcribe_kwargs)
+        decode_policy = getattr(self.asr, 'policy', None)
+        if decode_policy is not None:
+            self.policy = decode_policy.choose(self.speech_seconds(), queue_depth=self.queue_depth)
+            kwargs = decode_policy.apply(self.policy, kwargs)
+        if self.gate_tally is not None:
+            kwargs['gate_tally'] = self.gate_tally
+        start_time = time.time()
+        try:
+            self.text = self.asr.transcribe(self.audio, **kwargs)
+        except Exception as e:
+            system_logger.error("推测识别失败：{}".format(e))
+        self.asr_done_time = time.time()
+        if decode_policy is not None:
+            decode_policy.record(self.policy, self.speech_seconds(), self.asr_done_time - start_time)
+        with self._lock:
+            if self._cancelled:
+                self._count_gate(partial=True)
+            # 取消后不再开始生成；识别结果为空时（包括被 ASR 过滤拦截）也不生成
+            if self._cancelled or not self.text or self.responder is None:
+                return
+            self.reply = self.responder(self.text)
+
+    def _count_gate(self, partial: bool):
+        """把暂存的过滤计数计入 ASR 过滤统计（只计一次），调用时须持有 self._lock"""
+        if self.gate_tally is not None and not self._counted:
+            self._counted = True
+            self.asr.gate.merge(self.gate_tally, partial=partial)
+
+    def cancel(self):
+        """作废本次推测：停止预生成的回复，已在进行的识别照常结束但结果被丢弃"""
+        with self._lock:
+            self._cancelled = True
+            if not self.decoding:
+                self._count_gate(partial=True)
+            if self.reply is not None:
+                self.reply.cancel()
+
+    def result(self) -> str:
+        """等待推测识别完成，返回带预生成回复的识别文本（由 ASR 工作线程按提交顺序输出）"""
+        self._thread.join()
+        with self._lock:
+            self._count_gate(partial=False)
+        return SpeculativeText(self.text, self.reply) if self.text else ""
+
+    def ready_time(self) -> float:
+        """结果可用的时间：有预生成回复时为第一条回复生成完成的时间，否则为识别完成的时间"""
+        if self.reply is not None:
+            return self.reply.first_event_time
+        return self.asr_done_time
+
+
+class SpeculativeTurnManager:
+    """推测式轮次结束
+
+    说话后的静音达到 tentative_silence_frames（短于确认说话结束的 SILENCE_FRAME_THRESHOLD）时，
+    先用停顿前的音频开始识别，并在识别出文字后预生成 LLM 回复，回复只缓存不播放：
+    - 静音持续到说话结束（commit）：推测命中，识别结果和已缓存的回复交给 ASR 工作线程池按顺序输出；
+    - 静音期间用户继续说话（cancel）：推测落空，停止预生成并丢弃结果，对话历史不受影响。
+    停顿之后到说话结束之间只有静音，命中时的识别结果与等到说话结束后再识别相同。
+
+    每次命中节省的延迟按 min(结果可用时间, 确认说话结束时间) - 推测开始时间 估算，
+    即推测工作与原本要等待的静音时间重叠的部分。
+
+    推测识别不经过 ASR 工作线程池，同一时刻最多只有一个推测识别在进行：作废的推测仍会识别到结束，
+    这期间再次停顿时不推测（计入 skipped），说话结束后照常提交到工作线程池识别。
+    """
+
+    def __init__(self, asr, asr_pool, responder=None, tentative_silence_frames: int = TENTATIVE_SILENCE_FRAMES):
+        """
+        Args:
+            asr: ASR 后端，推测识别直接调用其 transcribe
+            asr_pool: AsrWorkerPool，命中的推测通过 submit_call 按提交顺序输出
+            responder: 接收识别文本、返回预生成回复（或 None）的函数，为 None 时只推测识别
+            tentative_silence_frames: 开始推测的静音帧数
+        """
+        self.asr = asr
+        self.asr_pool = asr_pool
+        self.responder = responder
+        self.tentative_silence_frames = tentative_silence_frames
+        self.turn = None
+        self._last_turn = None          # 最近一次推测，用于判断是否仍有推测识别在进行
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.committed = deque(maxlen=100)
+
+    @property
+    def active(self) -> bool:
+        return self.turn is not None
+
+    def start(self, audio, **transcribe_kwargs) -> bool:
+        """在停顿处开始推测，audio 为停顿前的语音（可以是仍在追加的缓冲区视图）；
+        上一次推测的识别仍在进行时不推测，返回 False"""
+        if self.turn is not None:
+            self.turn.cancel()
+            self.turn = None
+        if self._last_turn is not None and self._last_turn.decoding:
+            self.skipped += 1
+            system_logger.info("[推测] 上一次推测识别尚未结束，本次停顿不推测")
+            return False
+        self.turn = SpeculativeTurn(self.asr, audio, transcribe_kwargs, self.responder,
+                                    queue_depth=self.asr_pool.pending())
+        self._last_turn = self.turn
+        system_logger.info("[推测] 检测到停顿，提前开始识别{}".format("和回复生成" if self.responder else ""))
+        return True
+
+    def cancel(self):
+        """用户在停顿后继续说话：作废当前推测"""
+        if self.turn is None:
+            return
+        self.turn.cancel()
+        self.turn = None
+        self.misses += 1
+        system_logger.info("[推测] 用户继续说话，推测作废（命中 {} / 落空 {}）".format(self.hits, self.misses))
+
+    def commit(self, audio_seconds: float) -> bool:
+        """说话结束：把当前推测的结果提交到 ASR 工作线程池，队列已满时作废推测并返回 False"""
+        turn, self.turn = self.turn, None
+        if turn is None:
+            return False
+        turn.commit_time = time.time()
+        if not self.asr_pool.submit_call(turn.result, audio_seconds):
+            turn.cancel()
+            self.misses += 1
+            return False
+        self.hits += 1
+        self.committed.append(turn)
+        system_logger.info("[推测] 说话结束，使用推测结果（已提前 {:.3f}秒开始）".format(turn.commit_time - turn.start_time))
+        return True
+
+    def get_stats(self) -> dict:
+        """命中率与最近 100 次命中平均节省的延迟；结果尚未可用的命中按确认说话结束的时间计算"""
+        saved = []
+        for turn in list(self.committed):
+            ready = turn.ready_time() or turn.commit_time
+            saved.append(min(ready, turn.commit_time) - turn.start_time)
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'skipped': self.skipped,
+            'hit_rate': self.hits / total if total else 0.0,
+            'mean_saved': sum(saved) / len(saved) if saved else 0.0,
+        }
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# test_asr_batch.py
+
+"""
+批量识别的结果归属测试（用模拟的 BatchedInferencePipeline，不需要加载模型）
+"""
+import os
+import sys
+import queue
+import unittest
+from types import SimpleNamespace
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asr import FasterWhisperASR, SAMPLE_RATE
+from asr_gate import TranscriptGate
+from asr_worker import AsrJob, AsrWorkerPool
+
+CHUNK_LENGTH = 30
+
+
+class FakeBatchedPipeline:
+    """按 faster-whisper 1.2.0 的 collect_chunks 把 clip 合并成不超过 chunk_length 的窗口，
+    每个窗口输出一个覆盖整个窗口的分段，文本为窗口内出现的各段音频的标记"""
+
+    def __init__(self):
+        self.windows = []
+
+    def transcribe(self, audio, clip_timestamps, **kwargs):
+        max_samples = CHUNK_LENGTH * SAMPLE_RATE
+        windows, current, current_samples = [], [], 0
+        for clip in clip_timestamps:
+            start, end = int(clip['start'] * SAMPLE_RATE), int(clip['end'] * SAMPLE_RATE)
+            if current and current_samples + end - start > max_samples:
+                windows.append(current)
+                current, current_samples = [], 0
+            current.append((start, end))
+            current_samples += end - start
+        windows.append(current)
+        self.windows = windows
+
+        segments, offset = [], 0.0
+        for window in windows:
+            window_audio = np.concatenate([audio[start:end] for start, end in window])
+            duration = len(window_audio) / SAMPLE_RATE
+            segments.append(SimpleNamespace(start=offset, end=offset + duration, text=self._text(window_audio),
+                                            no_speech_prob=0.0, avg_logprob=-0.2, compression_ratio=1.0))
+            offset += duration
+        return iter(segments), None
+
+    @staticmethod
+    def _text(window_audio):
+        markers = []
+        for value in np.round(window_audio[window_audio > 0] * 10).astype(int):
+            if value not in markers:
+                markers.append(value)
+        return "".join("段{}".format(marker) for marker in markers)
+
+
+def make_asr():
+    asr = FasterWhisperASR.__new__(FasterWhisperASR)
+    asr.model = SimpleNamespace(feature_extractor=SimpleNamespace(chunk_length=CHUNK_LENGTH))
+    asr._batched = FakeBatchedPipeline()
+    asr.gate = TranscriptGate()
+    asr.policy = None
+    return asr
+
+
+def utterance(index, seconds):
+    """第 index 段语音：取值为 index / 10 的常数信号，用作模拟识别结果中的标记"""
+    return np.full(int(seconds * SAMPLE_RATE), index / 10.0, dtype=np.float32)
+
+
+class TranscribeBatchTest(unittest.TestCase):
+    def test_each_utterance_gets_own_window(self):
+        asr = make_asr()
+        audios = [utterance(1, 5.0), utterance(2, 4.0), utterance(3, 6.0)]
+        results = asr.transcribe_batch(audios)
+
+        self.assertEqual(len(asr._batched.windows), 3)
+        self.assertEqual([[text for _, _, text in segments] for segments in results], [["段1"], ["段2"], ["段3"]])
+        for audio, segments in zip(audios, results):
+            start, end, _ = segments[0]
+            self.assertEqual(start, 0.0)
+            self.assertAlmostEqual(end, len(audio) / SAMPLE_RATE)
+
+    def test_rejects_audio_longer_than_window(self):
+        asr = make_asr()
+        with self.assertRaises(ValueError):
+            asr.transcribe_batch([utterance(1, 2.0), utterance(2, CHUNK_LENGTH + 1.0)])
+
+    def test_worker_pool_batch_delivers_each_job_text(self):
+        asr = make_asr()
+        result_queue = queue.Queue()
+        pool = AsrWorkerPool(asr, result_queue, max_batch=4)
+        jobs = [AsrJob(seq, None, seconds, audio=utterance(seq + 1, seconds), transcribe_kwargs={'language': "zh"})
+                for seq, seconds in enumerate([3.0, 2.5, 4.0])]
+        pool._run_batch(jobs, jobs[0].batch_key())
+        for job in jobs:
+            pool._deliver(job)
+
+        self.assertEqual([job.text for job in jobs], ["段1", "段2", "段3"])
+        self.assertEqual([result_queue.get_nowait() for _ in jobs], ["段1", "段2", "段3"])
+        self.assertEqual(pool.batched_jobs, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# vad_engine.py
+
+"""
+VAD 推理引擎模块
+"""
+import os
+import sys
+import time
+import numpy as np
+from logger_config import system_logger
+
+VAD_BACKENDS = ('jit', 'onnx', 'onnx_numpy')
+SILERO_REPO = 'snakers4/silero-vad'
+
+
+class VadEngine:
+    """Silero VAD 推理引擎
+
+    模型在构造时只加载一次并用空白帧预热，多次 start_listening / stop_listening 之间
+    只重置模型内部状态，重新开始监听时无需再次加载。
+
+    backend 可选 jit（TorchScript）、onnx（OnnxWrapper，onnxruntime 单线程 CPU 会话）
+    或 onnx_numpy（OnnxStreamingVAD，纯 NumPy 预分配缓冲区，不导入 torch），
+    每帧推理耗时记录在最近 latency_window 帧的滑动窗口中。
+    """
+
+    def __init__(self, rate: int, chunk: int, backend: str = 'jit', warmup_frames: int = 16,
+                 latency_window: int = 4096):
+        self.rate = rate
+        self.chunk = chunk
+        if backend not in VAD_BACKENDS:
+            system_logger.warning("未知的 VAD 后端 {}，使用 jit".format(backend))
+            backend = 'jit'
+        self.backend = backend
+        self._latencies = np.zeros(latency_window, dtype=np.float64)
+        self._latency_count = 0
+
+        start_time = time.time()
+        if backend == 'onnx_numpy':
+            self.model = self._load_onnx_numpy()
+            self._infer = self._infer_numpy
+        else:
+            import torch
+            self._torch = torch
+            self.model, _ = torch.hub.load(
+                repo_or_dir=SILERO_REPO,
+                model='silero_vad',
+                force_reload=False,
+                source='local',
+                onnx=(backend == 'onnx'),
+                force_onnx_cpu=True
+            )
+            self._infer = self._infer_torch
+        self.load_time = time.time() - start_time
+
+        start_time = time.time()
+        self.warmup(warmup_frames)
+        self.warmup_time = time.time() - start_time
+
+        system_logger.info("VAD 模型加载完成，后端: {}, 加载耗时: {:.3f}秒, 预热耗时: {:.3f}秒".format(
+            self.backend, self.load_time, self.warmup_time))
+
+    def warmup(self, frames: int):
+        """用空白帧触发 JIT 优化，避免第一帧真实音频承担预热开销"""
+        dummy = np.zeros(self.chunk, dtype=np.float32)
+        for _ in range(frames):
+            self(dummy)
+        self.reset()
+        self._latency_count = 0
+
+    def reset(self):
+        """重置模型内部状态（每次开始监听时调用）"""
+        self.model.reset_states()
+
+    def _load_onnx_numpy(self):
+        # 与 hubconf 相同，直接从本地 silero-vad 源码目录导入
+        src_dir = os.path.join(SILERO_REPO, 'src')
+        if src_dir not in sys.path:
+            sys.path.insert(0, src_dir)
+        from silero_vad.onnx_vad import OnnxStreamingVAD
+        return OnnxStreamingVAD(sampling_rate=self.rate)
+
+    def _infer_torch(self, audio_np: np.ndarray) -> float:
+        with self._torch.no_grad():
+            return self.model(self._torch.from_numpy(audio_np), self.rate).item()
+
+    def _infer_numpy(self, audio_np: np.ndarray) -> float:
+        return float(self.model(audio_np)[0, 0])
+
+    def __call__(self, audio_np: np.ndarray) -> float:
+        """返回一帧 float32 音频的语音概率"""
+        start = time.perf_counter()
+        prob = self._infer(audio_np)
+        self._latencies[self._latency_count % len(self._latencies)] = time.perf_counter() - start
+        self._latency_count += 1
+        return prob
+
+    def get_latency_stats(self) -> dict:
+        """最近窗口内的每帧推理耗时统计（毫秒）"""
+        n = min(self._latency_count, len(self._latencies))
+        if n == 0:
+            return {'frames': 0}
+        latencies = self._latencies[:n] * 1000.0
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        return {
+            'frames': self._latency_count,
+            'mean_ms': float(latencies.mean()),
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+            'max_ms': float(latencies.max()),
+            # 每秒音频消耗的推理时间占比，即常驻监听的单核 CPU 占用
+            'cpu_load': float(latencies.mean() / 1000.0 * self.rate / self.chunk),
+        }
+
+    def get_stats(self) -> dict:
+        stats = {
+            'backend': self.backend,
+            'load_time': self.load_time,
+            'warmup_time': self.warmup_time,
+        }
+        stats.update(self.get_latency_stats())
+        return stats
+
+
+if __name__ == "__main__":
+    # 对比各后端在本机上的每帧推理开销：python vad_engine.py [帧数]
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    audio = (np.random.randn(frames, 512) * 0.1).astype(np.float32)
+    for backend in VAD_BACKENDS:
+        engine = VadEngine(16000, 512, backend=backend)
+        cpu_start = time.process_time()
+        for chunk in audio:
+            engine(chunk)
+        cpu = time.process_time() - cpu_start
+        stats = engine.get_latency_stats()
+        print("{:>10}: mean {:.3f}ms  p50 {:.3f}ms  p95 {:.3f}ms  p99 {:.3f}ms  max {:.3f}ms  "
+              "CPU {:.3f}秒/{:.1f}秒音频 ({:.1%} 单核)".format(
+                  backend, stats['mean_ms'], stats['p50_ms'], stats['p95_ms'], stats['p99_ms'],
+                  stats['max_ms'], cpu, frames * 512 / 16000, cpu / (frames * 512 / 16000)))